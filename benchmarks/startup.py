@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the traffic-simulator CLI.
+
+Imports the CLI entry point under `python -X importtime` and fails if the
+cumulative import time exceeds the budget, or if heavy modules that only
+some phases need (matplotlib, NumPy, pydantic, PyYAML) are imported before
+a command runs. Also reports the wall time of `traffic-simulator --help`.
+
+Usage:
+    python benchmarks/startup.py [--budget-ms 150] [--repeat 5]
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+ENTRY_MODULE = "traffic_simulator.runner.cli"
+FORBIDDEN_MODULES = ("matplotlib", "numpy", "pydantic", "yaml")
+
+
+def measure_import(module: str) -> tuple[float, set[str]]:
+    """Cumulative import time of module in ms and the top-level packages it imported"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    cumulative_us = 0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        imported.add(name.split(".")[0])
+        if name == module:
+            cumulative_us = int(cumulative)
+
+    return cumulative_us / 1000, imported
+
+
+def measure_help() -> float:
+    """Wall time of `traffic-simulator --help` in ms"""
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "traffic_simulator", "--help"],
+        capture_output=True,
+        check=True,
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="Import time budget")
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements to take the best of")
+    args = parser.parse_args()
+
+    import_times = []
+    imported: set[str] = set()
+    for _ in range(args.repeat):
+        import_time, imported = measure_import(ENTRY_MODULE)
+        import_times.append(import_time)
+    help_time = min(measure_help() for _ in range(args.repeat))
+
+    best = min(import_times)
+    print(f"import {ENTRY_MODULE}: {best:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"traffic-simulator --help: {help_time:.1f} ms wall")
+
+    failed = False
+    heavy = sorted(set(FORBIDDEN_MODULES) & imported)
+    if heavy:
+        print(f"FAIL: CLI startup imports heavy modules: {', '.join(heavy)}")
+        failed = True
+    if best > args.budget_ms:
+        print("FAIL: CLI import time is over budget")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
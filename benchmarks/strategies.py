@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Decision cost and MSE of the sampled congestion-aware strategies.
+
+For each link count, times select_link_for_flow of every strategy against a
+randomly loaded set of links, then runs all strategies in lockstep over one
+arrival stream scaled to the link count and reports their final MSE.
+
+Usage:
+    python benchmarks/strategies.py [--links 4 64 1024] [--duration 50]
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import time
+
+import numpy as np
+
+from traffic_simulator.config.models import MainConfig
+from traffic_simulator.flows.distribution import DistributionFactory
+from traffic_simulator.flows.flow_generator import FlowGeneratorFactory
+from traffic_simulator.flows.flow_size_generator import FlowSizeGeneratorFactory
+from traffic_simulator.models.flow import Flow
+from traffic_simulator.runner.pipeline import build_simulator
+from traffic_simulator.simulator.lockstep import LockstepSimulator
+
+STRATEGIES = (
+    "least_congested",
+    "power_of_two",
+    "sampled_least_congested",
+    "weighted_power_of_two",
+    "weighted_sampled_least_congested",
+)
+CAPACITY = 10240
+# Websearch flow sizes; the arrival rate is scaled by their mean
+FLOW_SIZE = {"type": "bounded_pareto", "params": {"alpha": 0.125, "lower": 3, "upper": 29892}}
+
+
+def make_config(num_links: int, duration: float, load: float, sample_size: int) -> MainConfig:
+    """Config with num_links equal links, spread targets and an arrival rate giving `load`"""
+    targets = np.linspace(0.2, 1.0, num_links)
+    config = MainConfig.model_validate(
+        {
+            "version": "1.0",
+            "simulation": {"duration": duration, "seed": 1},
+            "network": {
+                "strategy": STRATEGIES[0],
+                "sample_size": sample_size,
+                "links": [
+                    {
+                        "id": f"link{i}",
+                        "capacity": CAPACITY,
+                        "time_window_duration": 60,
+                        "target_utilization": float(target),
+                    }
+                    for i, target in enumerate(targets)
+                ],
+            },
+            "traffic": {
+                "flow_arrival": {"type": "poisson", "rate": 1.0},
+                "flow_size": FLOW_SIZE,
+            },
+        }
+    )
+
+    distribution = DistributionFactory.create_distribution(
+        config.traffic.flow_size.type, config.traffic.flow_size.params
+    )
+    config.traffic.flow_arrival.rate = load * num_links * CAPACITY / distribution.mean()
+    return config
+
+
+def build_lanes(config: MainConfig):
+    distribution = DistributionFactory.create_distribution(
+        config.traffic.flow_size.type, config.traffic.flow_size.params
+    )
+    flow_size_generator = FlowSizeGeneratorFactory.create_generator(config, distribution)
+    flow_generator = FlowGeneratorFactory.create_generator(config, flow_size_generator)
+    lanes = {
+        name: build_simulator(config, name, flow_generator, flow_size_generator, distribution)
+        for name in STRATEGIES
+    }
+    return flow_generator, lanes
+
+
+def decision_cost_us(config: MainConfig, decisions: int) -> dict[str, float]:
+    """Mean time of one routing decision per strategy, in microseconds"""
+    _, lanes = build_lanes(config)
+    flow = Flow(id=0, arrival_time=0.0, flow_size=1000)
+
+    costs = {}
+    for name, lane in lanes.items():
+        state = lane.strategy.state
+        state.busy_until[:] = np.random.default_rng(0).uniform(0, 10, len(state))
+        select = lane.strategy.select_link_for_flow
+        start = time.perf_counter()
+        for _ in range(decisions):
+            select(flow)
+        costs[name] = (time.perf_counter() - start) / decisions * 1e6
+    return costs
+
+
+def final_mse(config: MainConfig) -> dict[str, float]:
+    flow_generator, lanes = build_lanes(config)
+    lockstep = LockstepSimulator(config.simulation.duration, flow_generator, lanes)
+    with contextlib.redirect_stdout(io.StringIO()):
+        lockstep.run()
+    return lockstep.final_mse()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--links", type=int, nargs="+", default=[4, 64, 1024])
+    parser.add_argument("--duration", type=float, default=50.0, help="Simulated seconds per MSE run")
+    parser.add_argument("--load", type=float, default=0.5, help="Offered load per link")
+    parser.add_argument("--sample-size", type=int, default=4, help="sample_size of the sampled strategies")
+    parser.add_argument("--decisions", type=int, default=20000, help="Decisions timed per strategy")
+    args = parser.parse_args()
+
+    random.seed(42)
+    width = max(len(name) for name in STRATEGIES)
+    for num_links in args.links:
+        config = make_config(num_links, args.duration, args.load, args.sample_size)
+        costs = decision_cost_us(config, args.decisions)
+        mse = final_mse(config)
+
+        print(f"{num_links} links")
+        for name in STRATEGIES:
+            print(f"  {name:<{width}}  {costs[name]:8.2f} us/decision  MSE {mse[name]:.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,23 +5,23 @@ mkdir -p output
 
 # Run websearch workload configurations
 echo "Running websearch workload simulations..."
-traffic-simulator --config configs/websearch_wcmp.yaml --output ./output/websearch_wcmp
-traffic-simulator --config configs/websearch_ecmp.yaml --output ./output/websearch_ecmp
-traffic-simulator --config configs/websearch_mut.yaml --output ./output/websearch_mut
-traffic-simulator --config configs/websearch_lc.yaml --output ./output/websearch_lc
+traffic-simulator --config configs/websearch_wcmp.yaml --output ./output/websearch_wcmp --workload-cache ./output/workloads
+traffic-simulator --config configs/websearch_ecmp.yaml --output ./output/websearch_ecmp --workload-cache ./output/workloads
+traffic-simulator --config configs/websearch_mut.yaml --output ./output/websearch_mut --workload-cache ./output/workloads
+traffic-simulator --config configs/websearch_lc.yaml --output ./output/websearch_lc --workload-cache ./output/workloads
 
 # Run datamining workload configurations
 echo "Running datamining workload simulations..."
-traffic-simulator --config configs/datamining_wcmp.yaml --output ./output/datamining_wcmp
-traffic-simulator --config configs/datamining_ecmp.yaml --output ./output/datamining_ecmp
-traffic-simulator --config configs/datamining_mut.yaml --output ./output/datamining_mut
-traffic-simulator --config configs/datamining_lc.yaml --output ./output/datamining_lc
+traffic-simulator --config configs/datamining_wcmp.yaml --output ./output/datamining_wcmp --workload-cache ./output/workloads
+traffic-simulator --config configs/datamining_ecmp.yaml --output ./output/datamining_ecmp --workload-cache ./output/workloads
+traffic-simulator --config configs/datamining_mut.yaml --output ./output/datamining_mut --workload-cache ./output/workloads
+traffic-simulator --config configs/datamining_lc.yaml --output ./output/datamining_lc --workload-cache ./output/workloads
 
 # Run ML workload configurations
 echo "Running ML workload simulations..."
-traffic-simulator --config configs/ML_wcmp.yaml --output ./output/ML_wcmp
-traffic-simulator --config configs/ML_ecmp.yaml --output ./output/ML_ecmp
-traffic-simulator --config configs/ML_mut.yaml --output ./output/ML_mut
-traffic-simulator --config configs/ML_lc.yaml --output ./output/ML_lc
+traffic-simulator --config configs/ML_wcmp.yaml --output ./output/ML_wcmp --workload-cache ./output/workloads
+traffic-simulator --config configs/ML_ecmp.yaml --output ./output/ML_ecmp --workload-cache ./output/workloads
+traffic-simulator --config configs/ML_mut.yaml --output ./output/ML_mut --workload-cache ./output/workloads
+traffic-simulator --config configs/ML_lc.yaml --output ./output/ML_lc --workload-cache ./output/workloads
 
 echo "All simulations completed!"
@@ -0,0 +1,10 @@
+__all__ = ["run", "Results"]
+
+
+def __getattr__(name: str):
+    # Loaded on first use, so importing the package stays light
+    if name in ("run", "Results"):
+        from traffic_simulator.runner import api
+
+        return getattr(api, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
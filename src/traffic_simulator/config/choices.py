@@ -0,0 +1,15 @@
+# Plain constants shared by the config models and the CLI, kept free of
+# heavy imports so the CLI can build its options without loading pydantic.
+
+STRATEGY_NAMES = (
+    "ecmp",
+    "wcmp",
+    "least_congested",
+    "most_under_target",
+    "percentile_based",
+    "uneven",
+    "power_of_two",
+    "sampled_least_congested",
+    "weighted_power_of_two",
+    "weighted_sampled_least_congested",
+)
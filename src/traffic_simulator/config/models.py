@@ -1,7 +1,9 @@
-from typing import List, Literal, Optional, Union
+from typing import Annotated, List, Literal, Optional, Union
 from pydantic import BaseModel, Field, field_validator
 from pathlib import Path
 
+from traffic_simulator.config.choices import STRATEGY_NAMES
+
 
 class LoggingConfig(BaseModel):
     level: str = "INFO"
@@ -11,6 +13,11 @@ class LoggingConfig(BaseModel):
 class MetricsConfig(BaseModel):
     enabled: bool = True
     sample_interval: float = 1.0
+    # Utilization seen by the congestion-aware strategies and the MSE:
+    # since t=0, over each link's time_window_duration, or an EWMA with it as time constant
+    utilization: Literal["cumulative", "sliding_window", "ewma"] = "cumulative"
+    # Age of the samples the strategies see, modelling switch telemetry lag
+    telemetry_delay: float = 0.0
 
     @field_validator("sample_interval")
     def validate_interval(cls, v):
@@ -18,12 +25,51 @@ class MetricsConfig(BaseModel):
             raise ValueError("Sample interval must be positive")
         return v
 
+    @field_validator("telemetry_delay")
+    def validate_telemetry_delay(cls, v):
+        if v < 0:
+            raise ValueError("Telemetry delay must be non-negative")
+        return v
+
+
+class VarianceReductionConfig(BaseModel):
+    antithetic: bool = False  # Pair each uniform draw u with 1 - u
+    control_variate: bool = False  # Correct the mean FCT with the known mean flow size
+    num_batches: int = 20  # Batches the flows are split into to estimate variances
+    # Importance sampling: draw this fraction of flow sizes from above
+    # tail_quantile and weight every flow by its likelihood ratio. The weights
+    # only unbias statistics of each flow's own size; FCTs are those of the
+    # tilted workload, since the extra large flows delay every other flow
+    tail_probability: float = 0.0
+    tail_quantile: float = 0.99
+
+    @field_validator("tail_probability")
+    def validate_tail_probability(cls, v):
+        if not 0.0 <= v < 1.0:
+            raise ValueError("Tail probability must be in [0, 1)")
+        return v
+
+    @field_validator("tail_quantile")
+    def validate_tail_quantile(cls, v):
+        if not 0.0 < v < 1.0:
+            raise ValueError("Tail quantile must be in (0, 1)")
+        return v
+
+    @field_validator("num_batches")
+    def validate_num_batches(cls, v):
+        if v < 2:
+            raise ValueError("At least 2 batches are needed to estimate a variance")
+        return v
+
 
 class SimulationConfig(BaseModel):
     duration: float
     seed: Optional[int] = None
     logging: LoggingConfig = LoggingConfig()
     metrics: MetricsConfig = MetricsConfig()
+    variance_reduction: VarianceReductionConfig = VarianceReductionConfig()
+    # Time step of the fluid engine, a tenth of the sample interval if unset
+    fluid_time_step: Optional[float] = None
 
     @field_validator("duration")
     def validate_duration(cls, v):
@@ -31,12 +77,26 @@ class SimulationConfig(BaseModel):
             raise ValueError("Duration must be positive")
         return v
 
+    @field_validator("fluid_time_step")
+    def validate_fluid_time_step(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("Fluid time step must be positive")
+        return v
+
 
 class LinkConfig(BaseModel):
     id: str
     capacity: float
     time_window_duration: float
     target_utilization: float
+    # Bytes the link can buffer behind the flow in service, infinite if unset
+    buffer_capacity: Optional[float] = None
+
+    @field_validator("buffer_capacity")
+    def validate_buffer_capacity(cls, v):
+        if v is not None and v < 0:
+            raise ValueError("Buffer capacity must be non-negative")
+        return v
 
     @field_validator("capacity")
     def validate_positive(cls, v):
@@ -58,17 +118,70 @@ class LinkConfig(BaseModel):
 
 
 class NetworkConfig(BaseModel):
-    strategy: Literal[
-        "ecmp", 
-        "wcmp", 
-        "least_congested", 
-        "most_under_target", 
-        "percentile_based",
-        "uneven",
-        ]
+    strategy: Literal[STRATEGY_NAMES]
     links: List[LinkConfig]
     buffer_links: Optional[int] = 0  # Indices of links to use as buffers
     large_flow_percentile: Optional[float] = 99.0  # Percentile threshold for large flows
+    sample_size: Optional[int] = 2  # Links probed per flow by the sampled strategies
+    # Share of total traffic below which PercentileBasedStrategy treats flows as small
+    large_flow_contribution: Optional[float] = 0.05
+    # Routing weights of the weighted strategies, one per link; target_utilization if unset
+    weights: Optional[List[float]] = None
+    # Bytes all links can buffer together, on top of their own buffer capacities; no limit if unset
+    shared_buffer: Optional[float] = None
+    # Order links serve their flows in; "srpt" and "priority" preempt the flow in service,
+    # "processor_sharing" serves all flows at once with an equal share of the capacity
+    queue_discipline: Literal["fifo", "srpt", "priority", "processor_sharing"] = "fifo"
+    # Priority levels, highest first: flows up to priority_thresholds[i] bytes get level i
+    priority_thresholds: Optional[List[float]] = None
+    # Or the traffic classes of each level, highest first; unlisted classes get the lowest
+    priority_classes: Optional[List[str]] = None
+
+    @field_validator("priority_thresholds")
+    def validate_priority_thresholds(cls, v):
+        if v is not None and (not v or any(later <= earlier for earlier, later in zip(v, v[1:]))):
+            raise ValueError("Priority thresholds must be increasing")
+        return v
+
+    @field_validator("shared_buffer")
+    def validate_shared_buffer(cls, v):
+        if v is not None and v < 0:
+            raise ValueError("Shared buffer must be non-negative")
+        return v
+
+    def has_finite_buffers(self) -> bool:
+        """Whether any link can drop flows"""
+        return self.shared_buffer is not None or any(
+            link.buffer_capacity is not None for link in self.links
+        )
+
+    @field_validator("weights")
+    def validate_weights(cls, v, values):
+        if v is None:
+            return v
+        if "links" in values.data and len(v) != len(values.data["links"]):
+            raise ValueError("Need one weight per link")
+        if any(weight < 0 for weight in v):
+            raise ValueError("Weights must be non-negative")
+        return v
+
+    @field_validator("large_flow_contribution")
+    def validate_large_flow_contribution(cls, v):
+        if v is not None and not 0 < v < 1:
+            raise ValueError("Large flow contribution must be in (0, 1)")
+        return v
+
+    def routing_weights(self) -> List[float]:
+        """Weights the weighted strategies split traffic by"""
+        if self.weights is not None:
+            return list(self.weights)
+        return [link.target_utilization for link in self.links]
+
+    @field_validator("sample_size")
+    def validate_sample_size(cls, v):
+        if v is not None and v < 1:
+            raise ValueError("Sample size must be at least 1")
+        return v
 
 
 class PoissonArrivalConfig(BaseModel):
@@ -82,6 +195,108 @@ class PoissonArrivalConfig(BaseModel):
         return v
 
 
+class TraceArrivalConfig(BaseModel):
+    type: Literal["trace"]
+    path: Path  # Binary trace written by `traffic-simulator convert-trace`
+
+
+class TimeVaryingArrivalConfig(BaseModel):
+    """Non-homogeneous Poisson arrivals whose rate follows a profile"""
+
+    type: Literal["time_varying"]
+    # Rate profile: rates[i] flows per second at times[i]
+    times: List[float]
+    rates: List[float]
+    # "step" holds each rate until the next time, "linear" interpolates between sampled rates
+    interpolation: Literal["step", "linear"] = "step"
+    # Repeat the profile with this period, e.g. 86400 for a diurnal pattern
+    period: Optional[float] = None
+
+    @field_validator("times")
+    def validate_times(cls, v):
+        if not v or v[0] != 0:
+            raise ValueError("Rate profile times must start at 0")
+        if any(later <= earlier for earlier, later in zip(v, v[1:])):
+            raise ValueError("Rate profile times must be increasing")
+        return v
+
+    @field_validator("rates")
+    def validate_rates(cls, v, values):
+        if "times" in values.data and len(v) != len(values.data["times"]):
+            raise ValueError("Need one rate per profile time")
+        if any(rate < 0 for rate in v) or max(v, default=0) <= 0:
+            raise ValueError("Rates must be non-negative and not all zero")
+        return v
+
+    @field_validator("period")
+    def validate_period(cls, v, values):
+        if v is not None and "times" in values.data and v <= values.data["times"][-1]:
+            raise ValueError("Period must be longer than the last profile time")
+        return v
+
+
+class MMPPArrivalConfig(BaseModel):
+    """Markov-modulated Poisson arrivals: a Poisson rate per state of a continuous-time Markov chain"""
+
+    type: Literal["mmpp"]
+    rates: List[float]  # Flows per second in each state
+    # transitions[i][j]: rate of switching from state i to state j per second, diagonal 0
+    transitions: List[List[float]]
+    initial_state: int = 0
+
+    @field_validator("rates")
+    def validate_rates(cls, v):
+        if not v or any(rate < 0 for rate in v) or max(v) <= 0:
+            raise ValueError("Rates must be non-negative and not all zero")
+        return v
+
+    @field_validator("transitions")
+    def validate_transitions(cls, v, values):
+        if "rates" in values.data and (
+            len(v) != len(values.data["rates"]) or any(len(row) != len(v) for row in v)
+        ):
+            raise ValueError("Transitions must be a square matrix with a row per state")
+        if any(rate < 0 for row in v for rate in row) or any(row[i] != 0 for i, row in enumerate(v)):
+            raise ValueError("Transition rates must be non-negative with a zero diagonal")
+        return v
+
+    @field_validator("initial_state")
+    def validate_initial_state(cls, v, values):
+        if "rates" in values.data and not 0 <= v < len(values.data["rates"]):
+            raise ValueError("Initial state must be one of the states")
+        return v
+
+
+class OnOffArrivalConfig(BaseModel):
+    """Bursts of Poisson arrivals separated by silent periods"""
+
+    type: Literal["on_off"]
+    rate: float  # Flows per second while on
+    mean_on: float  # Mean burst length in seconds
+    mean_off: float  # Mean silence in seconds
+    # "exponential" periods make a two-state MMPP, "constant" ones synchronized periodic bursts
+    period_distribution: Literal["exponential", "constant"] = "exponential"
+
+    @field_validator("rate", "mean_on", "mean_off")
+    def validate_positive(cls, v):
+        if v <= 0:
+            raise ValueError("Rate and mean on/off times must be positive")
+        return v
+
+
+# Arrival processes a traffic class can use, told apart by their type
+ArrivalConfig = Annotated[
+    Union[
+        PoissonArrivalConfig,
+        TraceArrivalConfig,
+        TimeVaryingArrivalConfig,
+        MMPPArrivalConfig,
+        OnOffArrivalConfig,
+    ],
+    Field(discriminator="type"),
+]
+
+
 class BoundedParetoParams(BaseModel):
     alpha: float
     lower: float
@@ -100,14 +315,60 @@ class BoundedParetoParams(BaseModel):
         return v
 
 
+class EmpiricalParams(BaseModel):
+    # Text file of (size, cdf) breakpoints, one per line; the last column is the cdf
+    path: Path
+    scale: float = 1.0  # Multiplier turning the file's sizes into bytes, e.g. 1460 for packets
+
+    @field_validator("scale")
+    def validate_scale(cls, v):
+        if v <= 0:
+            raise ValueError("Scale must be positive")
+        return v
+
+
 class FlowSizeConfig(BaseModel):
-    type: Literal["bounded_pareto", "uniform"]
-    params: Union[BoundedParetoParams, dict]
+    type: Literal["bounded_pareto", "uniform", "empirical"]
+    params: Union[BoundedParetoParams, EmpiricalParams, dict]
+
+    @field_validator("params")
+    def validate_params(cls, v, values):
+        # A plain dict also matches the union, so empirical params are parsed explicitly
+        if values.data.get("type") == "empirical" and isinstance(v, dict):
+            return EmpiricalParams.model_validate(v)
+        return v
+
+
+class TrafficClassConfig(BaseModel):
+    name: str
+    flow_arrival: ArrivalConfig
+    flow_size: FlowSizeConfig
 
 
 class TrafficConfig(BaseModel):
-    flow_arrival: PoissonArrivalConfig
+    flow_arrival: ArrivalConfig
     flow_size: FlowSizeConfig
+    name: str = "default"  # Traffic class of the flow_arrival/flow_size stream
+    # Further traffic classes, each with its own arrivals and sizes, mixed into that stream
+    classes: List[TrafficClassConfig] = []
+
+    @field_validator("classes")
+    def validate_classes(cls, v, values):
+        names = [traffic_class.name for traffic_class in v]
+        if "name" in values.data:
+            names.append(values.data["name"])
+        if len(set(names)) != len(names):
+            raise ValueError("Traffic class names must be unique")
+        return v
+
+    def empirical_cdf_paths(self) -> List[Path]:
+        """CDF files the flow sizes of all classes are read from"""
+        flow_sizes = [self.flow_size] + [traffic_class.flow_size for traffic_class in self.classes]
+        return [
+            flow_size.params.path
+            for flow_size in flow_sizes
+            if isinstance(flow_size.params, EmpiricalParams)
+        ]
 
 
 class FlowSizeDistribution(BaseModel):
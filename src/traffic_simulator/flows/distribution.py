@@ -1,7 +1,12 @@
 from abc import ABC, abstractmethod
+import bisect
+import functools
 import math
+from pathlib import Path
 
-from traffic_simulator.config.models import BoundedParetoParams
+import numpy as np
+
+from traffic_simulator.config.models import BoundedParetoParams, EmpiricalParams
 
 
 class Distribution(ABC):
@@ -24,6 +29,16 @@ class Distribution(ABC):
             raise ValueError("Percentile must be between 0 and 100")
         return self.quantile(p / 100)
 
+    @abstractmethod
+    def mean(self) -> float:
+        """First moment of the distribution"""
+        pass
+
+    @abstractmethod
+    def second_moment(self) -> float:
+        """Second raw moment E[X^2] of the distribution"""
+        pass
+
 
 class BoundedParetoDistribution(Distribution):
     def __init__(self, lower_bound: float, upper_bound: float, alpha: float):
@@ -48,7 +63,7 @@ class BoundedParetoDistribution(Distribution):
         )
         x = self.L / denominator
         return int(x)
-    
+
     def mean(self) -> float:
         if self.L <= 0 or self.U <= self.L:
             raise ValueError("Require L > 0 and u > L.")
@@ -61,14 +76,112 @@ class BoundedParetoDistribution(Distribution):
             denominator = (1 - (self.L / self.U) ** self.alpha) * (1 - self.alpha)
             return numerator / denominator
 
+    def second_moment(self) -> float:
+        if self.L <= 0 or self.U <= self.L:
+            raise ValueError("Require L > 0 and u > L.")
+
+        # Special case when alpha equals 2
+        normalization = 1 - (self.L / self.U) ** self.alpha
+        if self.alpha == 2:
+            return 2 * self.L**2 * math.log(self.U / self.L) / normalization
+        else:
+            numerator = self.alpha * (self.L ** self.alpha) * (self.U ** (2 - self.alpha) - self.L ** (2 - self.alpha))
+            return numerator / (normalization * (2 - self.alpha))
+
+
+@functools.lru_cache(maxsize=32)
+def _read_cdf_table(path: Path, size: int, mtime_ns: int) -> tuple[tuple[float, ...], tuple[float, ...]]:
+    """Parse a CDF file; size and mtime_ns only key the cache, so an edited file is read again"""
+    sizes, cdf = [], []
+    for number, line in enumerate(path.read_text().splitlines(), 1):
+        fields = line.split("#")[0].replace(",", " ").split()
+        if not fields:
+            continue
+        try:
+            sizes.append(float(fields[0]))
+            cdf.append(float(fields[-1]))
+        except ValueError:
+            raise ValueError(f"{path}:{number}: expected a size and a cdf value") from None
+
+    if len(sizes) < 2:
+        raise ValueError(f"{path}: need at least two (size, cdf) breakpoints")
+    if any(b < a for a, b in zip(sizes, sizes[1:])) or any(b < a for a, b in zip(cdf, cdf[1:])):
+        raise ValueError(f"{path}: sizes and cdf values must be non-decreasing")
+    if sizes[0] < 0 or cdf[0] < 0 or not math.isclose(cdf[-1], 1.0):
+        raise ValueError(f"{path}: sizes must be non-negative and the cdf must end at 1")
+
+    # Mass below the first breakpoint sits on the first size
+    if cdf[0] > 0:
+        sizes.insert(0, sizes[0])
+        cdf.insert(0, 0.0)
+    cdf[-1] = 1.0
+    return tuple(sizes), tuple(cdf)
+
+
+def load_cdf_table(path: str | Path) -> tuple[tuple[float, ...], tuple[float, ...]]:
+    """(sizes, cdf) breakpoints of a CDF file, parsed once per version of the file"""
+    path = Path(path).resolve()
+    try:
+        stat = path.stat()
+    except OSError as e:
+        raise ValueError(f"Cannot read CDF file {path}: {e.strerror}") from None
+    return _read_cdf_table(path, stat.st_size, stat.st_mtime_ns)
+
+
+class EmpiricalDistribution(Distribution):
+    """
+    A measured flow size distribution given by (size, cdf) breakpoints.
+
+    The CDF is linear between breakpoints, so sizes are uniform within each
+    segment, and draws bisect a table of the inverse CDF's slopes.
+    """
+
+    def __init__(self, sizes: list[float], cdf: list[float]):
+        self.sizes = list(sizes)
+        self.cdf = list(cdf)
+        # Slope of the inverse CDF over the segment ending at each breakpoint, 0 for empty ones
+        self._slopes = [0.0] + [
+            (high_size - low_size) / (high - low) if high > low else 0.0
+            for low_size, high_size, low, high in zip(self.sizes, self.sizes[1:], self.cdf, self.cdf[1:])
+        ]
+        self._sizes = np.array(self.sizes)
+        self._cdf = np.array(self.cdf)
+
+    @classmethod
+    def from_file(cls, path: str | Path, scale: float = 1.0) -> "EmpiricalDistribution":
+        sizes, cdf = load_cdf_table(path)
+        return cls([size * scale for size in sizes], cdf)
+
+    def quantile(self, u: float) -> int:
+        # cdf[i - 1] <= u < cdf[i], so segment i is never empty
+        i = bisect.bisect_right(self.cdf, u)
+        if i == len(self.cdf):
+            return int(self.sizes[-1])
+        return int(self.sizes[i - 1] + (u - self.cdf[i - 1]) * self._slopes[i])
+
+    def mean(self) -> float:
+        # Each segment is uniform on [a, b] with probability p: p (a + b) / 2
+        p = np.diff(self._cdf)
+        a, b = self._sizes[:-1], self._sizes[1:]
+        return float(np.sum(p * (a + b) / 2))
+
+    def second_moment(self) -> float:
+        # p (a^2 + ab + b^2) / 3 per uniform segment
+        p = np.diff(self._cdf)
+        a, b = self._sizes[:-1], self._sizes[1:]
+        return float(np.sum(p * (a * a + a * b + b * b) / 3))
+
 
 class DistributionFactory:
     _distribution_mapping = {
         "bounded_pareto": BoundedParetoDistribution,
+        "empirical": EmpiricalDistribution,
     }
 
     @classmethod
-    def create_distribution(cls, distribution_type: str, params: BoundedParetoParams | dict) -> Distribution:
+    def create_distribution(
+        cls, distribution_type: str, params: BoundedParetoParams | EmpiricalParams | dict
+    ) -> Distribution:
         if distribution_type not in cls._distribution_mapping:
             raise ValueError(f"Unknown distribution type: {distribution_type}")
 
@@ -81,6 +194,12 @@ class DistributionFactory:
                 upper_bound=params.upper,
                 alpha=params.alpha,
             )
-        
+
+        if distribution_type == "empirical":
+            if not isinstance(params, EmpiricalParams):
+                raise ValueError("Invalid parameters for the empirical distribution.")
+
+            return EmpiricalDistribution.from_file(params.path, params.scale)
+
         raise ValueError(f"Unsupported distribution type: {distribution_type}")
     
\ No newline at end of file
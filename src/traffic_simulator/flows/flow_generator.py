@@ -1,15 +1,29 @@
+import heapq
+import math
 import random
 
 from abc import ABC, abstractmethod
+from pathlib import Path
 from typing import Iterator
-from traffic_simulator.flows.flow_size_generator import FlowSizeGenerator
+import numpy as np
+
+from traffic_simulator.config.models import ArrivalConfig, MainConfig
+from traffic_simulator.flows.distribution import DistributionFactory
+from traffic_simulator.flows.flow_size_generator import (
+    TRAFFIC_CLASS_SEED_STRIDE,
+    FlowSizeGenerator,
+    FlowSizeGeneratorFactory,
+)
+from traffic_simulator.flows.trace import Trace
 from traffic_simulator.models import Flow
 
 
 class FlowGenerator(ABC):
-    def __init__(self, flow_size_generator: FlowSizeGenerator):
+    def __init__(self, flow_size_generator: FlowSizeGenerator | None):
         self.flow_size_generator = flow_size_generator
         self.all_flows: list[Flow] = []
+        # Whether generated flows are kept in all_flows
+        self.retain_flows = True
 
     @abstractmethod
     def generate_flows(self, current_time: float, end_time: float) -> Iterator[Flow]:
@@ -21,28 +35,456 @@ class PoissonFlowGenerator(FlowGenerator):
     Generates flows using a Poisson process for arrivals.
     """
 
-    def __init__(self, arrival_rate: float, flow_size_generator: FlowSizeGenerator):
+    DEFAULT_SEED = 1233466
+
+    def __init__(
+        self,
+        arrival_rate: float,
+        flow_size_generator: FlowSizeGenerator,
+        seed: int = DEFAULT_SEED,
+        antithetic: bool = False,
+    ):
         """
         arrival_rate: Expected number of flows per time interval (λ).
         flow_size_generator: An instance of FlowSizeGenerator.
+        seed: Seed of the first inter-arrival draw.
+        antithetic: pair every inter-arrival draw u with a following draw 1 - u.
         """
         super().__init__(flow_size_generator)
-        self.seed = 1233466
+        self.seed = seed
         self.arrival_rate = arrival_rate
+        self.antithetic = antithetic
         self.next_flow_id = 0
+        # Private RNG so lazily generated arrivals do not disturb the strategies' draws
+        self._random = random.Random()
+        self._antithetic_u: float | None = None
+
+    def _next_gap(self) -> float:
+        self._random.seed(self.seed)
+        self.seed += 1
+        if self._antithetic_u is not None:
+            u, self._antithetic_u = self._antithetic_u, None
+        else:
+            u = self._random.random()
+            if self.antithetic:
+                self._antithetic_u = 1.0 - u
+        # Inverse transform, the same draw random.expovariate makes
+        return -math.log(1.0 - u) / self.arrival_rate
 
     def generate_flows(self, current_time: float, end_time: float) -> Iterator[Flow]:
         while current_time < end_time:
-            flow_size = self.flow_size_generator.generate()
+            flow_size, weight = self.flow_size_generator.generate_weighted()
 
-            random.seed(self.seed)
-            current_time += random.expovariate(self.arrival_rate)
-            self.seed += 1
+            current_time += self._next_gap()
 
             flow = Flow(
-                id=self.next_flow_id, arrival_time=current_time, flow_size=flow_size
+                id=self.next_flow_id,
+                arrival_time=current_time,
+                flow_size=flow_size,
+                weight=weight,
             )
-            self.all_flows.append(flow)
+            if self.retain_flows:
+                self.all_flows.append(flow)
             self.next_flow_id += 1
 
             yield flow
+
+
+class BatchedFlowGenerator(FlowGenerator):
+    """
+    Generates flows from arrival times drawn in NumPy batches.
+
+    Subclasses only produce the arrival times; flow sizes still come one at a
+    time from the FlowSizeGenerator.
+    """
+
+    def __init__(self, flow_size_generator: FlowSizeGenerator):
+        super().__init__(flow_size_generator)
+        self.next_flow_id = 0
+
+    @abstractmethod
+    def arrival_times(self, current_time: float, end_time: float) -> Iterator[np.ndarray]:
+        """
+        Increasing arrival times in batches: every arrival before end_time,
+        plus the first one at or after it like PoissonFlowGenerator.
+        """
+        pass
+
+    def generate_flows(self, current_time: float, end_time: float) -> Iterator[Flow]:
+        for batch in self.arrival_times(current_time, end_time):
+            for arrival_time in batch.tolist():
+                flow_size, weight = self.flow_size_generator.generate_weighted()
+                flow = Flow(
+                    id=self.next_flow_id,
+                    arrival_time=arrival_time,
+                    flow_size=flow_size,
+                    weight=weight,
+                )
+                if self.retain_flows:
+                    self.all_flows.append(flow)
+                self.next_flow_id += 1
+
+                yield flow
+
+
+class TimeVaryingPoissonFlowGenerator(BatchedFlowGenerator):
+    """
+    Generates flows from a non-homogeneous Poisson process by Lewis-Shedler thinning.
+
+    Candidate arrivals are drawn at the peak rate of the profile and each is
+    kept with probability rate(t) / peak. Candidates are drawn and thinned in
+    NumPy batches, so only accepted arrivals cost Python work, however high
+    the peak-to-mean ratio of the profile.
+    """
+
+    DEFAULT_SEED = 1233466
+
+    def __init__(
+        self,
+        times: list[float],
+        rates: list[float],
+        flow_size_generator: FlowSizeGenerator,
+        interpolation: str = "step",
+        period: float | None = None,
+        seed: int = DEFAULT_SEED,
+        batch_size: int = 65536,
+    ):
+        """
+        times, rates: rate profile, rates[i] flows per second at times[i].
+        interpolation: "step" holds each rate until the next time, "linear" interpolates.
+        period: repeat the profile with this period, None to hold the last rate.
+        batch_size: most candidates drawn at once.
+        """
+        super().__init__(flow_size_generator)
+        self.times = np.asarray(times, dtype=np.float64)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        self.interpolation = interpolation
+        self.period = period
+        self.peak_rate = float(self.rates.max())
+        self.batch_size = batch_size
+        self._rng = np.random.default_rng(seed)
+
+        # A periodic linear profile interpolates back to its first rate
+        self._interp_times, self._interp_rates = self.times, self.rates
+        if period is not None:
+            self._interp_times = np.append(self.times, period)
+            self._interp_rates = np.append(self.rates, self.rates[0])
+
+    def rate(self, t: np.ndarray) -> np.ndarray:
+        """Arrival rate at each time in t"""
+        if self.period is not None:
+            t = np.mod(t, self.period)
+        if self.interpolation == "linear":
+            return np.interp(t, self._interp_times, self._interp_rates)
+        return self.rates[np.searchsorted(self.times, t, side="right") - 1]
+
+    def arrival_times(self, current_time: float, end_time: float) -> Iterator[np.ndarray]:
+        # Without a period, a profile ending at rate 0 has no arrivals after its last time
+        quiet_after = self.times[-1] if self.period is None and self.rates[-1] == 0 else np.inf
+
+        while current_time < quiet_after:
+            # Enough candidates to likely reach end_time, within bounds
+            expected = self.peak_rate * max(end_time - current_time, 0.0)
+            count = int(min(max(1.1 * expected + 16, 256), self.batch_size))
+            candidates = current_time + np.cumsum(
+                self._rng.exponential(1.0 / self.peak_rate, count)
+            )
+            keep = self._rng.random(count) * self.peak_rate < self.rate(candidates)
+            accepted = candidates[keep]
+            current_time = float(candidates[-1])
+
+            past_end = int(np.searchsorted(accepted, end_time, side="left"))
+            if past_end < len(accepted):
+                yield accepted[: past_end + 1]
+                return
+            if len(accepted):
+                yield accepted
+
+
+class MMPPFlowGenerator(BatchedFlowGenerator):
+    """
+    Generates flows from a Markov-modulated Poisson process.
+
+    A continuous-time Markov chain switches between states, each with its own
+    Poisson arrival rate. Arrivals are drawn one state sojourn at a time:
+    given its length, the number of arrivals in a sojourn is Poisson and
+    their times are uniform over it, so a burst of any size costs a few
+    NumPy calls.
+    """
+
+    DEFAULT_SEED = 1233466
+
+    def __init__(
+        self,
+        rates: list[float],
+        transitions: list[list[float]],
+        flow_size_generator: FlowSizeGenerator,
+        initial_state: int = 0,
+        seed: int = DEFAULT_SEED,
+        batch_size: int = 65536,
+    ):
+        """
+        rates: flows per second in each state.
+        transitions: transitions[i][j] is the rate of switching from state i to j.
+        initial_state: state at the start of generation.
+        batch_size: most arrivals drawn at once, long sojourns are drawn in pieces.
+        """
+        super().__init__(flow_size_generator)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        self.transitions = np.asarray(transitions, dtype=np.float64)
+        self.initial_state = initial_state
+        self.batch_size = batch_size
+        self._rng = np.random.default_rng(seed)
+
+        self._leave_rates = self.transitions.sum(axis=1)
+        # Cumulative jump probabilities of each state, for drawing the next one
+        leaving = np.where(self._leave_rates > 0, self._leave_rates, 1.0)
+        self._jump_cdf = np.cumsum(self.transitions / leaving[:, None], axis=1)
+
+    def _sojourn(self, state: int) -> tuple[float, int]:
+        """Length of a sojourn in state and the state that follows it"""
+        if self._leave_rates[state] == 0:
+            return math.inf, state
+        length = self._rng.exponential(1.0 / self._leave_rates[state])
+        next_state = int(np.searchsorted(self._jump_cdf[state], self._rng.random(), side="right"))
+        return length, min(next_state, len(self.rates) - 1)
+
+    def arrival_times(self, current_time: float, end_time: float) -> Iterator[np.ndarray]:
+        state = self.initial_state
+        while current_time < end_time:
+            length, next_state = self._sojourn(state)
+            sojourn_end = current_time + length
+            rate = float(self.rates[state])
+            if rate == 0:
+                current_time = sojourn_end
+                state = next_state
+                continue
+
+            # Pieces of at most batch_size expected arrivals keep memory bounded
+            while current_time < sojourn_end:
+                piece_end = min(sojourn_end, current_time + self.batch_size / rate)
+                count = self._rng.poisson(rate * (piece_end - current_time))
+                arrivals = np.sort(self._rng.uniform(current_time, piece_end, count))
+                current_time = piece_end
+
+                past_end = int(np.searchsorted(arrivals, end_time, side="left"))
+                if past_end < len(arrivals):
+                    yield arrivals[: past_end + 1]
+                    return
+                if count:
+                    yield arrivals
+            state = next_state
+
+
+class OnOffFlowGenerator(MMPPFlowGenerator):
+    """
+    Generates bursts of Poisson arrivals separated by silences.
+
+    With exponential periods this is a two-state MMPP. Constant periods give
+    bursts at fixed times, so classes with the same periods burst together,
+    as synchronized senders do in incast.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        mean_on: float,
+        mean_off: float,
+        flow_size_generator: FlowSizeGenerator,
+        period_distribution: str = "exponential",
+        seed: int = MMPPFlowGenerator.DEFAULT_SEED,
+        batch_size: int = 65536,
+    ):
+        """
+        rate: flows per second while on, starting with an on period.
+        mean_on, mean_off: mean lengths of the on and off periods.
+        period_distribution: "exponential" or "constant" period lengths.
+        """
+        super().__init__(
+            rates=[rate, 0.0],
+            transitions=[[0.0, 1.0 / mean_on], [1.0 / mean_off, 0.0]],
+            flow_size_generator=flow_size_generator,
+            seed=seed,
+            batch_size=batch_size,
+        )
+        self.period_lengths = (mean_on, mean_off)
+        self.period_distribution = period_distribution
+
+    def _sojourn(self, state: int) -> tuple[float, int]:
+        if self.period_distribution == "constant":
+            return self.period_lengths[state], 1 - state
+        return self._rng.exponential(self.period_lengths[state]), 1 - state
+
+
+class TraceFlowGenerator(FlowGenerator):
+    """
+    Replays flows from a binary trace file in arrival order.
+    Like PoissonFlowGenerator, it yields every flow arriving before end_time
+    plus the first one arriving at or after it.
+    The trace is memory-mapped and read in chunks, and unless retain_flows is
+    set replayed flows are not kept in all_flows, so memory stays bounded for
+    arbitrarily long traces.
+    """
+
+    def __init__(
+        self,
+        trace_path: str | Path,
+        chunk_size: int = 65536,
+        retain_flows: bool = False,
+    ):
+        super().__init__(flow_size_generator=None)
+        self.trace = Trace(trace_path)
+        self.chunk_size = chunk_size
+        self.retain_flows = retain_flows
+
+    def generate_flows(self, current_time: float, end_time: float) -> Iterator[Flow]:
+        arrival_times = self.trace.arrival_times
+        flow_sizes = self.trace.flow_sizes
+
+        # Binary search on the mapped column only touches O(log n) pages
+        first = int(np.searchsorted(arrival_times, current_time, side="left"))
+        last = int(np.searchsorted(arrival_times, end_time, side="left"))
+        last = min(last + 1, len(self.trace))
+
+        for chunk_start in range(first, last, self.chunk_size):
+            chunk_end = min(chunk_start + self.chunk_size, last)
+            chunk = zip(
+                arrival_times[chunk_start:chunk_end].tolist(),
+                flow_sizes[chunk_start:chunk_end].tolist(),
+            )
+            for flow_id, (arrival_time, flow_size) in enumerate(chunk, chunk_start):
+                flow = Flow(id=flow_id, arrival_time=arrival_time, flow_size=flow_size)
+                if self.retain_flows:
+                    self.all_flows.append(flow)
+                yield flow
+
+
+class ListFlowGenerator(FlowGenerator):
+    """Replays flows that were already generated, in arrival order"""
+
+    def __init__(self, flows: list[Flow]):
+        super().__init__(flow_size_generator=None)
+        self.all_flows = flows
+
+    def generate_flows(self, current_time: float, end_time: float) -> Iterator[Flow]:
+        return iter(self.all_flows)
+
+
+class MultiClassFlowGenerator(FlowGenerator):
+    """
+    Mixes the flows of several traffic classes into one stream in arrival order.
+
+    The class streams are merged lazily with a k-way heap merge, so only the
+    next flow of each class is pending at a time. Merged flows are tagged
+    with their class, renumbered in arrival order and kept in all_flows;
+    the class generators do not keep their own.
+    """
+
+    def __init__(self, class_generators: dict[str, FlowGenerator]):
+        super().__init__(flow_size_generator=None)
+        self.class_generators = class_generators
+        for generator in class_generators.values():
+            generator.retain_flows = False
+        self.next_flow_id = 0
+
+    @staticmethod
+    def _tagged(name: str, flows: Iterator[Flow]) -> Iterator[Flow]:
+        for flow in flows:
+            flow.traffic_class = name
+            yield flow
+
+    def generate_flows(self, current_time: float, end_time: float) -> Iterator[Flow]:
+        streams = [
+            self._tagged(name, generator.generate_flows(current_time, end_time))
+            for name, generator in self.class_generators.items()
+        ]
+        for flow in heapq.merge(*streams, key=lambda flow: flow.arrival_time):
+            flow.id = self.next_flow_id
+            self.next_flow_id += 1
+            if self.retain_flows:
+                self.all_flows.append(flow)
+            yield flow
+
+
+class FlowGeneratorFactory:
+    @classmethod
+    def create_generator(
+        cls, config: MainConfig, flow_size_generator: FlowSizeGenerator
+    ) -> FlowGenerator:
+        generator = cls._create_class_generator(
+            config, config.traffic.flow_arrival, flow_size_generator, 0
+        )
+        if not config.traffic.classes:
+            return generator
+
+        class_generators = {config.traffic.name: generator}
+        for class_index, traffic_class in enumerate(config.traffic.classes, 1):
+            distribution = DistributionFactory.create_distribution(
+                traffic_class.flow_size.type, traffic_class.flow_size.params
+            )
+            class_generators[traffic_class.name] = cls._create_class_generator(
+                config,
+                traffic_class.flow_arrival,
+                FlowSizeGeneratorFactory.create_generator(
+                    config, distribution, traffic_class.flow_size, class_index
+                ),
+                class_index,
+            )
+        return MultiClassFlowGenerator(class_generators)
+
+    @classmethod
+    def _create_class_generator(
+        cls,
+        config: MainConfig,
+        flow_arrival: ArrivalConfig,
+        flow_size_generator: FlowSizeGenerator,
+        class_index: int,
+    ) -> FlowGenerator:
+        """Generator of one traffic class; class_index offsets its seed"""
+        seed = config.simulation.seed
+        if seed is None:
+            seed = PoissonFlowGenerator.DEFAULT_SEED
+        seed += class_index * TRAFFIC_CLASS_SEED_STRIDE
+
+        if flow_arrival.type == "poisson":
+            return PoissonFlowGenerator(
+                arrival_rate=flow_arrival.rate,
+                flow_size_generator=flow_size_generator,
+                seed=seed,
+                antithetic=config.simulation.variance_reduction.antithetic,
+            )
+
+        elif flow_arrival.type == "time_varying":
+            return TimeVaryingPoissonFlowGenerator(
+                times=flow_arrival.times,
+                rates=flow_arrival.rates,
+                flow_size_generator=flow_size_generator,
+                interpolation=flow_arrival.interpolation,
+                period=flow_arrival.period,
+                seed=seed,
+            )
+
+        elif flow_arrival.type == "mmpp":
+            return MMPPFlowGenerator(
+                rates=flow_arrival.rates,
+                transitions=flow_arrival.transitions,
+                flow_size_generator=flow_size_generator,
+                initial_state=flow_arrival.initial_state,
+                seed=seed,
+            )
+
+        elif flow_arrival.type == "on_off":
+            return OnOffFlowGenerator(
+                rate=flow_arrival.rate,
+                mean_on=flow_arrival.mean_on,
+                mean_off=flow_arrival.mean_off,
+                flow_size_generator=flow_size_generator,
+                period_distribution=flow_arrival.period_distribution,
+                seed=seed,
+            )
+
+        elif flow_arrival.type == "trace":
+            return TraceFlowGenerator(trace_path=flow_arrival.path)
+
+        else:
+            raise ValueError(f"Unsupported flow arrival type: {flow_arrival.type}")
@@ -3,16 +3,28 @@ import random
 
 from traffic_simulator.config.models import (
     BoundedParetoParams,
+    FlowSizeConfig,
     MainConfig,
 )
 from traffic_simulator.flows.distribution import BoundedParetoDistribution, Distribution
 
+# Seed offset between traffic classes, so no two classes ever share a draw's seed
+TRAFFIC_CLASS_SEED_STRIDE = 2**44
+
 
 class FlowSizeGenerator(ABC):
     @abstractmethod
     def generate(self) -> int:
         pass
 
+    def generate_weighted(self) -> tuple[int, float]:
+        """
+        Return a flow size and its likelihood ratio, the weight that makes
+        statistics over generated flows unbiased when sizes are drawn from a
+        tilted distribution. Untilted generators always return weight 1.
+        """
+        return self.generate(), 1.0
+
     def generate_with_probability(self, probability: float = None) -> int:
         if not (0.0 <= probability <= 1.0):
             raise ValueError("Probability must be between 0.0 and 1.0")
@@ -36,12 +48,20 @@ class ConstantFlowSizeGenerator(FlowSizeGenerator):
 
 
 class UniformFlowSizeGenerator(FlowSizeGenerator):
-    def __init__(self, min_flow_size: int, max_flow_size: int):
+    DEFAULT_SEED = 65867967934
+
+    def __init__(self, min_flow_size: int, max_flow_size: int, seed: int = DEFAULT_SEED):
         self.min_flow_size = min_flow_size
         self.max_flow_size = max_flow_size
+        self.seed = seed
+        # Private RNG reseeded per draw, like QuantileFlowSizeGenerator, so sizes
+        # do not depend on the routing draws interleaved with lazy arrivals
+        self._random = random.Random()
 
     def generate(self) -> int:
-        return random.randint(self.min_flow_size, self.max_flow_size)
+        self._random.seed(self.seed)
+        self.seed += 1
+        return self._random.randint(self.min_flow_size, self.max_flow_size)
         
     def _generate_with_probability(self, probability: float) -> int:
         range = self.max_flow_size - self.min_flow_size
@@ -49,15 +69,66 @@ class UniformFlowSizeGenerator(FlowSizeGenerator):
 
 
 class QuantileFlowSizeGenerator(FlowSizeGenerator):
-    def __init__(self, distribution: Distribution):
+    DEFAULT_SEED = 65867967934
+    # Offset from a configured seed, so size draws never reuse an arrival draw's seed
+    SEED_OFFSET = 2**40
+
+    def __init__(
+        self,
+        distribution: Distribution,
+        seed: int = DEFAULT_SEED,
+        antithetic: bool = False,
+        tail_probability: float = 0.0,
+        tail_quantile: float = 0.99,
+    ):
+        """
+        antithetic: pair every draw u with a following draw 1 - u, so the
+        sizes of each pair are negatively correlated.
+        tail_probability: importance sampling; this fraction of the sizes is
+        drawn from above tail_quantile, the rest from the whole distribution.
+        """
+        if not 0.0 <= tail_probability < 1.0:
+            raise ValueError("Tail probability must be in [0, 1)")
+        if not 0.0 < tail_quantile < 1.0:
+            raise ValueError("Tail quantile must be in (0, 1)")
+
         self.distribution = distribution
-        self.seed = 65867967934
+        self.seed = seed
+        self.antithetic = antithetic
+        self.tail_probability = tail_probability
+        self.tail_quantile = tail_quantile
+        self._random = random.Random()
+        self._antithetic_u: float | None = None
+
+    def _next_uniform(self) -> float:
+        self._random.seed(self.seed)
+        self.seed += 1
+        if self._antithetic_u is not None:
+            u, self._antithetic_u = self._antithetic_u, None
+        else:
+            u = self._random.random()
+            if self.antithetic:
+                self._antithetic_u = 1.0 - u
+        return u
 
     def generate(self) -> int:
-        random.seed(self.seed)
-        self.seed += 1
-        u = random.random()
-        return self.distribution.quantile(u)
+        return self.generate_weighted()[0]
+
+    def generate_weighted(self) -> tuple[int, float]:
+        u = self._next_uniform()
+        if self.tail_probability == 0.0:
+            return self.distribution.quantile(u), 1.0
+
+        # One uniform picks the mixture component and the quantile within it
+        p, q = self.tail_probability, self.tail_quantile
+        if u < p:
+            quantile = q + (1.0 - q) * (u / p)
+        else:
+            quantile = (u - p) / (1.0 - p)
+
+        # Density of the mixture relative to the distribution at that quantile
+        density = (1.0 - p) + (p / (1.0 - q) if quantile >= q else 0.0)
+        return self.distribution.quantile(quantile), 1.0 / density
     
     def _generate_with_probability(self, probability: float) -> int:
         return self.distribution.quantile(probability)
@@ -72,20 +143,43 @@ class FlowSizeGeneratorFactory:
     }
 
     @classmethod
-    def create_generator(cls, config: MainConfig, distribution: Distribution) -> FlowSizeGenerator:
-        if config.traffic.flow_size.type == "bounded_pareto":
-            if not isinstance(config.traffic.flow_size.params, BoundedParetoParams):
+    def create_generator(
+        cls,
+        config: MainConfig,
+        distribution: Distribution,
+        flow_size: FlowSizeConfig | None = None,
+        class_index: int = 0,
+    ) -> FlowSizeGenerator:
+        """
+        flow_size: sizes of a traffic class, traffic.flow_size if unset.
+        class_index: position of that class, 0 for traffic.flow_size, which offsets its seed.
+        """
+        flow_size = flow_size or config.traffic.flow_size
+        seed = QuantileFlowSizeGenerator.DEFAULT_SEED
+        if config.simulation.seed is not None:
+            seed = config.simulation.seed + QuantileFlowSizeGenerator.SEED_OFFSET
+        seed += class_index * TRAFFIC_CLASS_SEED_STRIDE
+
+        if flow_size.type in ("bounded_pareto", "empirical"):
+            if flow_size.type == "bounded_pareto" and not isinstance(flow_size.params, BoundedParetoParams):
                 raise ValueError("Invalid parameters for Bounded Pareto.")
 
-            return QuantileFlowSizeGenerator(distribution)
+            return QuantileFlowSizeGenerator(
+                distribution,
+                seed=seed,
+                antithetic=config.simulation.variance_reduction.antithetic,
+                tail_probability=config.simulation.variance_reduction.tail_probability,
+                tail_quantile=config.simulation.variance_reduction.tail_quantile,
+            )
 
-        elif config.traffic.flow_size.type == "uniform":
+        elif flow_size.type == "uniform":
             return UniformFlowSizeGenerator(
-                min_flow_size=config.traffic.flow_size.params["min_flow_size"],
-                max_flow_size=config.traffic.flow_size.params["max_flow_size"],
+                min_flow_size=flow_size.params["min_flow_size"],
+                max_flow_size=flow_size.params["max_flow_size"],
+                seed=seed,
             )
 
         else:
             raise ValueError(
-                f"Unsupported flow size generator type: {config.traffic.flow_size.type}"
+                f"Unsupported flow size generator type: {flow_size.type}"
             )
@@ -0,0 +1,141 @@
+import csv
+import shutil
+import struct
+from pathlib import Path
+
+import numpy as np
+
+# Binary columnar trace layout:
+#   magic (8 bytes) | record count (uint64) | arrival_time column (float64) | flow_size column (int64)
+TRACE_MAGIC = b"TSTRACE\x01"
+_HEADER = struct.Struct("<8sQ")
+HEADER_SIZE = _HEADER.size
+
+
+class Trace:
+    """
+    Read-only view of a binary flow trace. Columns are memory-mapped, so
+    opening a trace costs the same however many records it holds.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            magic, count = _HEADER.unpack(f.read(HEADER_SIZE))
+        if magic != TRACE_MAGIC:
+            raise ValueError(f"{self.path} is not a flow trace file")
+
+        self.num_flows = count
+        if count == 0:
+            self.arrival_times = np.zeros(0)
+            self.flow_sizes = np.zeros(0, dtype=np.int64)
+            return
+
+        self.arrival_times = np.memmap(
+            self.path, dtype="<f8", mode="r", offset=HEADER_SIZE, shape=(count,)
+        )
+        self.flow_sizes = np.memmap(
+            self.path, dtype="<i8", mode="r", offset=HEADER_SIZE + 8 * count, shape=(count,)
+        )
+
+    def __len__(self) -> int:
+        return self.num_flows
+
+
+class TraceWriter:
+    """
+    Writes a trace chunk by chunk. The arrival column is streamed straight
+    into the trace file and the size column into a side file that is
+    appended on close, so memory use is bounded by the chunk size.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._sizes_path = self.path.with_name(self.path.name + ".sizes.tmp")
+        self._arrivals_file = open(self.path, "wb")
+        self._sizes_file = open(self._sizes_path, "wb")
+        self._arrivals_file.write(_HEADER.pack(TRACE_MAGIC, 0))
+        self.num_flows = 0
+        self._last_arrival = float("-inf")
+
+    def append(self, arrival_times, flow_sizes) -> None:
+        arrival_times = np.asarray(arrival_times, dtype="<f8")
+        flow_sizes = np.asarray(flow_sizes, dtype="<i8")
+        if arrival_times.shape != flow_sizes.shape:
+            raise ValueError("Arrival time and flow size columns must have the same length")
+        if len(arrival_times) == 0:
+            return
+        if arrival_times[0] < self._last_arrival or np.any(np.diff(arrival_times) < 0):
+            raise ValueError("Trace records must be sorted by arrival time")
+
+        self._arrivals_file.write(arrival_times.tobytes())
+        self._sizes_file.write(flow_sizes.tobytes())
+        self.num_flows += len(arrival_times)
+        self._last_arrival = float(arrival_times[-1])
+
+    def close(self) -> None:
+        if self._arrivals_file.closed:
+            return
+
+        self._sizes_file.close()
+        with open(self._sizes_path, "rb") as sizes:
+            shutil.copyfileobj(sizes, self._arrivals_file)
+        self._arrivals_file.seek(0)
+        self._arrivals_file.write(_HEADER.pack(TRACE_MAGIC, self.num_flows))
+        self._arrivals_file.close()
+        self._sizes_path.unlink()
+
+    def __enter__(self) -> "TraceWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+            return
+
+        # Do not leave a half-written trace behind
+        self._arrivals_file.close()
+        self._sizes_file.close()
+        self.path.unlink(missing_ok=True)
+        self._sizes_path.unlink(missing_ok=True)
+
+
+def csv_to_trace(
+    csv_path: str | Path,
+    trace_path: str | Path,
+    arrival_column: str = "arrival_time",
+    size_column: str = "flow_size",
+    chunk_size: int = 1_000_000,
+) -> int:
+    """
+    Convert a CSV file with a header row into a binary trace.
+    Rows must already be sorted by arrival time.
+    Returns the number of records written.
+    """
+    with open(csv_path, newline="") as f, TraceWriter(trace_path) as writer:
+        reader = csv.reader(f)
+        header = next(reader)
+        try:
+            arrival_index = header.index(arrival_column)
+            size_index = header.index(size_column)
+        except ValueError:
+            raise ValueError(
+                f"CSV header must contain '{arrival_column}' and '{size_column}' columns"
+            ) from None
+
+        arrival_times: list[float] = []
+        flow_sizes: list[int] = []
+        for row in reader:
+            if not row:
+                continue
+            arrival_times.append(float(row[arrival_index]))
+            flow_sizes.append(int(float(row[size_index])))
+
+            if len(arrival_times) >= chunk_size:
+                writer.append(arrival_times, flow_sizes)
+                arrival_times, flow_sizes = [], []
+
+        writer.append(arrival_times, flow_sizes)
+
+    return writer.num_flows
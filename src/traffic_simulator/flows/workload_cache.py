@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from traffic_simulator.config.models import MainConfig
+from traffic_simulator.flows.flow_generator import FlowGenerator
+from traffic_simulator.flows.trace import TraceWriter
+
+# Bump when the generators change in a way that alters the flows they produce
+WORKLOAD_FORMAT_VERSION = 1
+
+
+def workload_key(config: MainConfig) -> str:
+    """Content hash of everything that determines the generated flow stream."""
+    workload = {
+        "format_version": WORKLOAD_FORMAT_VERSION,
+        "traffic": config.traffic.model_dump(mode="json"),
+        "duration": config.simulation.duration,
+        "seed": config.simulation.seed,
+        "antithetic": config.simulation.variance_reduction.antithetic,
+    }
+    # Empirical flow sizes change with the contents of their CDF files
+    cdf_paths = [Path(path) for path in config.traffic.empirical_cdf_paths() if Path(path).exists()]
+    if cdf_paths:
+        workload["cdf_files"] = [path.read_text() for path in cdf_paths]
+    encoded = json.dumps(workload, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+class WorkloadCache:
+    """
+    Stores generated flow streams as binary traces keyed by workload_key,
+    so runs that share a workload replay identical flows (common random
+    numbers) and the generation cost is paid once per workload.
+    """
+
+    def __init__(self, cache_dir: str | Path, chunk_size: int = 65536):
+        self.cache_dir = Path(cache_dir)
+        self.chunk_size = chunk_size
+
+    def trace_path(self, config: MainConfig) -> Path:
+        return self.cache_dir / f"{workload_key(config)}.trace"
+
+    def get_or_create(self, config: MainConfig, flow_generator: FlowGenerator) -> Path:
+        """
+        Return the trace of the config's workload, generating it with
+        flow_generator on a cache miss.
+        """
+        path = self.trace_path(config)
+        if path.exists():
+            return path
+
+        # Write under a temporary name so concurrent runs never see a partial trace
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with TraceWriter(tmp_path) as writer:
+            arrival_times: list[float] = []
+            flow_sizes: list[int] = []
+            for flow in flow_generator.generate_flows(0, config.simulation.duration):
+                arrival_times.append(flow.arrival_time)
+                flow_sizes.append(flow.flow_size)
+                if len(arrival_times) >= self.chunk_size:
+                    writer.append(arrival_times, flow_sizes)
+                    arrival_times, flow_sizes = [], []
+            writer.append(arrival_times, flow_sizes)
+
+        # Human readable description of the cached workload
+        description = {
+            "traffic": config.traffic.model_dump(mode="json"),
+            "duration": config.simulation.duration,
+            "seed": config.simulation.seed,
+            "num_flows": writer.num_flows,
+        }
+        path.with_suffix(".json").write_text(json.dumps(description, indent=2))
+        os.replace(tmp_path, path)
+
+        return path
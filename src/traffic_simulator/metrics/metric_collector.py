@@ -1,4 +1,9 @@
 from abc import ABC, abstractmethod
+import math
+
+import numpy as np
+
+from traffic_simulator.ports.link import LinkStateStore
 
 
 class MetricCollector(ABC):
@@ -13,6 +18,18 @@ class MetricCollector(ABC):
         """Return a metric value given a link context and current time"""
         pass
 
+    def collect_all(
+        self, state: LinkStateStore, indices: np.ndarray, current_time: float
+    ) -> np.ndarray:
+        """
+        Return the metric for every link in `indices` at once.
+        Default implementation falls back to collect() for each link.
+        """
+        return np.array(
+            [self.collect(state.links[index], current_time) for index in indices],
+            dtype=np.float64,
+        )
+
 
 class UtilizationCollector(MetricCollector):
     @property
@@ -24,26 +41,114 @@ class UtilizationCollector(MetricCollector):
             return 0.0
 
         total_busy = sum(
-            min(flow.end_time, current_time) - max(flow.start_time, 0.0)
-            for flow in link.flows
-            if flow.end_time > 0.0 and flow.start_time < current_time
+            weight * (min(end, current_time) - max(start, 0.0))
+            for start, end, weight in link.busy_periods()
+            if end > 0.0 and start < current_time
         )
 
         return total_busy / current_time
 
+    def collect_all(
+        self, state: LinkStateStore, indices: np.ndarray, current_time: float
+    ) -> np.ndarray:
+        # Samples are taken at or after the latest processed event, so every
+        # completed flow ended before current_time and counts in full.
+        if current_time <= 0:
+            return np.zeros(len(indices))
+        return state.busy_time[indices] / current_time
+
+
+class WindowedUtilizationCollector(MetricCollector):
+    """Utilization over the sliding window of each link's time_window_duration"""
 
-class BufferOccupancyCollector(MetricCollector):
     @property
     def name(self) -> str:
-        return "buffer_occupancy"
+        return "windowed_link_utilization"
+
+    def collect(self, link, current_time: float) -> float:
+        if current_time <= 0:
+            return 0.0
+
+        window_start = max(current_time - link.state.time_window[link.index], 0.0)
+        total_busy = sum(
+            weight * max(min(end, current_time) - max(start, window_start), 0.0)
+            for start, end, weight in link.busy_periods()
+        )
+
+        return total_busy / (current_time - window_start)
+
+    def collect_all(
+        self, state: LinkStateStore, indices: np.ndarray, current_time: float
+    ) -> np.ndarray:
+        if current_time <= 0:
+            return np.zeros(len(indices))
+
+        time_window = state.time_window[indices]
+        window_start = current_time - time_window
+
+        # Only links whose oldest interval left the window need eviction
+        has_intervals = state.window_count[indices] > 0
+        stale = has_intervals & (state.window_head_end[indices] <= window_start)
+        if stale.any():
+            for index in indices[stale]:
+                state.evict_window(int(index), current_time)
+            has_intervals = state.window_count[indices] > 0
+
+        # The oldest interval may straddle the start of the window
+        head_start = state.window_head_start[indices]
+        head_length = state.window_head_end[indices] - head_start
+        cut = np.where(
+            has_intervals,
+            state.window_head_weight[indices]
+            * np.clip(window_start - head_start, 0.0, head_length),
+            0.0,
+        )
+
+        return (state.window_busy[indices] - cut) / np.minimum(time_window, current_time)
+
+
+class EwmaUtilizationCollector(MetricCollector):
+    """Exponentially weighted utilization with each link's time_window_duration as time constant"""
+
+    @property
+    def name(self) -> str:
+        return "ewma_link_utilization"
 
     def collect(self, link, current_time: float) -> float:
+        time_constant = link.state.time_window[link.index]
         return sum(
-            link._get_remaining_flow_size(flow, current_time)
-            for flow in link.queue
-            if flow.end_time > current_time
+            weight
+            * (
+                math.exp(-(current_time - end) / time_constant)
+                - math.exp(-(current_time - start) / time_constant)
+            )
+            for start, end, weight in link.busy_periods()
         )
 
+    def collect_all(
+        self, state: LinkStateStore, indices: np.ndarray, current_time: float
+    ) -> np.ndarray:
+        elapsed = current_time - state.ewma_time[indices]
+        return state.ewma_utilization[indices] * np.exp(-elapsed / state.time_window[indices])
+
+
+class BufferOccupancyCollector(MetricCollector):
+    @property
+    def name(self) -> str:
+        return "buffer_occupancy"
+
+    def collect(self, link, current_time: float) -> float:
+        # Scheduled and processor-sharing links keep their flows outside link.queue
+        return link.remaining_bytes(current_time)
+
+    def collect_all(
+        self, state: LinkStateStore, indices: np.ndarray, current_time: float
+    ) -> np.ndarray:
+        # Only the flow at the head of the queue can be partially transmitted
+        served = np.maximum(current_time - state.head_start[indices], 0.0)
+        occupancy = state.queued_bytes[indices] - served * state.capacity[indices]
+        return np.where(state.queued_flows[indices] > 0, occupancy, 0.0)
+
 
 class FlowCompletionTimeCollector(MetricCollector):
     @property
@@ -60,3 +165,21 @@ class FlowCompletionTimeCollector(MetricCollector):
             if flow.end_time > 0.0
         ) / len(link.flows)
 
+    def collect_all(
+        self, state: LinkStateStore, indices: np.ndarray, current_time: float
+    ) -> np.ndarray:
+        completed = state.completed_flows[indices]
+        return np.divide(
+            state.fct_sum[indices],
+            completed,
+            out=np.zeros(len(indices)),
+            where=completed > 0,
+        )
+
+
+# Utilization metric used for each MetricsConfig.utilization mode
+UTILIZATION_METRICS = {
+    "cumulative": "link_utilization",
+    "sliding_window": "windowed_link_utilization",
+    "ewma": "ewma_link_utilization",
+}
@@ -1,56 +1,185 @@
-from typing import Any
+import numpy as np
 
-from traffic_simulator.ports.link import Link
+from traffic_simulator.ports.link import Link, LinkStateStore
 from traffic_simulator.metrics.metric_collector import (
     BufferOccupancyCollector,
+    EwmaUtilizationCollector,
     FlowCompletionTimeCollector,
     MetricCollector,
     UtilizationCollector,
+    WindowedUtilizationCollector,
 )
+from traffic_simulator.metrics.telemetry import TelemetrySnapshot
 
 
 class MetricsManager:
-    def __init__(self):
+    """Samples registered metrics for a group of links into (time, link) arrays"""
+
+    def __init__(self, num_links: int, initial_capacity: int = 1024, reference: bool = False):
+        """reference: sample with each collector's per-link collect() instead of its vectorized collect_all()."""
+        self.num_links = num_links
+        self.reference = reference
+        self.num_samples = 0
         self._collectors: dict[str, MetricCollector] = {}
-        self.samples: dict[str, list[tuple[float, float]]] = {}
+        self._times = np.zeros(initial_capacity)
+        self._values: dict[str, np.ndarray] = {}
 
     def register(self, collector: MetricCollector) -> None:
         self._collectors[collector.name] = collector
-        self.samples[collector.name] = []
+        self._values[collector.name] = np.zeros((len(self._times), self.num_links))
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self._times)
+        self._times = np.resize(self._times, capacity)
+        for name, values in self._values.items():
+            grown = np.zeros((capacity, self.num_links))
+            grown[: self.num_samples] = values[: self.num_samples]
+            self._values[name] = grown
+
+    def sample_all(
+        self, state: LinkStateStore, indices: np.ndarray, timestamp: float
+    ) -> None:
+        if self.num_samples == len(self._times):
+            self._grow()
+
+        row = self.num_samples
+        self._times[row] = timestamp
+        for name, collector in self._collectors.items():
+            if self.reference:
+                values = MetricCollector.collect_all(collector, state, indices, timestamp)
+            else:
+                values = collector.collect_all(state, indices, timestamp)
+            self._values[name][row] = values
+        self.num_samples += 1
+
+    def append_samples(self, times: np.ndarray, values: dict[str, np.ndarray]) -> None:
+        """Append precomputed samples: sample times and a (time, link) array per metric"""
+        count = len(times)
+        while self.num_samples + count > len(self._times):
+            self._grow()
 
-    def sample_all(self, link: Any, timestamp: float) -> None:
-        for collector in self._collectors.values():
-            value = collector.collect(link, timestamp)
-            self.samples[collector.name].append((timestamp, value))
+        rows = slice(self.num_samples, self.num_samples + count)
+        self._times[rows] = times
+        for name, series in values.items():
+            self._values[name][rows] = series
+        self.num_samples += count
+
+    def times(self) -> np.ndarray:
+        return self._times[: self.num_samples]
+
+    def values(self, metric_name: str) -> np.ndarray | None:
+        if metric_name not in self._values:
+            return None
+        return self._values[metric_name][: self.num_samples]
 
 
 class LinkMetricsTracker:
-    def __init__(self, sample_interval: float = 1.0):
+    def __init__(
+        self,
+        sample_interval: float = 1.0,
+        telemetry_delay: float = 0.0,
+        reference: bool = False,
+    ):
         self.sample_interval = sample_interval
-        self.link_metrics: dict[Link, MetricsManager] = {}
-        self.last_sample_times: dict[Link, float] = {}
+        self.reference = reference  # Sample with the straightforward per-link collectors
+        self.links: list[Link] = []
+        self.last_sample_time: float = 0.0
+
+        # What the strategies see, refreshed whenever time advances
+        self.telemetry = TelemetrySnapshot(telemetry_delay)
+
+        self._state: LinkStateStore | None = None
+        self._indices = np.zeros(0, dtype=np.int64)
+        self._columns: dict[Link, int] = {}
+        self._metrics_manager: MetricsManager | None = None
 
     def register_link(self, link: Link) -> None:
         """Register a new link to track metrics for"""
-        metrics_manager = MetricsManager()
-        metrics_manager.register(UtilizationCollector())
-        metrics_manager.register(BufferOccupancyCollector())
-        metrics_manager.register(FlowCompletionTimeCollector())
+        if self._metrics_manager is not None:
+            raise ValueError("Links must be registered before sampling starts")
+        if self._state is None:
+            self._state = link.state
+        elif link.state is not self._state:
+            raise ValueError("All tracked links must share one LinkStateStore")
+
+        self._columns[link] = len(self.links)
+        self.links.append(link)
+        self._indices = np.append(self._indices, link.index)
 
-        self.link_metrics[link] = metrics_manager
-        self.last_sample_times[link] = 0.0
+    def _get_metrics_manager(self) -> MetricsManager:
+        if self._metrics_manager is None:
+            metrics_manager = MetricsManager(len(self.links), reference=self.reference)
+            metrics_manager.register(UtilizationCollector())
+            metrics_manager.register(WindowedUtilizationCollector())
+            metrics_manager.register(EwmaUtilizationCollector())
+            metrics_manager.register(BufferOccupancyCollector())
+            metrics_manager.register(FlowCompletionTimeCollector())
+            self._metrics_manager = metrics_manager
+        return self._metrics_manager
+
+    @property
+    def sample_count(self) -> int:
+        """Number of sample ticks taken so far"""
+        if self._metrics_manager is None:
+            return 0
+        return self._metrics_manager.num_samples
 
     def sample_metrics(self, current_time: float) -> None:
         """Sample metrics for all registered links"""
-        for link, metrics_manager in self.link_metrics.items():
-            last_sample = self.last_sample_times[link]
-            while last_sample < current_time:
-                metrics_manager.sample_all(link, last_sample)
-                last_sample += self.sample_interval
-            self.last_sample_times[link] = last_sample
+        if not self.links:
+            return
+
+        metrics_manager = self._get_metrics_manager()
+        last_sample = self.last_sample_time
+        while last_sample < current_time:
+            metrics_manager.sample_all(self._state, self._indices, last_sample)
+            last_sample += self.sample_interval
+        self.last_sample_time = last_sample
+
+        self.telemetry.refresh(metrics_manager, current_time)
+
+    def record_samples(self, times: np.ndarray, values: dict[str, np.ndarray]) -> None:
+        """
+        Record samples computed outside the event loop, e.g. by an approximate
+        engine. values holds a (time, link) array per metric, columns in
+        registration order; metrics left out are recorded as zero.
+        """
+        if len(times) == 0:
+            return
+
+        self._get_metrics_manager().append_samples(times, values)
+        self.last_sample_time = float(times[-1]) + self.sample_interval
+
+    def get_metric_names(self) -> list[str]:
+        """Names of the sampled metrics"""
+        return list(self._get_metrics_manager()._values)
+
+    def get_columns(self, links: list[Link]) -> np.ndarray:
+        """Column of each link in the sampled metric arrays"""
+        return np.array([self._columns[link] for link in links], dtype=np.int64)
+
+    def get_latest_values(self, metric_name: str) -> np.ndarray | None:
+        """Most recent sample of a metric for every link, or None if nothing was sampled"""
+        if self.sample_count == 0:
+            return None
+        return self._metrics_manager.values(metric_name)[-1]
+
+    def get_metric_series(self, metric_name: str) -> tuple[np.ndarray, np.ndarray]:
+        """Sample times and a (time, link) array of values for a metric"""
+        if self.sample_count == 0:
+            return np.zeros(0), np.zeros((0, len(self.links)))
+        return (
+            self._metrics_manager.times(),
+            self._metrics_manager.values(metric_name),
+        )
 
     def get_link_metric_samples(self, link: Link, metric_name: str):
         """Get samples for a specific metric from a specific link"""
-        if link in self.link_metrics:
-            return self.link_metrics[link].samples.get(metric_name, [])
-        return []
+        if link not in self._columns or self.sample_count == 0:
+            return []
+        values = self._metrics_manager.values(metric_name)
+        if values is None:
+            return []
+        times = self._metrics_manager.times()
+        column = values[:, self._columns[link]]
+        return list(zip(times.tolist(), column.tolist()))
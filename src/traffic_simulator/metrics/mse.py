@@ -10,6 +10,7 @@ def calculate_mse(
     links: List[Link],
     link_configs: List[LinkConfig],
     current_time: float,
+    metric_name: str = "link_utilization",
 ) -> float:
     """
     Calculate Mean Square Error between target and actual link utilizations.
@@ -19,29 +20,23 @@ def calculate_mse(
         links: List of Link objects
         link_configs: List of LinkConfig objects containing target utilizations
         current_time: Current simulation time
+        metric_name: Utilization metric to compare against the targets
 
     Returns:
         float: Mean Square Error value
     """
-    squared_errors = []
-
-    for link, config in zip(links, link_configs):
-        # Get actual utilization from the metrics tracker
-        samples = metrics_tracker.get_link_metric_samples(link, "link_utilization")
-        if not samples:
-            continue
-        actual_utilization = samples[-1][1]  # Get latest sample
-        target_utilization = config.target_utilization
-
-        # Calculate squared error
-        error = actual_utilization - target_utilization
-        squared_errors.append(error**2)
-
-    if not squared_errors:
+    # Get actual utilization of every link from the latest tracker sample
+    latest = metrics_tracker.get_latest_values(metric_name)
+    if latest is None or not links:
         return 0.0
+    actual_utilizations = latest[metrics_tracker.get_columns(links)]
+    target_utilizations = np.array(
+        [config.target_utilization for config in link_configs[: len(links)]]
+    )
 
     # Calculate mean of squared errors
-    mse = np.mean(squared_errors)
+    errors = actual_utilizations[: len(target_utilizations)] - target_utilizations
+    mse = np.mean(errors**2)
     return mse
 
 
@@ -50,6 +45,7 @@ def calculate_per_link_errors(
     links: List[Link],
     link_configs: List[LinkConfig],
     current_time: float,
+    metric_name: str = "link_utilization",
 ) -> Dict[str, float]:
     """
     Calculate squared error for each link individually.
@@ -59,22 +55,20 @@ def calculate_per_link_errors(
         links: List of Link objects
         link_configs: List of LinkConfig objects containing target utilizations
         current_time: Current simulation time
+        metric_name: Utilization metric to compare against the targets
 
     Returns:
         Dict[str, float]: Dictionary mapping link IDs to their squared errors
     """
     errors = {}
 
-    for link, config in zip(links, link_configs):
-        samples = metrics_tracker.get_link_metric_samples(link, "link_utilization")
-        if not samples:
-            errors[config.id] = 0.0
-            continue
-
-        actual_utilization = samples[-1][1]  # Get latest sample
-        target_utilization = config.target_utilization
+    latest = metrics_tracker.get_latest_values(metric_name)
+    if latest is None:
+        return {config.id: 0.0 for _, config in zip(links, link_configs)}
 
-        error = actual_utilization - target_utilization
-        errors[config.id] = error**2
+    actual_utilizations = latest[metrics_tracker.get_columns(links)]
+    for actual_utilization, config in zip(actual_utilizations, link_configs):
+        error = actual_utilization - config.target_utilization
+        errors[config.id] = float(error**2)
 
     return errors
@@ -0,0 +1,54 @@
+import numpy as np
+
+
+class TelemetrySnapshot:
+    """
+    Link metrics as the load balancing strategies see them.
+
+    The snapshot advances once per sample tick instead of being rebuilt per
+    routing decision, and only exposes samples taken at least `delay` seconds
+    ago, modelling the lag of real switch telemetry. With no delay it shows
+    the most recent sample.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        if delay < 0:
+            raise ValueError("Telemetry delay must be non-negative")
+        self.delay = delay
+        self.sample_index = -1  # Row of the sample currently visible
+        self.sample_time: float | None = None
+
+        self._metrics_manager = None
+        self._rows: dict[str, np.ndarray] = {}
+
+    def refresh(self, metrics_manager, current_time: float) -> None:
+        """Expose the latest sample of metrics_manager taken at or before current_time - delay"""
+        self._metrics_manager = metrics_manager
+
+        times = metrics_manager.times()
+        horizon = current_time - self.delay
+        visible = self.sample_index
+        while visible + 1 < len(times) and times[visible + 1] <= horizon:
+            visible += 1
+
+        if visible != self.sample_index:
+            self.sample_index = visible
+            self.sample_time = float(times[visible])
+            self._rows.clear()
+
+    def values(self, metric_name: str) -> np.ndarray | None:
+        """Visible sample of a metric for every tracked link, or None before the first one"""
+        if self.sample_index < 0:
+            return None
+
+        row = self._rows.get(metric_name)
+        if row is None:
+            row = self._metrics_manager.values(metric_name)[self.sample_index]
+            self._rows[metric_name] = row
+        return row
+
+    def staleness(self, current_time: float) -> float:
+        """Age of the visible sample at current_time"""
+        if self.sample_time is None:
+            return float("inf")
+        return current_time - self.sample_time
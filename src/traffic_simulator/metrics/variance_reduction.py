@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class ControlVariateEstimate:
+    """A mean estimated from batch means, before and after control-variate correction"""
+
+    mean: float
+    std_error: float
+    corrected_mean: float
+    corrected_std_error: float
+    beta: float  # Coefficient of the control in the correction
+    variance_reduction: float  # Variance of the plain estimate over the corrected one
+
+
+def batch_means(values: np.ndarray, num_batches: int) -> np.ndarray:
+    """
+    Means of num_batches consecutive, equally sized batches of values. Batching
+    absorbs the correlation between neighbouring flows that share a queue.
+    """
+    batch_size = len(values) // num_batches
+    if batch_size == 0:
+        raise ValueError(f"Need at least {num_batches} values to form {num_batches} batches")
+    return values[: batch_size * num_batches].reshape(num_batches, batch_size).mean(axis=1)
+
+
+def control_variate(
+    outputs: np.ndarray,
+    controls: np.ndarray,
+    control_mean: float,
+    num_batches: int = 20,
+) -> ControlVariateEstimate:
+    """
+    Estimate the mean of outputs, corrected by how far the controls, whose
+    true mean is known, strayed from control_mean in this run.
+    """
+    output_batches = batch_means(outputs, num_batches)
+    control_batches = batch_means(controls, num_batches)
+
+    control_variance = np.var(control_batches, ddof=1)
+    if control_variance > 0:
+        beta = np.cov(output_batches, control_batches)[0, 1] / control_variance
+    else:
+        beta = 0.0
+    corrected = output_batches - beta * (control_batches - control_mean)
+
+    variance = np.var(output_batches, ddof=1)
+    # One more degree of freedom is spent estimating beta
+    corrected_variance = np.sum((corrected - corrected.mean()) ** 2) / (num_batches - 2)
+
+    return ControlVariateEstimate(
+        mean=float(output_batches.mean()),
+        std_error=float(np.sqrt(variance / num_batches)),
+        corrected_mean=float(corrected.mean()),
+        corrected_std_error=float(np.sqrt(corrected_variance / num_batches)),
+        beta=float(beta),
+        variance_reduction=float(variance / corrected_variance) if corrected_variance > 0 else float("inf"),
+    )
+
+
+def antithetic_reduction(values: np.ndarray) -> float:
+    """
+    Variance reduction of the mean achieved by antithetic pairs (0, 1), (2, 3), ...
+
+    Neighbouring flows are correlated anyway when they share queues, so the
+    correlation within pairs is compared with the correlation across pair
+    boundaries, (1, 2), (3, 4), ..., which has the same queueing but no
+    antithetic coupling.
+    """
+    count = len(values) // 2 * 2
+    if count < 6:
+        return 1.0
+    firsts, seconds = values[0:count:2], values[1:count:2]
+    within = np.corrcoef(firsts, seconds)[0, 1]
+    across = np.corrcoef(seconds[:-1], firsts[1:])[0, 1]
+    return float((1.0 + across) / (1.0 + within))
+
+
+def weighted_quantile(values: np.ndarray, weights: np.ndarray, q: float) -> float:
+    """Quantile q of values, each counted with its importance sampling weight"""
+    order = np.argsort(values)
+    cumulative = np.cumsum(weights[order])
+    position = np.searchsorted(cumulative, q * cumulative[-1])
+    return float(values[order][min(position, len(values) - 1)])
+
+
+def effective_sample_size(weights: np.ndarray) -> float:
+    """Number of unweighted samples that would give the same variance"""
+    return float(weights.sum() ** 2 / np.sum(weights**2))
@@ -24,3 +24,9 @@ class FlowArrivalEvent(Event):
 class FlowCompletionEvent(Event):
     flow: Flow
     link: Link
+    # Service period of the link the event ends; cancelled once the link's token moves on
+    token: int = 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token != self.link.token
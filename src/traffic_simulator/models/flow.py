@@ -8,3 +8,7 @@ class Flow:
     flow_size: int
     start_time: float = 0.0
     end_time: float = 0.0
+    # Likelihood ratio of the flow's size under importance sampling, 1 otherwise
+    weight: float = 1.0
+    # Name of the flow's traffic class when several are mixed, None otherwise
+    traffic_class: str | None = None
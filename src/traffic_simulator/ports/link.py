@@ -1,37 +1,247 @@
 import collections
-from typing import Deque, List
+import heapq
+import math
+from typing import Deque, Iterable, List, Sequence
+
+import numpy as np
 
 from traffic_simulator.models.flow import Flow
+from traffic_simulator.ports.queue_discipline import (
+    FifoDiscipline,
+    ProcessorSharingDiscipline,
+    QueueDiscipline,
+)
+
+
+class LinkStateStore:
+    """
+    Structure-of-arrays storage for the state of a group of links.
+    Every array is indexed by link id, so metric collectors and strategies
+    can operate on all links at once instead of looping over Link objects.
+    """
+
+    def __init__(
+        self,
+        capacities: Sequence[float],
+        time_windows: Sequence[float] | None = None,
+        buffer_capacities: Sequence[float | None] | None = None,
+        shared_buffer: float | None = None,
+    ):
+        """
+        buffer_capacities: bytes each link can hold waiting behind the flow
+        in service, None for an infinite buffer.
+        shared_buffer: bytes all links can hold waiting together, None for no limit.
+        """
+        self.capacity = np.array(capacities, dtype=np.float64)
+        num_links = len(self.capacity)
+
+        self.busy_until = np.zeros(num_links)  # Time until queued work completes
+        self.queued_bytes = np.zeros(num_links)  # Size of flows waiting or in service
+        self.queued_flows = np.zeros(num_links, dtype=np.int64)
+        self.head_start = np.zeros(num_links)  # Start time of the flow in service
+        # Transmission time of completed flows, each weighted by its likelihood
+        # ratio, which unbiases it as it only depends on the flow's own size
+        self.busy_time = np.zeros(num_links)
+        # Completion times depend on the other flows' sizes too, so they are not weighted
+        self.fct_sum = np.zeros(num_links)  # Sum of completion times of completed flows
+        self.completed_flows = np.zeros(num_links, dtype=np.int64)
+
+        # Finite buffers: flows that do not fit behind the one in service are tail-dropped
+        self.buffer_capacity = np.full(num_links, np.inf)
+        if buffer_capacities is not None:
+            self.buffer_capacity[:] = [np.inf if c is None else c for c in buffer_capacities]
+        self.shared_buffer = np.inf if shared_buffer is None else float(shared_buffer)
+        # Buffered bytes are only tracked when some buffer is finite
+        self.bounded = bool(np.isfinite(self.buffer_capacity).any() or np.isfinite(self.shared_buffer))
+        self.buffered_bytes = np.zeros(num_links)  # Size of the flows waiting for service
+        self.buffered_total = 0.0  # Buffered bytes of all links, held in the shared pool
+        self.dropped_flows = np.zeros(num_links, dtype=np.int64)
+        self.dropped_bytes = np.zeros(num_links)
+
+        # Windowed utilization: busy intervals of completed flows inside each
+        # link's time window, plus an EWMA whose time constant is the window.
+        if time_windows is None:
+            self.time_window = np.full(num_links, np.inf)
+        else:
+            self.time_window = np.array(time_windows, dtype=np.float64)
+        self.window_intervals: List[Deque[tuple[float, float, float]]] = [
+            collections.deque() for _ in range(num_links)
+        ]
+        self.window_busy = np.zeros(num_links)  # Busy time of intervals in the window
+        self.window_count = np.zeros(num_links, dtype=np.int64)
+        self.window_head_start = np.zeros(num_links)  # Oldest interval in the window
+        self.window_head_end = np.zeros(num_links)
+        self.window_head_weight = np.zeros(num_links)
+        self.ewma_utilization = np.zeros(num_links)
+        self.ewma_time = np.zeros(num_links)  # Time the EWMA was last updated
+
+        self.links: List["Link"] = [None] * num_links
+
+    def __len__(self) -> int:
+        return len(self.capacity)
+
+    def record_busy_interval(
+        self, index: int, start: float, end: float, weight: float = 1.0
+    ) -> None:
+        """Account a completed transmission in the windowed utilization state."""
+        intervals = self.window_intervals[index]
+        intervals.append((start, end, weight))
+        self.window_busy[index] += weight * (end - start)
+        self.window_count[index] += 1
+        if len(intervals) == 1:
+            self.window_head_start[index] = start
+            self.window_head_end[index] = end
+            self.window_head_weight[index] = weight
+        self.evict_window(index, end)
+
+        # Decay over the idle gap and the busy interval, then add the busy share
+        time_constant = self.time_window[index]
+        idle_decay = math.exp(-(start - self.ewma_time[index]) / time_constant)
+        busy_decay = math.exp(-(end - start) / time_constant)
+        self.ewma_utilization[index] = (
+            self.ewma_utilization[index] * idle_decay * busy_decay + weight * (1.0 - busy_decay)
+        )
+        self.ewma_time[index] = end
+
+    def evict_window(self, index: int, current_time: float) -> None:
+        """Drop busy intervals that ended before the window starting at current_time - window."""
+        window_start = current_time - self.time_window[index]
+        intervals = self.window_intervals[index]
+        while intervals and intervals[0][1] <= window_start:
+            start, end, weight = intervals.popleft()
+            self.window_busy[index] -= weight * (end - start)
+            self.window_count[index] -= 1
+
+        if intervals:
+            (
+                self.window_head_start[index],
+                self.window_head_end[index],
+                self.window_head_weight[index],
+            ) = intervals[0]
+        else:
+            self.window_busy[index] = 0.0
+            self.window_head_start[index] = self.window_head_end[index] = 0.0
+            self.window_head_weight[index] = 0.0
+
+
+def create_links(
+    capacities: Sequence[float],
+    time_windows: Sequence[float] | None = None,
+    buffer_capacities: Sequence[float | None] | None = None,
+    shared_buffer: float | None = None,
+    discipline: QueueDiscipline | None = None,
+) -> list["Link"]:
+    """
+    Create links that share a single LinkStateStore, one per capacity.
+    Links serve their flows FIFO unless a discipline is given.
+    """
+    state = LinkStateStore(capacities, time_windows, buffer_capacities, shared_buffer)
+    if discipline is None or isinstance(discipline, FifoDiscipline):
+        return [
+            Link(capacity_bps=capacity, state=state, index=index)
+            for index, capacity in enumerate(capacities)
+        ]
+    if state.bounded:
+        raise ValueError("Finite buffers need FIFO links")
+    link_class = ScheduledLink
+    if isinstance(discipline, ProcessorSharingDiscipline):
+        link_class = ProcessorSharingLink
+    return [
+        link_class(capacity_bps=capacity, discipline=discipline, state=state, index=index)
+        for index, capacity in enumerate(capacities)
+    ]
 
 
 class Link:
-    def __init__(self, capacity_bps: float):
-        self.capacity_bps = capacity_bps  # Link capacity in bits per second
-        self.queue: Deque[Flow] = collections.deque()  # Infinite buffer queue
+    # FIFO links schedule every completion at enqueue, so their completion events stay valid
+    discipline: QueueDiscipline | None = None
+    token = 0
+    # Flow the link's next completion event is for, on links that hand out one at a time
+    serving: Flow | None = None
+
+    def __init__(
+        self,
+        capacity_bps: float,
+        state: LinkStateStore | None = None,
+        index: int = 0,
+    ):
+        if state is None:
+            state = LinkStateStore([capacity_bps])
+            index = 0
+
+        # The link's scalar state lives in the shared store at this index
+        self.state = state
+        self.index = index
+        self.state.links[index] = self
 
-        self.busy_until: float = 0.0  # Time until current transmission completes
+        # Flow in service followed by the waiting ones, bounded by the buffer capacities
+        self.queue: Deque[Flow] = collections.deque()
         self.flows: List[Flow] = []
 
-    def enqueue_flow(self, flow: Flow, current_time: float) -> float:
+    @property
+    def capacity_bps(self) -> float:
+        """Link capacity in bits per second"""
+        return float(self.state.capacity[self.index])
+
+    @property
+    def busy_until(self) -> float:
+        """Time until current transmission completes"""
+        return float(self.state.busy_until[self.index])
+
+    @busy_until.setter
+    def busy_until(self, value: float) -> None:
+        self.state.busy_until[self.index] = value
+
+    def admits(self, flow: Flow) -> bool:
+        """
+        Whether the flow fits in the buffer: an idle link always takes it into
+        service, otherwise it waits in this link's buffer and the shared pool.
+        """
+        if not self.queue:
+            return True
+        state, index = self.state, self.index
+        size = flow.flow_size
+        return (
+            state.buffered_bytes[index] + size <= state.buffer_capacity[index]
+            and state.buffered_total + size <= state.shared_buffer
+        )
+
+    def enqueue_flow(self, flow: Flow, current_time: float) -> float | None:
         """
         Enqueue a flow (packet) and schedule its transmission.
         The flow's start and end times are determined based on the link's current busy state.
         Also, record the flow to get the stats at end of simulation.
-        Returns the scheduled end_time (i.e. when transmission completes).
+        Returns the scheduled end_time (i.e. when transmission completes),
+        or None if the buffer is full and the flow is dropped.
         """
-        transmission_time = flow.flow_size / self.capacity_bps
+        state, index = self.state, self.index
+        if state.bounded:
+            if not self.admits(flow):
+                state.dropped_flows[index] += 1
+                state.dropped_bytes[index] += flow.flow_size
+                return None
+            if self.queue:
+                state.buffered_bytes[index] += flow.flow_size
+                state.buffered_total += flow.flow_size
+
+        transmission_time = flow.flow_size / float(state.capacity[index])
+        busy_until = float(state.busy_until[index])
 
-        if not self.queue and current_time >= self.busy_until:
+        if not self.queue and current_time >= busy_until:
             # Link is idle; transmit immediately.
             flow.start_time = current_time
             flow.end_time = current_time + transmission_time
         else:
             # Link is busy; schedule after current busy period.
-            flow.start_time = self.busy_until
-            flow.end_time = self.busy_until + transmission_time
+            flow.start_time = busy_until
+            flow.end_time = busy_until + transmission_time
 
         # Update the link's busy state and record the busy interval.
-        self.busy_until = flow.end_time
+        state.busy_until[index] = flow.end_time
+        if not self.queue:
+            state.head_start[index] = flow.start_time
+        state.queued_bytes[index] += flow.flow_size
+        state.queued_flows[index] += 1
 
         self.queue.append(flow)
 
@@ -46,12 +256,321 @@ class Link:
             flow = self.queue.popleft()
             self.flows.append(flow)
 
+            state, index = self.state, self.index
+            state.queued_bytes[index] -= flow.flow_size
+            state.queued_flows[index] -= 1
+            if self.queue:
+                state.head_start[index] = self.queue[0].start_time
+                if state.bounded:
+                    # The next flow leaves the buffer for service
+                    state.buffered_bytes[index] -= self.queue[0].flow_size
+                    state.buffered_total -= self.queue[0].flow_size
+            state.busy_time[index] += flow.weight * (flow.end_time - flow.start_time)
+            state.fct_sum[index] += flow.end_time - flow.arrival_time
+            state.completed_flows[index] += 1
+            state.record_busy_interval(index, flow.start_time, flow.end_time, flow.weight)
+
             return flow
 
         return None
 
+    def complete_flow(self, current_time: float) -> float | None:
+        """
+        Handle the completion event of the flow in service. Returns the end
+        time of the flow that takes over, whose completion event the caller
+        schedules, or None if nothing new needs one.
+        """
+        self.dequeue_flow(current_time)
+        return None
+
     def _get_remaining_flow_size(self, flow: Flow, current_time: float) -> float:
         """Calculates remaining flow size"""
         if flow.start_time >= current_time:
             return flow.flow_size
         return flow.flow_size - (current_time - flow.start_time) * self.capacity_bps
+
+    def busy_periods(self) -> Iterable[tuple[float, float, float]]:
+        """Start, end and importance sampling weight of every completed service period"""
+        # A FIFO link serves each flow in one piece
+        return ((flow.start_time, flow.end_time, flow.weight) for flow in self.flows)
+
+    def remaining_bytes(self, current_time: float) -> float:
+        """Bytes the link's flows still have to transmit at current_time, from its own queue"""
+        return sum(
+            self._get_remaining_flow_size(flow, current_time)
+            for flow in self.queue
+            if flow.end_time > current_time
+        )
+
+
+class ScheduledLink(Link):
+    """
+    Link serving its flows in the order of a queue discipline, one at a time
+    at full capacity, preempting the flow in service when a flow with a
+    smaller key arrives. Waiting flows are kept in a heap by key rather than
+    in queue, which stays empty.
+
+    End times are only known once a flow is served without interruption, so
+    the link hands out one completion event at a time, for the flow in
+    service. Each service period gets a new token; a completion event whose
+    token is no longer the link's was cancelled by a preemption and is
+    skipped when popped, instead of being removed from the event heap.
+
+    The state store is kept as for a FIFO link: queued_bytes holds the bytes
+    left at head_start, the start of the current service period, and busy
+    time is accounted per service period. busy_until stays the time the
+    link's work runs out, since every discipline is work-conserving.
+    """
+
+    def __init__(
+        self,
+        capacity_bps: float,
+        discipline: QueueDiscipline,
+        state: LinkStateStore | None = None,
+        index: int = 0,
+    ):
+        if isinstance(discipline, ProcessorSharingDiscipline):
+            raise ValueError("Processor sharing needs a ProcessorSharingLink")
+        super().__init__(capacity_bps, state, index)
+        self.discipline = discipline
+        self.token = 0
+        self.serving: Flow | None = None
+        self._serving_order = 0  # Arrival order of the flow in service
+        self._serving_remaining = 0.0  # Its bytes left at head_start
+        # Key, arrival order, bytes left and flow of each waiting flow
+        self._waiting: list[tuple[float, int, float, Flow]] = []
+        self._arrivals = 0
+        # Completed service periods, a preempted flow is served in several
+        self._busy_periods: list[tuple[float, float, float]] = []
+
+    def enqueue_flow(self, flow: Flow, current_time: float) -> float | None:
+        """
+        Enqueue a flow and serve it at once if the link is idle or its key
+        beats the flow in service. Returns its projected end time if it is
+        now in service, None if it waits.
+        """
+        state, index = self.state, self.index
+        capacity = float(state.capacity[index])
+        state.busy_until[index] = (
+            max(current_time, float(state.busy_until[index])) + flow.flow_size / capacity
+        )
+        state.queued_bytes[index] += flow.flow_size
+        state.queued_flows[index] += 1
+
+        order = self._arrivals
+        self._arrivals += 1
+        key = self.discipline.key(flow, flow.flow_size)
+        serving = self.serving
+        if serving is not None:
+            remaining = self._serving_remaining - (current_time - float(state.head_start[index])) * capacity
+            if not key < self.discipline.key(serving, remaining):
+                heapq.heappush(self._waiting, (key, order, flow.flow_size, flow))
+                return None
+            self._preempt(current_time, remaining)
+
+        flow.start_time = current_time
+        return self._serve(flow, order, flow.flow_size, current_time)
+
+    def dequeue_flow(self, current_time: float):
+        """
+        Remove and return the flow in service if its transmission is complete.
+        Returns None otherwise.
+        """
+        flow = self.serving
+        if flow is None or current_time < flow.end_time:
+            return None
+
+        self.flows.append(flow)
+        self.serving = None
+        state, index = self.state, self.index
+        state.queued_flows[index] -= 1
+        if state.queued_flows[index]:
+            state.queued_bytes[index] -= self._serving_remaining
+        else:
+            # Clear the rounding left by the service periods
+            state.queued_bytes[index] = 0.0
+        self._account_service(flow, current_time)
+        state.fct_sum[index] += flow.end_time - flow.arrival_time
+        state.completed_flows[index] += 1
+        return flow
+
+    def complete_flow(self, current_time: float) -> float | None:
+        if self.dequeue_flow(current_time) is None or not self._waiting:
+            return None
+        _, order, remaining, flow = heapq.heappop(self._waiting)
+        if remaining == flow.flow_size:
+            flow.start_time = current_time
+        return self._serve(flow, order, remaining, current_time)
+
+    def _serve(self, flow: Flow, order: int, remaining: float, current_time: float) -> float:
+        """Start a service period of flow, returning its projected end time"""
+        self.serving = flow
+        self._serving_order = order
+        self._serving_remaining = remaining
+        self.state.head_start[self.index] = current_time
+        self.token += 1
+        flow.end_time = float(current_time + remaining / float(self.state.capacity[self.index]))
+        return flow.end_time
+
+    def busy_periods(self) -> Iterable[tuple[float, float, float]]:
+        return self._busy_periods
+
+    def remaining_bytes(self, current_time: float) -> float:
+        waiting = sum(remaining for _, _, remaining, _ in self._waiting)
+        if self.serving is None:
+            return waiting
+        served = (current_time - float(self.state.head_start[self.index])) * self.capacity_bps
+        return waiting + max(self._serving_remaining - served, 0.0)
+
+    def _preempt(self, current_time: float, remaining: float) -> None:
+        """Put the flow in service back into the heap with remaining bytes left"""
+        flow = self.serving
+        state, index = self.state, self.index
+        state.queued_bytes[index] -= self._serving_remaining - remaining
+        self._account_service(flow, current_time)
+        heapq.heappush(
+            self._waiting,
+            (self.discipline.key(flow, remaining), self._serving_order, remaining, flow),
+        )
+        self.serving = None
+
+    def _account_service(self, flow: Flow, current_time: float) -> None:
+        """Record the service period of flow ending at current_time as busy time"""
+        state, index = self.state, self.index
+        start = float(state.head_start[index])
+        if current_time > start:
+            state.busy_time[index] += flow.weight * (current_time - start)
+            state.record_busy_interval(index, start, current_time, flow.weight)
+            self._busy_periods.append((start, current_time, flow.weight))
+
+
+class ProcessorSharingLink(Link):
+    """
+    Link sharing its capacity equally among all the flows it holds, which
+    are served at once, as flows sharing a bottleneck roughly are.
+
+    Rather than updating every flow's bytes left on each arrival and
+    departure, the link keeps a virtual clock: the bytes each of its flows
+    has received since the link was last idle, advancing at capacity / n
+    with n flows. A flow arriving at virtual time v finishes at virtual time
+    v + size, so flows sit in a heap by virtual finish time and each arrival
+    or departure costs O(log n). Only the next departure has a completion
+    event; as on ScheduledLink, an arrival slowing it down moves the token
+    on and the outdated event is skipped when popped.
+
+    The state store is kept as for a FIFO link: queued_bytes holds the bytes
+    left at head_start, the link's last arrival or departure, and busy time
+    is accounted between those, weighted by the mean weight of the flows.
+    """
+
+    def __init__(
+        self,
+        capacity_bps: float,
+        discipline: QueueDiscipline,
+        state: LinkStateStore | None = None,
+        index: int = 0,
+    ):
+        super().__init__(capacity_bps, state, index)
+        self.discipline = discipline
+        self.token = 0
+        self._virtual_time = 0.0
+        # Virtual finish time, arrival order and flow of each flow in service
+        self._active: list[tuple[float, int, Flow]] = []
+        self._active_weight = 0.0
+        self._arrivals = 0
+        # Periods between arrivals and departures, weighted by the mean weight of the flows
+        self._busy_periods: list[tuple[float, float, float]] = []
+
+    @property
+    def serving(self) -> Flow | None:
+        """Flow finishing first"""
+        return self._active[0][2] if self._active else None
+
+    def enqueue_flow(self, flow: Flow, current_time: float) -> float:
+        """
+        Start serving a flow alongside the others. Returns the projected end
+        time of the flow finishing first, which the arrival moved.
+        """
+        state, index = self.state, self.index
+        self._advance(current_time)
+        state.busy_until[index] = (
+            max(current_time, float(state.busy_until[index]))
+            + flow.flow_size / float(state.capacity[index])
+        )
+        state.queued_bytes[index] += flow.flow_size
+        state.queued_flows[index] += 1
+
+        flow.start_time = current_time
+        heapq.heappush(self._active, (self._virtual_time + flow.flow_size, self._arrivals, flow))
+        self._arrivals += 1
+        self._active_weight += flow.weight
+        return self._schedule(current_time)
+
+    def dequeue_flow(self, current_time: float):
+        """
+        Remove and return the flow finishing first if its transmission is
+        complete. Returns None otherwise.
+        """
+        if not self._active or current_time < self._active[0][2].end_time:
+            return None
+
+        self._advance(current_time)
+        finish, _, flow = heapq.heappop(self._active)
+        flow.end_time = current_time
+        self.flows.append(flow)
+        self._active_weight -= flow.weight
+
+        state, index = self.state, self.index
+        state.queued_flows[index] -= 1
+        if self._active:
+            # Snap to the finish time, so rounding does not build up
+            self._virtual_time = finish
+        else:
+            # The link is idle, restart the clock and clear the rounding
+            self._virtual_time = 0.0
+            self._active_weight = 0.0
+            state.queued_bytes[index] = 0.0
+        state.fct_sum[index] += flow.end_time - flow.arrival_time
+        state.completed_flows[index] += 1
+        return flow
+
+    def complete_flow(self, current_time: float) -> float | None:
+        if self.dequeue_flow(current_time) is None or not self._active:
+            return None
+        return self._schedule(current_time)
+
+    def busy_periods(self) -> Iterable[tuple[float, float, float]]:
+        return self._busy_periods
+
+    def remaining_bytes(self, current_time: float) -> float:
+        if not self._active:
+            return 0.0
+        # Virtual time at current_time; a flow has its virtual finish time minus that left
+        elapsed = max(current_time - float(self.state.head_start[self.index]), 0.0)
+        virtual_time = self._virtual_time + elapsed * self.capacity_bps / len(self._active)
+        return sum(max(finish - virtual_time, 0.0) for finish, _, _ in self._active)
+
+    def _schedule(self, current_time: float) -> float:
+        """Project when the flow finishing first ends, starting a new token"""
+        finish, _, flow = self._active[0]
+        self.token += 1
+        flow.end_time = current_time + max(finish - self._virtual_time, 0.0) * len(
+            self._active
+        ) / float(self.state.capacity[self.index])
+        return flow.end_time
+
+    def _advance(self, current_time: float) -> None:
+        """Move the virtual clock, the queued bytes and the busy time up to current_time"""
+        state, index = self.state, self.index
+        start = float(state.head_start[index])
+        active = len(self._active)
+        if active and current_time > start:
+            elapsed = current_time - start
+            capacity = float(state.capacity[index])
+            self._virtual_time += elapsed * capacity / active
+            state.queued_bytes[index] -= elapsed * capacity
+            weight = self._active_weight / active
+            state.busy_time[index] += weight * elapsed
+            state.record_busy_interval(index, start, current_time, weight)
+            self._busy_periods.append((start, current_time, weight))
+        state.head_start[index] = current_time
@@ -0,0 +1,103 @@
+import bisect
+from abc import ABC, abstractmethod
+from typing import Sequence
+
+from traffic_simulator.config.models import NetworkConfig, TrafficConfig
+from traffic_simulator.models.flow import Flow
+
+
+class QueueDiscipline(ABC):
+    """
+    Order in which a ScheduledLink serves the flows it holds. The flow with
+    the smallest key is served, preempting the one in service if its key is
+    smaller; equal keys are served in arrival order.
+    """
+
+    name: str
+
+    @abstractmethod
+    def key(self, flow: Flow, remaining: float) -> float:
+        """Sort key of a flow with remaining bytes left to transmit"""
+        pass
+
+
+class FifoDiscipline(QueueDiscipline):
+    """First come, first served. create_links serves it with the plain Link, which is faster."""
+
+    name = "fifo"
+
+    def key(self, flow: Flow, remaining: float) -> float:
+        return 0.0
+
+
+class SrptDiscipline(QueueDiscipline):
+    """Preemptive shortest remaining processing time first"""
+
+    name = "srpt"
+
+    def key(self, flow: Flow, remaining: float) -> float:
+        return remaining
+
+
+class ProcessorSharingDiscipline(QueueDiscipline):
+    """
+    All flows served at once, each at an equal share of the capacity. Only
+    marks links to be built as ProcessorSharingLink, which orders flows by
+    virtual finish time; it has no key and ScheduledLink rejects it.
+    """
+
+    name = "processor_sharing"
+
+    def key(self, flow: Flow, remaining: float) -> float:
+        raise ValueError("Processor sharing serves every flow at once, it has no service order")
+
+
+class PriorityDiscipline(QueueDiscipline):
+    """
+    Preemptive strict priority: level 0 first, arrival order within a level.
+    A flow's level is the first size threshold it does not exceed, or the
+    position of its traffic class; flows above every threshold or of an
+    unlisted class get the lowest level.
+    """
+
+    name = "priority"
+
+    def __init__(
+        self,
+        size_thresholds: Sequence[float] | None = None,
+        classes: Sequence[str] | None = None,
+    ):
+        if (size_thresholds is None) == (classes is None):
+            raise ValueError("Priority levels need either size thresholds or traffic classes")
+        self.size_thresholds = list(size_thresholds) if size_thresholds is not None else None
+        self.class_levels = {name: level for level, name in enumerate(classes or [])}
+        if self.size_thresholds is not None:
+            self.num_levels = len(self.size_thresholds) + 1
+        else:
+            self.num_levels = len(self.class_levels) + 1
+
+    def key(self, flow: Flow, remaining: float) -> float:
+        if self.size_thresholds is not None:
+            return bisect.bisect_left(self.size_thresholds, flow.flow_size)
+        return self.class_levels.get(flow.traffic_class, self.num_levels - 1)
+
+
+class QueueDisciplineFactory:
+    @staticmethod
+    def create_discipline(network: NetworkConfig, traffic: TrafficConfig) -> QueueDiscipline | None:
+        """Discipline of the configured links, None for FIFO"""
+        if network.queue_discipline == "fifo":
+            return None
+        elif network.queue_discipline == "srpt":
+            return SrptDiscipline()
+        elif network.queue_discipline == "processor_sharing":
+            return ProcessorSharingDiscipline()
+        elif network.queue_discipline == "priority":
+            if network.priority_classes is not None:
+                names = {traffic.name} | {traffic_class.name for traffic_class in traffic.classes}
+                unknown = [name for name in network.priority_classes if name not in names]
+                if unknown:
+                    raise ValueError(f"Unknown priority classes: {', '.join(unknown)}")
+            return PriorityDiscipline(network.priority_thresholds, network.priority_classes)
+        else:
+            raise ValueError(f"Invalid queue discipline: {network.queue_discipline}")
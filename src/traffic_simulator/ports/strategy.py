@@ -1,3 +1,4 @@
+import itertools
 import math
 import random
 from abc import ABC, abstractmethod
@@ -6,6 +7,7 @@ import numpy as np
 
 from traffic_simulator.config.models import MainConfig
 from traffic_simulator.flows.distribution import Distribution
+from traffic_simulator.metrics.metric_collector import UTILIZATION_METRICS
 from traffic_simulator.metrics.metric_manager import LinkMetricsTracker
 from traffic_simulator.models.flow import Flow
 from traffic_simulator.ports.link import Link
@@ -13,8 +15,19 @@ from traffic_simulator.flows.flow_size_generator import FlowSizeGenerator
 from traffic_simulator.models.event import FlowArrivalEvent
 
 class LoadBalanceStrategy(ABC):
+    # Whether routing reads sampled link metrics, rather than at most busy_until
+    reads_link_metrics = False
+
     def __init__(self, links: list[Link]):
         self.links = links
+        # Random source of the randomized strategies; lockstep lanes get their own
+        self.rng = random
+
+        # Array view of the links, used to evaluate all of them at once
+        self.state = links[0].state
+        if any(link.state is not self.state for link in links):
+            raise ValueError("All links of a strategy must share one LinkStateStore")
+        self.link_indices = np.array([link.index for link in links], dtype=np.int64)
 
     @abstractmethod
     def select_link(self) -> Link:
@@ -26,63 +39,109 @@ class LoadBalanceStrategy(ABC):
         Default implementation simply calls select_link()."""
         return self.select_link()
 
+    def _least_congested_link(self) -> Link:
+        """Link whose queued work completes the earliest."""
+        busy_until = self.state.busy_until[self.link_indices]
+        return self.links[int(np.argmin(busy_until))]
+
 
 class ECMPStrategy(LoadBalanceStrategy):
     def select_link(self) -> Link:
         # Equal-cost multi-path routing
-        return random.choice(self.links)
+        return self.rng.choice(self.links)
 
 
 class WCMPSrategy(LoadBalanceStrategy):
     def __init__(self, links: list[Link], weights: list[int]):
         super().__init__(links)
         self.weights = weights
+        self._cum_weights = list(itertools.accumulate(weights))
 
     def select_link(self) -> Link:
         # Weighted multi-path routing
-        return random.choices(self.links, weights=self.weights)[0]
+        return self.rng.choices(self.links, cum_weights=self._cum_weights)[0]
 
 
 class LeastCongestedStrategy(LoadBalanceStrategy):
     def select_link(self) -> Link:
         # Choose the least congested link
-        return min(self.links, key=lambda link: link.busy_until)
+        return self._least_congested_link()
+
+
+class SampledLeastCongestedStrategy(LoadBalanceStrategy):
+    """
+    Probe sample_size links and send the flow to the least congested of them
+    (power-of-d choices), so the cost of a decision does not grow with the
+    number of links. Probes are drawn with replacement, uniformly or, with
+    weights, in proportion to each link's weight.
+    """
+
+    def __init__(
+        self,
+        links: list[Link],
+        sample_size: int = 2,
+        weights: list[float] | None = None,
+    ):
+        super().__init__(links)
+        self.sample_size = sample_size
+        self.weights = weights
+        self._cum_weights = (
+            list(itertools.accumulate(weights)) if weights is not None else None
+        )
+        self._positions = range(len(links))
+        self._index_list = self.link_indices.tolist()
+
+    def select_link(self) -> Link:
+        positions = self.rng.choices(
+            self._positions, cum_weights=self._cum_weights, k=self.sample_size
+        )
+        # Plain Python over the few probed links beats a NumPy gather here
+        busy_until = self.state.busy_until
+        index_list = self._index_list
+        best = min(positions, key=lambda position: busy_until[index_list[position]])
+        return self.links[best]
 
 
 class MostUnderTargetStrategy(LoadBalanceStrategy):
+    reads_link_metrics = True
+
     def __init__(
         self,
         links: list[Link],
         link_metric_tracker: LinkMetricsTracker,
         config: MainConfig,
+        utilization_metric: str = "link_utilization",
     ):
         super().__init__(links)
         self.link_metric_tracker = link_metric_tracker
+        self.telemetry = link_metric_tracker.telemetry
         self.config = config
-
-    def _get_utilization_gap(self, link: Link, link_config) -> float:
-        """Calculate how far a link is below its target utilization."""
-        samples = self.link_metric_tracker.get_link_metric_samples(
-            link, "link_utilization"
+        self.utilization_metric = utilization_metric
+        self.target_utilizations = np.array(
+            [link_config.target_utilization for link_config in config.network.links]
         )
-        if not samples:
-            return float("-inf")
+        self._columns: np.ndarray | None = None
 
-        current_utilization = samples[-1][1]
-        return link_config.target_utilization - current_utilization
+    def _get_utilization_gaps(self) -> np.ndarray:
+        """Calculate how far each link is below its target utilization."""
+        latest = self.telemetry.values(self.utilization_metric)
+        if latest is None:
+            return np.full(len(self.links), float("-inf"))
+
+        if self._columns is None:
+            self._columns = self.link_metric_tracker.get_columns(self.links)
+        return self.target_utilizations - latest[self._columns]
 
     def _find_most_underutilized_link(self) -> Link | None:
         """Find the link with the largest positive gap to its target utilization."""
-        utilization_gaps = [
-            (link, self._get_utilization_gap(link, link_config))
-            for link, link_config in zip(self.links, self.config.network.links)
-        ]
+        utilization_gaps = self._get_utilization_gaps()
 
-        valid_gaps = [(link, gap) for link, gap in utilization_gaps if gap > 0]
-        if not valid_gaps:
+        valid_gaps = np.where(utilization_gaps > 0, utilization_gaps, float("-inf"))
+        best = int(np.argmax(valid_gaps))
+        if valid_gaps[best] == float("-inf"):
             return None
 
-        return max(valid_gaps, key=lambda x: x[1])[0]
+        return self.links[best]
 
     def select_link(self) -> Link:
         """Choose the link most below its target utilization, or least congested if none are under target."""
@@ -90,21 +149,32 @@ class MostUnderTargetStrategy(LoadBalanceStrategy):
         if (most_underutilized):
             return most_underutilized
 
-        return min(self.links, key=lambda link: link.busy_until)
+        return self._least_congested_link()
 
 class PercentileBasedStrategy(LoadBalanceStrategy):
+    reads_link_metrics = True
+
     def __init__(
         self,
         links: list[Link],
         link_metric_tracker: LinkMetricsTracker,
         flow_size_generator: FlowSizeGenerator,
+        utilization_metric: str = "link_utilization",
+        large_flow_contribution: float = 0.05,
     ):
         super().__init__(links)
         self.link_metric_tracker = link_metric_tracker
+        self.telemetry = link_metric_tracker.telemetry
         self.flow_size_generator = flow_size_generator
+        self.utilization_metric = utilization_metric
+        self.large_flow_contribution = large_flow_contribution
 
         # Compute target utilizations once since the workload is static
         self.target_utilizations = self._compute_target_utilizations()
+        self._cum_weights = list(
+            itertools.accumulate(self.target_utilizations[link] for link in self.links)
+        )
+        self._columns: np.ndarray | None = None
 
     def _compute_target_utilizations(self) -> dict[Link, float]:
         num_links = len(self.links)
@@ -125,7 +195,7 @@ class PercentileBasedStrategy(LoadBalanceStrategy):
         # choose 50% since then it balances out so 50% of data is wcmp and 50% of data is least congested
         # this way, averages out to 0 variance since wcmp will make it so there is variance but least congested balance it out
 
-        large_flow_threshold_index = np.searchsorted(normalized_cumulative, 0.05)  # Find 50% contribution point
+        large_flow_threshold_index = np.searchsorted(normalized_cumulative, self.large_flow_contribution)  # Find the contribution cut point
         self.large_flow_threshold = flow_sizes[min(large_flow_threshold_index - 1, len(flow_sizes) - 1)]  # Get the flow size at this index
         # print(f"large flow threshold: {large_flow_threshold_index} has size {self.large_flow_threshold}")
 
@@ -172,38 +242,41 @@ class PercentileBasedStrategy(LoadBalanceStrategy):
         return target_utilizations
 
     def get_current_utilization(self, link):
-        samples = self.link_metric_tracker.get_link_metric_samples(
-            link, "link_utilization"
-        )
-        if not samples:
+        latest = self.telemetry.values(self.utilization_metric)
+        if latest is None:
             return float("-inf")
 
-        current_utilization = samples[-1][1]
-        return current_utilization
+        return float(latest[self.link_metric_tracker.get_columns([link])[0]])
+
+    def get_current_utilizations(self) -> np.ndarray:
+        """Utilization of every link in the telemetry snapshot, -inf before the first sample."""
+        latest = self.telemetry.values(self.utilization_metric)
+        if latest is None:
+            return np.full(len(self.links), float("-inf"))
+
+        if self._columns is None:
+            self._columns = self.link_metric_tracker.get_columns(self.links)
+        return latest[self._columns]
+
+    def _least_utilized_link(self) -> Link:
+        return self.links[int(np.argmin(self.get_current_utilizations()))]
     
     def select_link_for_flow(self, flow: Flow) -> Link:
         """Choose a link based on target utilization and flow size."""
         flow_size = flow.flow_size
-        current_utilizations = {
-            link: self.get_current_utilization(link) for link in self.links
-        }
 
         # print(f"flow size {flow_size},large threshold: {self.large_flow_threshold}")
 
         if flow_size >= self.large_flow_threshold:
             # For large flows, assign to the link with the lowest current utilization
-            # print(f"current utilizations: {current_utilizations}, assigning to lowest which is {min(self.links, key=lambda link: current_utilizations.get(link, float("inf")))}")
-            return min(self.links, key=lambda link: current_utilizations.get(link, float("inf")))
+            return self._least_utilized_link()
 
         # For normal flows, assign based on target utilization
-        return random.choices(self.links, weights=[self.target_utilizations[link] for link in self.links])[0]
+        return self.rng.choices(self.links, cum_weights=self._cum_weights)[0]
     
     def select_link(self) -> Link:
         """Default implementation when flow information isn't available."""
-        current_utilizations = {
-            link: self.get_current_utilization(link) for link in self.links
-        }
-        return min(self.links, key=lambda link: current_utilizations.get(link, float("inf")))
+        return self._least_utilized_link()
 
 class UnevenLoadBalancingStrategy(LoadBalanceStrategy):
     def __init__(
@@ -224,6 +297,11 @@ class UnevenLoadBalancingStrategy(LoadBalanceStrategy):
         self.config = config
         self.percentile_threshold = percentile_threshold
         self.distribution = distribution
+        self._buffer_indices = self.link_indices[self.buffer_link_indices]
+
+        # Normal flows are spread over all links by target utilization, as WCMP
+        # does, drawing from this strategy's rng so lockstep lanes stay independent
+        self._cum_weights = list(itertools.accumulate(self.config.network.routing_weights()))
 
         print(self.buffer_link_indices)
         print(self.normal_links)
@@ -241,18 +319,18 @@ class UnevenLoadBalancingStrategy(LoadBalanceStrategy):
             print(f"flow size {flow.flow_size} is greater than threshold {threshold}")
             # Large flow: route to least loaded buffer link
             if self.buffer_links:
-                return min(self.buffer_links, key=lambda link: link.busy_until)
+                busy_until = self.state.busy_until[self._buffer_indices]
+                return self.buffer_links[int(np.argmin(busy_until))]
             else:
                 # Fallback if no buffer links defined
-                return min(self.links, key=lambda link: link.busy_until)
+                return self._least_congested_link()
         else:
-            # Normal flow: use WCMPSrategy on all links
-            weights = [link.target_utilization for link in self.config.network.links]
-            return WCMPSrategy(self.links, weights).select_link()
+            # Normal flow: weighted multi-path routing on all links
+            return self.rng.choices(self.links, cum_weights=self._cum_weights)[0]
     
     def select_link(self) -> Link:
         """Default implementation when flow information isn't available."""
-        return min(self.links, key=lambda link: link.busy_until)
+        return self._least_congested_link()
 
 
 class StrategyFactory:
@@ -265,17 +343,37 @@ class StrategyFactory:
         flow_size_generator: FlowSizeGenerator,
         distribution: Distribution | None = None,
     ) -> LoadBalanceStrategy:
+        utilization_metric = UTILIZATION_METRICS[config.simulation.metrics.utilization]
+
         if strategy_name == "ecmp":
             return ECMPStrategy(links)
         elif strategy_name == "wcmp":
-            weights = [link.target_utilization for link in config.network.links]
-            return WCMPSrategy(links, weights)
+            return WCMPSrategy(links, config.network.routing_weights())
         elif strategy_name == "least_congested":
             return LeastCongestedStrategy(links)
+        elif strategy_name in ("power_of_two", "weighted_power_of_two"):
+            weights = None
+            if strategy_name == "weighted_power_of_two":
+                weights = config.network.routing_weights()
+            return SampledLeastCongestedStrategy(links, 2, weights)
+        elif strategy_name in ("sampled_least_congested", "weighted_sampled_least_congested"):
+            weights = None
+            if strategy_name == "weighted_sampled_least_congested":
+                weights = config.network.routing_weights()
+            return SampledLeastCongestedStrategy(links, config.network.sample_size, weights)
         elif strategy_name == "most_under_target":
-            return MostUnderTargetStrategy(links, link_metric_tracker, config)
+            return MostUnderTargetStrategy(
+                links, link_metric_tracker, config, utilization_metric
+            )
         elif strategy_name == "percentile_based":
-            return PercentileBasedStrategy(links, link_metric_tracker, flow_size_generator)
+            large_flow_contribution = getattr(config.network, "large_flow_contribution", 0.05)
+            return PercentileBasedStrategy(
+                links,
+                link_metric_tracker,
+                flow_size_generator,
+                utilization_metric,
+                large_flow_contribution,
+            )
         elif strategy_name == "uneven":
             buffer_links = getattr(config.network, "buffer_links", 0)
             percentile_threshold = getattr(config.network, "large_flow_percentile", 99.0)
@@ -1,3 +1,13 @@
 from .cli import cli
 
-__all__ = ["cli"]
+__all__ = ["cli", "run", "Results"]
+
+
+def __getattr__(name: str):
+    # The run API imports NumPy and the simulator, so it loads on first use
+    # and importing the CLI stays light
+    if name in ("run", "Results"):
+        from . import api
+
+        return getattr(api, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
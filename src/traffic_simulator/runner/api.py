@@ -0,0 +1,57 @@
+import random
+
+from traffic_simulator.config.models import MainConfig
+from traffic_simulator.flows.distribution import DistributionFactory
+from traffic_simulator.flows.flow_generator import FlowGeneratorFactory
+from traffic_simulator.flows.flow_size_generator import FlowSizeGeneratorFactory
+from traffic_simulator.runner.pipeline import build_fluid_simulator, build_simulator
+from traffic_simulator.runner.result_store import FlowStatistics, Results, collect_results
+
+__all__ = ["ENGINES", "FlowStatistics", "Results", "run"]
+
+ENGINES = ("discrete", "sharded", "fluid")
+
+
+def run(
+    config: MainConfig,
+    strategy: str | None = None,
+    engine: str = "discrete",
+    workers: int = 1,
+    routing_seed: int | None = 42,
+) -> Results:
+    """
+    Simulate a config and return its results in memory.
+
+    Wires up the generators, links, tracker and strategy as the CLI does,
+    without writing output or rendering figures. strategy overrides
+    network.strategy; engine is "discrete", "sharded" (simulating links in
+    `workers` processes) or "fluid". routing_seed seeds a random source of
+    the strategy's own, the same draws as the CLI's random.seed(42) by
+    default, so the global random state is left alone; None routes with the
+    global random module instead.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine}, choose one of {', '.join(ENGINES)}")
+    strategy_name = strategy or config.network.strategy
+
+    distribution = DistributionFactory.create_distribution(
+        distribution_type=config.traffic.flow_size.type,
+        params=config.traffic.flow_size.params,
+    )
+    if engine == "fluid":
+        simulator = build_fluid_simulator(config, strategy_name, distribution)
+    else:
+        flow_size_generator = FlowSizeGeneratorFactory.create_generator(config, distribution)
+        flow_generator = FlowGeneratorFactory.create_generator(config, flow_size_generator)
+        simulator = build_simulator(
+            config,
+            strategy_name,
+            flow_generator,
+            flow_size_generator,
+            distribution,
+            workers=workers if engine == "sharded" else None,
+        )
+        if routing_seed is not None:
+            simulator.strategy.rng = random.Random(routing_seed)
+    simulator.run()
+    return collect_results(simulator, config, strategy_name)
@@ -1,22 +1,18 @@
+import os
 import random
 import click
 import pathlib
 
-from traffic_simulator.config.config_loader import load_config
-from traffic_simulator.flows.distribution import DistributionFactory
-from traffic_simulator.flows.flow_generator import PoissonFlowGenerator
-from traffic_simulator.flows.flow_size_generator import FlowSizeGeneratorFactory
-from traffic_simulator.metrics.metric_manager import LinkMetricsTracker
-from traffic_simulator.ports.link import Link
-from traffic_simulator.ports.strategy import StrategyFactory
-from traffic_simulator.simulator.simulator import Simulator
+# Keep module-level imports light: heavy modules (pydantic, NumPy, matplotlib)
+# are imported inside the commands, only once their phase actually runs.
+from traffic_simulator.config.choices import STRATEGY_NAMES
 
 random.seed(42)
 
-@click.command()
+@click.group(invoke_without_command=True)
 @click.option(
     "--config",
-    type=click.Path(exists=True),
+    type=click.Path(),
     default="configs/config.yaml",
     help="Path to the YAML configuration file",
 )
@@ -32,58 +28,231 @@ random.seed(42)
     default=False,
     help="Use dynamic lambda calculation",
 )
-def cli(config: str, output: str, dynamic_lambda: bool):
-    # Create the output directory if it does not exist
-    pathlib.Path(output).mkdir(parents=True, exist_ok=True)
+@click.option(
+    "--workload-cache",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory to cache generated workloads in, so runs sharing a workload replay the same flows",
+)
+@click.option(
+    "--strategy",
+    "strategies",
+    type=click.Choice(STRATEGY_NAMES),
+    multiple=True,
+    help="Strategy to run instead of network.strategy; repeat to compare several in one lockstep pass",
+)
+@click.option(
+    "--force",
+    is_flag=True,
+    default=False,
+    help="Rerun even if the output directory already holds results for this exact run",
+)
+@click.option(
+    "--plots/--no-plots",
+    default=True,
+    help="Render figures into the output directory",
+)
+@click.option(
+    "--analytic",
+    type=click.Choice(["off", "only", "auto"]),
+    default="off",
+    help="M/G/1 estimates for ECMP/WCMP: 'only' prints them without simulating, 'auto' also simulates and compares",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(["discrete", "fluid", "validate", "sharded"]),
+    default="discrete",
+    help="'fluid' approximates links as work backlogs (ECMP/WCMP/least congested, Poisson arrivals); 'validate' runs both engines and compares them; 'sharded' simulates links in parallel processes (strategies not reading link metrics)",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=None,
+    help="Processes of the sharded engine, one per CPU if unset",
+)
+@click.pass_context
+def cli(
+    ctx: click.Context,
+    config: str,
+    output: str,
+    dynamic_lambda: bool,
+    workload_cache: str | None,
+    strategies: tuple[str, ...],
+    force: bool,
+    plots: bool,
+    analytic: str,
+    engine: str,
+    workers: int | None,
+):
+    # Subcommands handle their own work
+    if ctx.invoked_subcommand is not None:
+        return
+
+    if not pathlib.Path(config).exists():
+        raise click.BadParameter(f"Path '{config}' does not exist.", param_hint="'--config'")
+
+    from traffic_simulator.runner.pipeline import run_simulation
+
+    try:
+        run_simulation(
+            config=config,
+            output=output,
+            dynamic_lambda=dynamic_lambda,
+            workload_cache=workload_cache,
+            strategies=strategies,
+            force=force,
+            plots=plots,
+            analytic=analytic,
+            engine=engine,
+            workers=workers or os.cpu_count() or 1,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+
+@cli.command("convert-trace")
+@click.argument("csv_path", type=click.Path(exists=True, dir_okay=False))
+@click.argument("trace_path", type=click.Path(dir_okay=False))
+@click.option(
+    "--arrival-column",
+    default="arrival_time",
+    show_default=True,
+    help="CSV column holding flow arrival times",
+)
+@click.option(
+    "--size-column",
+    default="flow_size",
+    show_default=True,
+    help="CSV column holding flow sizes",
+)
+def convert_trace(csv_path: str, trace_path: str, arrival_column: str, size_column: str):
+    """Convert a CSV flow trace, sorted by arrival time, into a binary trace."""
+    from traffic_simulator.flows.trace import csv_to_trace
+
+    try:
+        num_flows = csv_to_trace(csv_path, trace_path, arrival_column, size_column)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    print(f"Wrote {num_flows} flows to {trace_path}")
+
+
+@cli.command("tune")
+@click.option(
+    "--config",
+    type=click.Path(exists=True, dir_okay=False),
+    default="configs/config.yaml",
+    help="Path to the YAML configuration file to start from",
+)
+@click.option(
+    "--strategy",
+    "strategy_name",
+    type=click.Choice(STRATEGY_NAMES),
+    default=None,
+    help="Strategy to tune instead of network.strategy",
+)
+@click.option(
+    "--objective",
+    type=click.Choice(["mse", "fct_p99"]),
+    default="mse",
+    show_default=True,
+    help="Minimize the final utilization MSE or the 99th percentile FCT",
+)
+@click.option("--candidates", type=int, default=27, show_default=True, help="Parameter settings to start from")
+@click.option("--eta", type=int, default=3, show_default=True, help="Each round keeps 1/eta of the candidates and runs them eta times longer")
+@click.option("--min-duration", type=float, default=None, help="Simulated seconds of the first round, derived from the rounds needed if unset")
+@click.option("--workers", type=int, default=1, show_default=True, help="Processes simulating candidates in parallel")
+@click.option("--seed", type=int, default=0, show_default=True, help="Seed of the candidate draws")
+@click.option(
+    "--output-config",
+    type=click.Path(dir_okay=False),
+    default="tuned.yaml",
+    show_default=True,
+    help="Where to write the config with the best parameters",
+)
+def tune(
+    config: str,
+    strategy_name: str | None,
+    objective: str,
+    candidates: int,
+    eta: int,
+    min_duration: float | None,
+    workers: int,
+    seed: int,
+    output_config: str,
+):
+    """Search strategy parameters with short simulations and save the best config."""
+    from traffic_simulator.config.config_loader import load_config
+    from traffic_simulator.runner.tune import successive_halving, write_config
 
-    # Load the configuration file
     sim_config = load_config(config)
-    
-    distribution = DistributionFactory.create_distribution(distribution_type=sim_config.traffic.flow_size.type, params=sim_config.traffic.flow_size.params)
-
-    flow_size_generator = FlowSizeGeneratorFactory.create_generator(sim_config, distribution)
-
-    # Calculate dynamic lambda if requested
-    arrival_rate = sim_config.traffic.flow_arrival.rate
-    if dynamic_lambda:
-        from traffic_simulator.flows.lambda_calculator import calculate_dynamic_lambda
-        links = [Link(capacity_bps=link.capacity) for link in sim_config.network.links]
-        arrival_rate = calculate_dynamic_lambda(
-            sim_config.traffic.flow_size.params,
-            links
+    strategy_name = strategy_name or sim_config.network.strategy
+    try:
+        ranked = successive_halving(
+            sim_config,
+            strategy_name,
+            objective=objective,
+            num_candidates=candidates,
+            eta=eta,
+            min_duration=min_duration,
+            workers=workers,
+            seed=seed,
         )
+    except ValueError as e:
+        raise click.ClickException(str(e))
 
-    print(f"Dynamic lambda calculated: {arrival_rate:.2f} (vs. config: {sim_config.traffic.flow_arrival.rate:.2f})")
+    best = ranked[0]
+    write_config(sim_config, strategy_name, best.params, output_config)
+    print(f"Best {objective} {best.score:.6f} with {best.params}, written to {output_config}")
 
-    flow_generator = PoissonFlowGenerator(
-        arrival_rate=sim_config.traffic.flow_arrival.rate,
-        flow_size_generator=flow_size_generator,
-    )
 
-    links = [Link(capacity_bps=link.capacity) for link in sim_config.network.links]
-    links_metric_tracker = LinkMetricsTracker(
-        sim_config.simulation.metrics.sample_interval
-    )
-    for link in links:
-        links_metric_tracker.register_link(link)
-
-    strategy = StrategyFactory.create_strategy(
-        strategy_name=sim_config.network.strategy,
-        links=links,
-        config=sim_config,
-        link_metric_tracker=links_metric_tracker,
-        flow_size_generator=flow_size_generator,
-        distribution=distribution,
-    )
+@cli.command("compare")
+@click.argument("directories", nargs=-1, required=True, type=click.Path(exists=True, file_okay=False))
+@click.option("--output", type=click.Path(file_okay=False), default="comparison", show_default=True, help="Directory for the figures and summary.csv")
+@click.option("--percentile", type=float, default=99.0, show_default=True, help="FCT percentile reported as the tail")
+def compare(directories: tuple[str, ...], output: str, percentile: float):
+    """Compare the saved results of several runs without simulating again."""
+    from traffic_simulator.runner.compare import compare as compare_runs, format_summary
+
+    try:
+        rows = compare_runs(list(directories), output, percentile)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    print(format_summary(rows, percentile))
+    print(f"Figures and summary.csv written to {output}")
+
+
+@cli.command("verify")
+@click.option("--configs", "num_configs", type=int, default=5, show_default=True, help="Randomized configs per strategy")
+@click.option("--seed", type=int, default=0, show_default=True, help="Seed of the randomized configs")
+@click.option(
+    "--engine",
+    "engines",
+    type=click.Choice(["reference", "discrete", "lockstep", "sharded"]),
+    multiple=True,
+    help="Engine to check against the reference; repeat for several, all if unset",
+)
+@click.option(
+    "--strategy",
+    "strategies",
+    type=click.Choice(STRATEGY_NAMES),
+    multiple=True,
+    help="Strategy to check; repeat for several, all if unset",
+)
+@click.option("--tolerance", type=float, default=1e-9, show_default=True, help="Largest difference accepted, relative for metric values above 1")
+def verify(num_configs: int, seed: int, engines: tuple[str, ...], strategies: tuple[str, ...], tolerance: float):
+    """Check that the optimized engines reproduce the reference implementation."""
+    from traffic_simulator.simulator.equivalence import Tolerances, check_equivalence
 
-    simulator = Simulator(
-        duration=sim_config.simulation.duration,
-        flow_generator=flow_generator,
-        flow_size_generator=flow_size_generator,
-        strategy=strategy,
-        links=links,
-        link_configs=sim_config.network.links,
-        link_metric_tracker=links_metric_tracker,
+    mismatches = check_equivalence(
+        num_configs=num_configs,
+        seed=seed,
+        engines=list(engines) or None,
+        strategies=list(strategies) or None,
+        tolerances=Tolerances(flow_time=tolerance, metric=tolerance, mse=tolerance),
     )
-    simulator.run()
-    simulator.visualize(save_path=output)
+    for mismatch in mismatches:
+        print(mismatch)
+    if mismatches:
+        raise click.ClickException(f"{len(mismatches)} differences from the reference")
+    print("All engines match the reference")
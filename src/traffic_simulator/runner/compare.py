@@ -0,0 +1,203 @@
+import csv
+import math
+from pathlib import Path
+
+import numpy as np
+
+from traffic_simulator.runner.result_store import Results, has_results, load_results
+
+# Points kept per line in the time series figures, so hundreds of runs stay plottable
+MAX_PLOT_POINTS = 2000
+
+SUMMARY_COLUMNS = (
+    "run",
+    "strategy",
+    "flows",
+    "drop_rate",
+    "final_mse",
+    "mean_mse",
+    "max_link_error",
+    "mean_imbalance",
+    "mean_fct",
+    "tail_fct",
+)
+
+
+def find_runs(directories: list[str]) -> list[tuple[str, Path]]:
+    """
+    Label and directory of every saved run under directories. A directory is
+    either a run's output or, after --strategy was repeated, holds one
+    subdirectory per strategy.
+    """
+    runs = []
+    for directory in directories:
+        directory = Path(directory)
+        if has_results(directory):
+            runs.append((directory.name, directory))
+            continue
+        lanes = []
+        if directory.is_dir():
+            lanes = sorted(path for path in directory.iterdir() if path.is_dir() and has_results(path))
+        if not lanes:
+            raise ValueError(f"No saved results in {directory}, run it with this version first")
+        runs.extend((f"{directory.name}/{lane.name}", lane) for lane in lanes)
+    return runs
+
+
+def _downsample(times: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Every k-th point of a series, copied out of the memory map"""
+    step = max(1, math.ceil(len(times) / MAX_PLOT_POINTS))
+    return np.array(times[::step]), np.array(values[::step])
+
+
+def _imbalance(results: Results) -> np.ndarray:
+    """Max - min link utilization in percent at each sample time, as the run's own figure plots it"""
+    utilization = results.metrics["link_utilization"]
+    if utilization.shape[1] < 2:
+        return np.zeros(len(results.times))
+    return (utilization.max(axis=1) - utilization.min(axis=1)) * 100
+
+
+def _final_errors(results: Results) -> np.ndarray:
+    """Utilization minus target of each link at the last sample"""
+    utilization = results.metrics[results.utilization_metric]
+    if not len(utilization):
+        return np.zeros(len(results.targets))
+    return np.array(utilization[-1] - results.targets)
+
+
+def summarize(label: str, results: Results, percentile: float, imbalance: np.ndarray) -> dict:
+    """One summary table row of a run; imbalance is its _imbalance() series"""
+    final_errors = _final_errors(results)
+    fct = results.flows.fct
+    has_flows = len(fct) > 0
+    dropped = int(np.sum(results.dropped_flows))
+    return {
+        "run": label,
+        "strategy": results.strategy,
+        "flows": len(fct),
+        "drop_rate": dropped / (dropped + len(fct)) if dropped else 0.0,
+        "final_mse": results.final_mse,
+        "mean_mse": float(np.mean(results.mse)) if len(results.mse) else 0.0,
+        "max_link_error": float(np.abs(final_errors).max(initial=0.0)),
+        "mean_imbalance": float(np.mean(imbalance)) if len(imbalance) else 0.0,
+        # FCTs are not importance weighted, the weights only unbias each flow's own size
+        "mean_fct": float(np.mean(fct)) if has_flows else math.nan,
+        "tail_fct": float(np.quantile(fct, percentile / 100, method="inverted_cdf")) if has_flows else math.nan,
+    }
+
+
+def compare(directories: list[str], output: str, percentile: float = 99.0) -> list[dict]:
+    """
+    Build side-by-side figures and a summary table of saved runs.
+
+    Runs are opened one at a time from their memory-mapped result stores;
+    only downsampled series and a summary row of each are kept, so hundreds
+    of runs compare in bounded memory. Writes mse.png, per_link_error.png,
+    imbalance.png, tail_fct.png and summary.csv into output and returns the
+    summary rows.
+    """
+    import matplotlib.pyplot as plt
+
+    if not 0 < percentile < 100:
+        raise ValueError("Percentile must be between 0 and 100")
+    runs = find_runs(directories)
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+
+    mse_figure, mse_axes = plt.subplots(figsize=(12, 6))
+    imbalance_figure, imbalance_axes = plt.subplots(figsize=(12, 6))
+    rows = []
+    link_ids: list[str] = []
+    errors = []
+    for label, directory in runs:
+        results = load_results(directory)
+        imbalance = _imbalance(results)
+        mse_axes.plot(*_downsample(results.mse_times, results.mse), label=label)
+        imbalance_axes.plot(*_downsample(results.times, imbalance), label=label)
+        errors.append(_final_errors(results))
+        if len(results.link_ids) > len(link_ids):
+            link_ids = list(results.link_ids)
+        rows.append(summarize(label, results, percentile, imbalance))
+        # Unmap the run before opening the next
+        del results
+
+    labels = [label for label, _ in runs]
+    legend = len(runs) <= 20
+
+    mse_axes.set(xlabel="Time (seconds)", ylabel="Mean Square Error", title="Link Utilization MSE Over Time")
+    mse_axes.grid(True)
+    if legend:
+        mse_axes.legend()
+    mse_figure.savefig(output / "mse.png", bbox_inches="tight", dpi=150)
+
+    imbalance_axes.set(xlabel="Time (seconds)", ylabel="Imbalance (%)", title="Link Imbalance (max - min utilization)")
+    imbalance_axes.grid(True)
+    if legend:
+        imbalance_axes.legend()
+    imbalance_figure.savefig(output / "imbalance.png", bbox_inches="tight", dpi=150)
+
+    # Runs may have different links; missing ones are left blank
+    error_matrix = np.full((len(errors), len(link_ids)), np.nan)
+    for i, run_errors in enumerate(errors):
+        error_matrix[i, : len(run_errors)] = run_errors
+    bound = max(float(np.nanmax(np.abs(error_matrix), initial=0.0)), 1e-9)
+    error_figure, error_axes = plt.subplots(figsize=(max(6, len(link_ids) * 0.6), max(4, len(runs) * 0.3)))
+    image = error_axes.imshow(error_matrix, cmap="coolwarm", vmin=-bound, vmax=bound, aspect="auto")
+    error_axes.set_xticks(range(len(link_ids)), link_ids, rotation=90)
+    error_axes.set_yticks(range(len(labels)), labels)
+    error_axes.set_title("Final Utilization Error per Link (actual - target)")
+    error_figure.colorbar(image, ax=error_axes)
+    error_figure.savefig(output / "per_link_error.png", bbox_inches="tight", dpi=150)
+
+    fct_figure, fct_axes = plt.subplots(figsize=(10, max(4, len(runs) * 0.3)))
+    positions = np.arange(len(rows))
+    fct_axes.barh(positions, [row["tail_fct"] for row in rows], label=f"p{percentile:g} FCT")
+    fct_axes.plot([row["mean_fct"] for row in rows], positions, "ko", label="mean FCT")
+    fct_axes.set_yticks(positions, labels)
+    fct_axes.invert_yaxis()
+    fct_axes.set(xlabel="Flow completion time (seconds)", title="Tail Flow Completion Time")
+    fct_axes.legend()
+    fct_figure.savefig(output / "tail_fct.png", bbox_inches="tight", dpi=150)
+    plt.close("all")
+
+    with open(output / "summary.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+
+def format_summary(rows: list[dict], percentile: float) -> str:
+    """The summary rows as an aligned text table"""
+    headers = [
+        "run",
+        "strategy",
+        "flows",
+        "drops",
+        "final MSE",
+        "mean MSE",
+        "max |error|",
+        "imbalance %",
+        "mean FCT",
+        f"p{percentile:g} FCT",
+    ]
+    cells = [
+        [
+            row["run"],
+            row["strategy"],
+            str(row["flows"]),
+            f"{row['drop_rate']:.2%}",
+            f"{row['final_mse']:.6f}",
+            f"{row['mean_mse']:.6f}",
+            f"{row['max_link_error']:.4f}",
+            f"{row['mean_imbalance']:.2f}",
+            f"{row['mean_fct']:.4f}",
+            f"{row['tail_fct']:.4f}",
+        ]
+        for row in rows
+    ]
+    widths = [max(len(line[i]) for line in [headers] + cells) for i in range(len(headers))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(line, widths)) for line in [headers] + cells
+    )
@@ -0,0 +1,468 @@
+import dataclasses
+import pathlib
+import random
+
+import numpy as np
+
+from traffic_simulator.config.config_loader import load_config
+from traffic_simulator.config.models import MainConfig
+from traffic_simulator.flows.distribution import Distribution, DistributionFactory
+from traffic_simulator.flows.flow_generator import (
+    FlowGenerator,
+    FlowGeneratorFactory,
+    ListFlowGenerator,
+    TraceFlowGenerator,
+)
+from traffic_simulator.flows.flow_size_generator import (
+    FlowSizeGenerator,
+    FlowSizeGeneratorFactory,
+)
+from traffic_simulator.flows.workload_cache import WorkloadCache
+from traffic_simulator.metrics.metric_collector import UTILIZATION_METRICS
+from traffic_simulator.metrics.metric_manager import LinkMetricsTracker
+from traffic_simulator.metrics.variance_reduction import (
+    antithetic_reduction,
+    control_variate,
+    effective_sample_size,
+    weighted_quantile,
+)
+from traffic_simulator.ports.link import Link, create_links
+from traffic_simulator.ports.queue_discipline import QueueDisciplineFactory
+from traffic_simulator.ports.strategy import StrategyFactory
+from traffic_simulator.runner.result_cache import (
+    has_cached_results,
+    invalidate_results,
+    record_results,
+    result_key,
+)
+from traffic_simulator.runner.result_store import collect_results, save_results
+from traffic_simulator.simulator.analytic import LinkEstimate, estimate_links
+from traffic_simulator.simulator.fluid import FluidSimulator, fluid_routing_weights
+from traffic_simulator.simulator.lockstep import LockstepSimulator
+from traffic_simulator.simulator.sharded import ShardedSimulator
+from traffic_simulator.simulator.simulator import Simulator
+
+
+def build_links(sim_config: MainConfig) -> tuple[list[Link], LinkMetricsTracker]:
+    """Create the configured links and a metrics tracker registered to them"""
+    links = create_links(
+        [link.capacity for link in sim_config.network.links],
+        [link.time_window_duration for link in sim_config.network.links],
+        [link.buffer_capacity for link in sim_config.network.links],
+        sim_config.network.shared_buffer,
+        QueueDisciplineFactory.create_discipline(sim_config.network, sim_config.traffic),
+    )
+    links_metric_tracker = LinkMetricsTracker(
+        sim_config.simulation.metrics.sample_interval,
+        sim_config.simulation.metrics.telemetry_delay,
+    )
+    for link in links:
+        links_metric_tracker.register_link(link)
+    return links, links_metric_tracker
+
+
+def build_simulator(
+    sim_config: MainConfig,
+    strategy_name: str,
+    flow_generator: FlowGenerator,
+    flow_size_generator: FlowSizeGenerator,
+    distribution: Distribution,
+    workers: int | None = None,
+) -> Simulator:
+    """
+    Create the links, metrics tracker and strategy of one simulation.
+    With workers set, links are simulated in that many processes by a ShardedSimulator.
+    """
+    links, links_metric_tracker = build_links(sim_config)
+
+    strategy = StrategyFactory.create_strategy(
+        strategy_name=strategy_name,
+        links=links,
+        config=sim_config,
+        link_metric_tracker=links_metric_tracker,
+        flow_size_generator=flow_size_generator,
+        distribution=distribution,
+    )
+
+    kwargs = {}
+    simulator_class = Simulator
+    if workers is not None:
+        kwargs["workers"] = workers
+        simulator_class = ShardedSimulator
+
+    return simulator_class(
+        duration=sim_config.simulation.duration,
+        flow_generator=flow_generator,
+        flow_size_generator=flow_size_generator,
+        strategy=strategy,
+        links=links,
+        link_configs=sim_config.network.links,
+        link_metric_tracker=links_metric_tracker,
+        utilization_metric=UTILIZATION_METRICS[sim_config.simulation.metrics.utilization],
+        **kwargs,
+    )
+
+
+def build_fluid_simulator(
+    sim_config: MainConfig, strategy_name: str, distribution: Distribution
+) -> FluidSimulator:
+    """Create the fluid approximation of one simulation"""
+    if sim_config.traffic.flow_arrival.type != "poisson":
+        raise ValueError("The fluid engine needs Poisson flow arrivals")
+    if sim_config.traffic.classes:
+        raise ValueError("The fluid engine needs a single traffic class")
+    if sim_config.network.has_finite_buffers():
+        raise ValueError("The fluid engine models infinite buffers, it cannot drop flows")
+    if sim_config.network.queue_discipline != "fifo":
+        raise ValueError("The fluid engine models FIFO links")
+
+    links, links_metric_tracker = build_links(sim_config)
+    time_step = sim_config.simulation.fluid_time_step
+    if time_step is None:
+        time_step = sim_config.simulation.metrics.sample_interval / 10
+
+    return FluidSimulator(
+        duration=sim_config.simulation.duration,
+        time_step=time_step,
+        arrival_rate=sim_config.traffic.flow_arrival.rate,
+        mean_flow_size=distribution.mean(),
+        routing_weights=fluid_routing_weights(sim_config, strategy_name),
+        links=links,
+        link_configs=sim_config.network.links,
+        link_metric_tracker=links_metric_tracker,
+        utilization_metric=UTILIZATION_METRICS[sim_config.simulation.metrics.utilization],
+    )
+
+
+def report_fluid_validation(
+    name: str, discrete: Simulator, fluid: FluidSimulator
+) -> None:
+    """Print how far the fluid engine is from the discrete engine on each link"""
+    discrete_times, discrete_utilization = discrete.metrics_tracker.get_metric_series("link_utilization")
+    fluid_times, fluid_utilization = fluid.metrics_tracker.get_metric_series("link_utilization")
+    _, discrete_buffer = discrete.metrics_tracker.get_metric_series("buffer_occupancy")
+    _, fluid_buffer = fluid.metrics_tracker.get_metric_series("buffer_occupancy")
+
+    # Both engines sample on the same grid; the discrete one keeps going until its queues drain
+    common = min(len(discrete_times), len(fluid_times))
+    print(f"{name}: fluid vs discrete over {common} samples")
+    for column, link_config in enumerate(fluid.link_configs):
+        utilization_error = abs(
+            discrete_utilization[:common, column] - fluid_utilization[:common, column]
+        ).mean()
+        print(
+            f"  {link_config.id}: final utilization {fluid_utilization[common - 1, column]:.4f} "
+            f"vs {discrete_utilization[common - 1, column]:.4f} (mean error {utilization_error:.4f}), "
+            f"mean buffer occupancy {fluid_buffer[:common, column].mean():.1f} "
+            f"vs {discrete_buffer[:common, column].mean():.1f}"
+        )
+
+
+def report_variance_reduction(
+    name: str, sim_config: MainConfig, simulator: Simulator, distribution: Distribution
+) -> None:
+    """Print the variance reduction the configured techniques achieved on the mean FCT"""
+    options = sim_config.simulation.variance_reduction
+    flows = sorted(
+        (flow for link in simulator.links for flow in link.flows), key=lambda flow: flow.id
+    )
+    if not flows:
+        return
+    fcts = np.array([flow.end_time - flow.arrival_time for flow in flows])
+    sizes = np.array([flow.flow_size for flow in flows], dtype=np.float64)
+
+    if options.tail_probability > 0:
+        # The likelihood ratios only unbias statistics of each flow's own size.
+        # Oversampled large flows also load the links, so FCTs are those of the
+        # tilted workload and are reported unweighted.
+        weights = np.array([flow.weight for flow in flows])
+        print(
+            f"{name}: importance-weighted flow size p99 {weighted_quantile(sizes, weights, 0.99):.0f}, "
+            f"p99.9 {weighted_quantile(sizes, weights, 0.999):.0f} "
+            f"(effective sample size {effective_sample_size(weights):.0f} of {len(flows)} flows); "
+            f"FCTs are of the tilted workload"
+        )
+
+    if options.antithetic:
+        print(
+            f"{name}: antithetic pairs reduce the variance of the mean flow size "
+            f"{antithetic_reduction(sizes):.2f}x and of the mean FCT {antithetic_reduction(fcts):.2f}x"
+        )
+
+    if options.control_variate and sim_config.traffic.classes:
+        # The control's known mean is that of traffic.flow_size alone
+        print(f"{name}: no control-variate estimate (mixed traffic classes)")
+    elif options.control_variate and options.tail_probability > 0:
+        # Tilted sizes do not have the configured mean, and the FCTs are not those of the configured workload
+        print(f"{name}: no control-variate estimate (importance sampling tilts the flow sizes)")
+    elif options.control_variate:
+        try:
+            estimate = control_variate(fcts, sizes, distribution.mean(), options.num_batches)
+        except ValueError as e:
+            print(f"{name}: no control-variate estimate ({e})")
+            return
+        print(
+            f"{name}: mean FCT {estimate.mean:.4f} ± {estimate.std_error:.4f} s, "
+            f"control-variate corrected {estimate.corrected_mean:.4f} ± {estimate.corrected_std_error:.4f} s "
+            f"({estimate.variance_reduction:.2f}x variance reduction)"
+        )
+
+
+def report_traffic_classes(name: str, sim_config: MainConfig, simulator: Simulator) -> None:
+    """Print the flow count, byte share and FCT of each traffic class"""
+    flows = [flow for link in simulator.links for flow in link.flows]
+    if not flows:
+        return
+    classes = np.array([flow.traffic_class for flow in flows])
+    sizes = np.array([flow.flow_size for flow in flows], dtype=np.float64)
+    fcts = np.array([flow.end_time - flow.arrival_time for flow in flows])
+    weights = np.array([flow.weight for flow in flows])
+
+    print(f"{name}: per traffic class")
+    class_names = [sim_config.traffic.name] + [
+        traffic_class.name for traffic_class in sim_config.traffic.classes
+    ]
+    for traffic_class in class_names:
+        members = classes == traffic_class
+        if not members.any():
+            print(f"  {traffic_class}: no completed flows")
+            continue
+        # Byte shares only depend on each flow's own size, so they take the importance sampling weights
+        print(
+            f"  {traffic_class}: {members.sum()} flows, "
+            f"{np.sum(sizes[members] * weights[members]) / np.sum(sizes * weights):.1%} of bytes, "
+            f"mean FCT {fcts[members].mean():.4f} s, "
+            f"p99 FCT {np.quantile(fcts[members], 0.99, method='inverted_cdf'):.4f} s"
+        )
+
+
+def report_drops(name: str, sim_config: MainConfig, simulator: Simulator) -> None:
+    """Print the flows and bytes each link dropped and its drop rate"""
+    state = simulator.links[0].state
+    print(f"{name}: buffer drops")
+    for link, link_config in zip(simulator.links, sim_config.network.links):
+        index = link.index
+        dropped = int(state.dropped_flows[index])
+        offered = dropped + int(state.completed_flows[index]) + int(state.queued_flows[index])
+        print(
+            f"  {link_config.id}: {dropped} flows dropped "
+            f"({dropped / offered if offered else 0.0:.2%} of {offered}), "
+            f"{state.dropped_bytes[index]:.0f} bytes"
+        )
+
+
+def save_lane(
+    output: str,
+    name: str,
+    sim_config: MainConfig,
+    simulator: Simulator | FluidSimulator,
+    subdirectory: bool,
+    plots: bool,
+) -> None:
+    """Save one strategy's result store, and figures if requested, into output or its subdirectory name"""
+    lane_path = pathlib.Path(output)
+    if subdirectory:
+        lane_path = lane_path / name
+        lane_path.mkdir(parents=True, exist_ok=True)
+    save_results(collect_results(simulator, sim_config, name), lane_path)
+    if plots:
+        simulator.visualize(save_path=str(lane_path))
+
+
+def report_estimates(
+    name: str, estimates: list[LinkEstimate], simulator: Simulator | None = None
+) -> None:
+    """Print the analytic estimates of each link, next to the simulated values if given"""
+    print(f"{name}: M/G/1 estimates")
+    for position, estimate in enumerate(estimates):
+        line = (
+            f"  {estimate.link_id}: utilization {estimate.utilization:.4f}, "
+            f"mean waiting {estimate.mean_waiting_time:.4f} s, mean FCT {estimate.mean_fct:.4f} s"
+        )
+        if simulator is not None:
+            link = simulator.links[position]
+            state = link.state
+            completed = max(int(state.completed_flows[link.index]), 1)
+            utilization = simulator.metrics_tracker.get_latest_values("link_utilization")
+            line += (
+                f" | simulated utilization {utilization[position]:.4f}, "
+                f"mean waiting {(state.fct_sum[link.index] - state.busy_time[link.index]) / completed:.4f} s, "
+                f"mean FCT {state.fct_sum[link.index] / completed:.4f} s"
+            )
+        print(line)
+
+
+def run_simulation(
+    config: str,
+    output: str,
+    dynamic_lambda: bool = False,
+    workload_cache: str | None = None,
+    strategies: tuple[str, ...] = (),
+    force: bool = False,
+    plots: bool = True,
+    analytic: str = "off",
+    engine: str = "discrete",
+    workers: int = 1,
+) -> None:
+    """
+    Run the simulation described by a config file and save its results into output.
+
+    analytic: "only" prints closed-form M/G/1 estimates instead of simulating,
+    "auto" prints them next to the simulated values where they apply.
+    engine: "discrete" simulates every flow, "fluid" runs the mean-field
+    approximation, "validate" runs both and prints how far apart they are,
+    "sharded" simulates the links in `workers` processes.
+    """
+    # Load the configuration file
+    sim_config = load_config(config)
+    strategy_names = list(dict.fromkeys(strategies)) or [sim_config.network.strategy]
+
+    estimates = {}
+    if analytic != "off":
+        distribution = DistributionFactory.create_distribution(distribution_type=sim_config.traffic.flow_size.type, params=sim_config.traffic.flow_size.params)
+        for name in strategy_names:
+            try:
+                estimates[name] = estimate_links(sim_config, distribution, name)
+            except ValueError as e:
+                print(f"{name}: no analytic estimate ({e}), simulation needed")
+
+    if analytic == "only":
+        for name, link_estimates in estimates.items():
+            report_estimates(name, link_estimates)
+        return
+
+    # Create the output directory if it does not exist
+    pathlib.Path(output).mkdir(parents=True, exist_ok=True)
+
+    # Skip runs whose results are already in the output directory
+    cache_key = result_key(
+        sim_config,
+        flags={
+            "dynamic_lambda": dynamic_lambda,
+            "strategies": list(strategies),
+            "plots": plots,
+            "analytic": analytic,
+            "engine": engine,
+        },
+    )
+    if not force and has_cached_results(output, cache_key):
+        print(f"Results in {output} are up to date for {config}, skipping (use --force to rerun)")
+        return
+    invalidate_results(output)
+
+    distribution = DistributionFactory.create_distribution(distribution_type=sim_config.traffic.flow_size.type, params=sim_config.traffic.flow_size.params)
+
+    flow_size_generator = FlowSizeGeneratorFactory.create_generator(sim_config, distribution)
+
+    # Calculate dynamic lambda if requested
+    if sim_config.traffic.flow_arrival.type == "poisson":
+        arrival_rate = sim_config.traffic.flow_arrival.rate
+        if dynamic_lambda:
+            from traffic_simulator.flows.lambda_calculator import calculate_dynamic_lambda
+            links = create_links([link.capacity for link in sim_config.network.links])
+            arrival_rate = calculate_dynamic_lambda(distribution, links)
+
+        print(f"Dynamic lambda calculated: {arrival_rate:.2f} (vs. config: {sim_config.traffic.flow_arrival.rate:.2f})")
+
+    if engine == "fluid":
+        for name in strategy_names:
+            fluid = build_fluid_simulator(sim_config, name, distribution)
+            fluid.run()
+            print(f"{name}: final MSE {fluid.mse_samples[-1] if fluid.mse_samples else 0.0:.6f} (fluid)")
+            save_lane(output, name, sim_config, fluid, len(strategy_names) > 1, plots)
+        record_results(output, cache_key)
+        return
+
+    flow_generator = FlowGeneratorFactory.create_generator(sim_config, flow_size_generator)
+    if engine == "validate":
+        flows = list(flow_generator.generate_flows(0, sim_config.simulation.duration))
+        routing_state = random.getstate()
+        for i, name in enumerate(strategy_names):
+            fluid = build_fluid_simulator(sim_config, name, distribution)
+            fluid.run()
+            # Every strategy routes the same flows from the same random state, as it would alone
+            random.setstate(routing_state)
+            lane_flows = flows if i == 0 else [dataclasses.replace(flow) for flow in flows]
+            discrete = build_simulator(
+                sim_config, name, ListFlowGenerator(lane_flows), flow_size_generator, distribution
+            )
+            discrete.run()
+            report_fluid_validation(name, discrete, fluid)
+        record_results(output, cache_key)
+        return
+
+    if workload_cache is not None and sim_config.simulation.variance_reduction.tail_probability > 0:
+        # Traces keep no importance sampling weights
+        print("Not caching the workload: importance-sampled flows carry weights traces cannot store")
+    elif workload_cache is not None and sim_config.traffic.classes:
+        print("Not caching the workload: traces cannot store the traffic class of each flow")
+    elif workload_cache is not None and sim_config.traffic.flow_arrival.type != "trace":
+        trace_path = WorkloadCache(workload_cache).get_or_create(sim_config, flow_generator)
+        flow_generator = TraceFlowGenerator(trace_path, retain_flows=True)
+
+    if engine == "sharded":
+        flows = list(flow_generator.generate_flows(0, sim_config.simulation.duration))
+        for i, name in enumerate(strategy_names):
+            # Links record scheduling times on the flow, so each strategy needs its own copies
+            lane_flows = flows if i == 0 else [dataclasses.replace(flow) for flow in flows]
+            simulator = build_simulator(
+                sim_config,
+                name,
+                ListFlowGenerator(lane_flows),
+                flow_size_generator,
+                distribution,
+                workers=workers,
+            )
+            simulator.run()
+            print(f"{name}: final MSE {simulator.mse_samples[-1] if simulator.mse_samples else 0.0:.6f}")
+            if name in estimates:
+                report_estimates(name, estimates[name], simulator)
+            report_variance_reduction(name, sim_config, simulator, distribution)
+            if sim_config.traffic.classes:
+                report_traffic_classes(name, sim_config, simulator)
+            if sim_config.network.has_finite_buffers():
+                report_drops(name, sim_config, simulator)
+            save_lane(output, name, sim_config, simulator, len(strategy_names) > 1, plots)
+        record_results(output, cache_key)
+        return
+
+    if len(strategy_names) > 1:
+        # Evaluate every strategy on the same arrival stream in one pass
+        lockstep = LockstepSimulator(
+            duration=sim_config.simulation.duration,
+            flow_generator=flow_generator,
+            lanes={
+                name: build_simulator(
+                    sim_config, name, flow_generator, flow_size_generator, distribution
+                )
+                for name in strategy_names
+            },
+        )
+        lockstep.run()
+        for name, mse in lockstep.final_mse().items():
+            print(f"{name}: final MSE {mse:.6f}")
+        for name, link_estimates in estimates.items():
+            report_estimates(name, link_estimates, lockstep.lanes[name])
+        for name, lane in lockstep.lanes.items():
+            report_variance_reduction(name, sim_config, lane, distribution)
+            if sim_config.traffic.classes:
+                report_traffic_classes(name, sim_config, lane)
+            if sim_config.network.has_finite_buffers():
+                report_drops(name, sim_config, lane)
+            save_lane(output, name, sim_config, lane, True, plots)
+        record_results(output, cache_key)
+        return
+
+    simulator = build_simulator(
+        sim_config, strategy_names[0], flow_generator, flow_size_generator, distribution
+    )
+    simulator.run()
+    for name, link_estimates in estimates.items():
+        report_estimates(name, link_estimates, simulator)
+    report_variance_reduction(strategy_names[0], sim_config, simulator, distribution)
+    if sim_config.traffic.classes:
+        report_traffic_classes(strategy_names[0], sim_config, simulator)
+    if sim_config.network.has_finite_buffers():
+        report_drops(strategy_names[0], sim_config, simulator)
+    save_lane(output, strategy_names[0], sim_config, simulator, False, plots)
+    record_results(output, cache_key)
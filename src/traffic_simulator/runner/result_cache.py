@@ -0,0 +1,89 @@
+import hashlib
+import json
+from importlib import metadata
+from pathlib import Path
+
+from traffic_simulator.config.models import MainConfig
+
+MANIFEST_NAME = ".result-cache.json"
+# Written when a run starts, so record_results can tell the files it wrote from older ones
+PENDING_NAME = ".result-cache.pending"
+
+
+def _package_version() -> str:
+    try:
+        return metadata.version("traffic-simulator")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def result_key(config: MainConfig, flags: dict) -> str:
+    """
+    Content hash of everything that determines a run's results: the resolved
+    config, the seed, the CLI flags that affect the simulation and the
+    package version.
+    """
+    inputs = {
+        "config": config.model_dump(mode="json"),
+        "seed": config.simulation.seed,
+        "flags": flags,
+        "version": _package_version(),
+    }
+
+    # A replayed trace is identified by its path, size and modification time
+    flow_arrival = config.traffic.flow_arrival
+    if flow_arrival.type == "trace" and Path(flow_arrival.path).exists():
+        stat = Path(flow_arrival.path).stat()
+        inputs["trace"] = [stat.st_size, stat.st_mtime_ns]
+
+    # So are the CDF files of empirical flow sizes
+    cdf_stats = [Path(path).stat() for path in config.traffic.empirical_cdf_paths() if Path(path).exists()]
+    if cdf_stats:
+        inputs["cdf_files"] = [[stat.st_size, stat.st_mtime_ns] for stat in cdf_stats]
+
+    encoded = json.dumps(inputs, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def has_cached_results(output_dir: str | Path, key: str) -> bool:
+    """True if output_dir holds the complete results of a run with this key"""
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return False
+
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except json.JSONDecodeError:
+        return False
+
+    if manifest.get("key") != key:
+        return False
+    return all((Path(output_dir) / name).exists() for name in manifest.get("files", []))
+
+
+def record_results(output_dir: str | Path, key: str) -> None:
+    """
+    Mark the files written into output_dir since invalidate_results as the
+    results of a run with this key. Older files, such as those of an earlier
+    run that this one no longer writes, are left out.
+    """
+    output_dir = Path(output_dir)
+    pending_path = output_dir / PENDING_NAME
+    # Files are compared with the marker's modification time, so both come from the same clock
+    started = pending_path.stat().st_mtime_ns if pending_path.exists() else 0
+    files = sorted(
+        str(path.relative_to(output_dir))
+        for path in output_dir.rglob("*")
+        if path.is_file()
+        and path.name not in (MANIFEST_NAME, PENDING_NAME)
+        and path.stat().st_mtime_ns >= started
+    )
+    manifest = {"key": key, "version": _package_version(), "files": files}
+    (output_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+    pending_path.unlink(missing_ok=True)
+
+
+def invalidate_results(output_dir: str | Path) -> None:
+    """Forget any cached results in output_dir and mark the start of a new run"""
+    (Path(output_dir) / MANIFEST_NAME).unlink(missing_ok=True)
+    (Path(output_dir) / PENDING_NAME).touch()
@@ -0,0 +1,152 @@
+import json
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+import numpy as np
+
+from traffic_simulator.config.models import MainConfig
+from traffic_simulator.simulator.fluid import FluidSimulator
+from traffic_simulator.simulator.simulator import Simulator
+
+# Subdirectory of a run's output directory holding its series as .npy files
+STORE_NAME = "series"
+STORE_FORMAT_VERSION = 2
+
+
+@dataclass
+class FlowStatistics:
+    """Completed flows as arrays, one entry per flow in id order"""
+
+    ids: np.ndarray
+    links: np.ndarray  # Position of the flow's link in config.network.links
+    arrival_times: np.ndarray
+    flow_sizes: np.ndarray
+    start_times: np.ndarray
+    end_times: np.ndarray
+    weights: np.ndarray  # Importance sampling weights, 1 without importance sampling
+    traffic_classes: np.ndarray  # Class name of each flow, empty without traffic classes
+
+    @property
+    def fct(self) -> np.ndarray:
+        """Flow completion times"""
+        return self.end_times - self.arrival_times
+
+
+@dataclass
+class Results:
+    """Everything a run measured, kept in memory or memory-mapped from a result store"""
+
+    strategy: str
+    link_ids: list[str]
+    targets: np.ndarray  # Target utilization of each link
+    times: np.ndarray  # Sample times of the metric series
+    metrics: dict[str, np.ndarray]  # (time, link) array per metric
+    utilization_metric: str  # Metric the MSE compares against the targets
+    mse_times: np.ndarray
+    mse: np.ndarray
+    flows: FlowStatistics
+    dropped_flows: np.ndarray  # Flows each link's full buffer dropped, 0 with infinite buffers
+
+    @property
+    def final_mse(self) -> float:
+        return float(self.mse[-1]) if len(self.mse) else 0.0
+
+
+def _flow_statistics(simulator: Simulator | FluidSimulator) -> FlowStatistics:
+    flows = [(flow, position) for position, link in enumerate(simulator.links) for flow in link.flows]
+    flows.sort(key=lambda item: item[0].id)
+    return FlowStatistics(
+        ids=np.array([flow.id for flow, _ in flows], dtype=np.int64),
+        links=np.array([position for _, position in flows], dtype=np.int64),
+        arrival_times=np.array([flow.arrival_time for flow, _ in flows], dtype=np.float64),
+        flow_sizes=np.array([flow.flow_size for flow, _ in flows], dtype=np.float64),
+        start_times=np.array([flow.start_time for flow, _ in flows], dtype=np.float64),
+        end_times=np.array([flow.end_time for flow, _ in flows], dtype=np.float64),
+        weights=np.array([flow.weight for flow, _ in flows], dtype=np.float64),
+        traffic_classes=np.array([flow.traffic_class or "" for flow, _ in flows], dtype=str),
+    )
+
+
+def collect_results(
+    simulator: Simulator | FluidSimulator, config: MainConfig, strategy_name: str
+) -> Results:
+    """Copy the series and flows of a finished simulation out of its tracker and links"""
+    tracker = simulator.metrics_tracker
+    times, _ = tracker.get_metric_series("link_utilization")
+    state = simulator.links[0].state
+    return Results(
+        strategy=strategy_name,
+        link_ids=[link.id for link in config.network.links],
+        targets=np.array([link.target_utilization for link in config.network.links]),
+        times=times.copy(),
+        metrics={name: tracker.get_metric_series(name)[1].copy() for name in tracker.get_metric_names()},
+        utilization_metric=simulator.utilization_metric,
+        mse_times=np.array(simulator.mse_timestamps, dtype=np.float64),
+        mse=np.array(simulator.mse_samples, dtype=np.float64),
+        flows=_flow_statistics(simulator),
+        dropped_flows=state.dropped_flows[[link.index for link in simulator.links]].copy(),
+    )
+
+
+def save_results(results: Results, directory: str | Path) -> Path:
+    """
+    Write results into a result store under directory: one .npy file per
+    array and a run.json describing them, so load_results can map each
+    array back without reading it.
+    """
+    store = Path(directory) / STORE_NAME
+    store.mkdir(parents=True, exist_ok=True)
+
+    np.save(store / "targets.npy", results.targets)
+    np.save(store / "times.npy", results.times)
+    for name, values in results.metrics.items():
+        np.save(store / f"metric.{name}.npy", values)
+    np.save(store / "mse_times.npy", results.mse_times)
+    np.save(store / "mse.npy", results.mse)
+    np.save(store / "dropped_flows.npy", results.dropped_flows)
+    for field in fields(FlowStatistics):
+        np.save(store / f"flows.{field.name}.npy", getattr(results.flows, field.name))
+
+    description = {
+        "format_version": STORE_FORMAT_VERSION,
+        "strategy": results.strategy,
+        "link_ids": results.link_ids,
+        "metrics": list(results.metrics),
+        "utilization_metric": results.utilization_metric,
+    }
+    (store / "run.json").write_text(json.dumps(description, indent=2))
+    return store
+
+
+def has_results(directory: str | Path) -> bool:
+    return (Path(directory) / STORE_NAME / "run.json").exists()
+
+
+def load_results(directory: str | Path) -> Results:
+    """
+    Open the result store under directory with every array memory-mapped,
+    so only the parts a caller touches are read from disk.
+    """
+    store = Path(directory) / STORE_NAME
+    try:
+        description = json.loads((store / "run.json").read_text())
+    except (OSError, json.JSONDecodeError):
+        raise ValueError(f"No saved results in {directory}") from None
+    if description.get("format_version") != STORE_FORMAT_VERSION:
+        raise ValueError(f"Results in {directory} were saved in an unsupported format, rerun it")
+
+    def load(name: str) -> np.ndarray:
+        return np.load(store / f"{name}.npy", mmap_mode="r")
+
+    return Results(
+        strategy=description["strategy"],
+        link_ids=description["link_ids"],
+        targets=load("targets"),
+        times=load("times"),
+        metrics={name: load(f"metric.{name}") for name in description["metrics"]},
+        utilization_metric=description["utilization_metric"],
+        mse_times=load("mse_times"),
+        mse=load("mse"),
+        flows=FlowStatistics(**{field.name: load(f"flows.{field.name}") for field in fields(FlowStatistics)}),
+        dropped_flows=load("dropped_flows"),
+    )
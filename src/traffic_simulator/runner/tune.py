@@ -0,0 +1,153 @@
+import contextlib
+import io
+import math
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import yaml
+
+from traffic_simulator.config.models import MainConfig
+from traffic_simulator.runner.api import run
+
+# Network parameters searched for each strategy
+TUNABLE_PARAMETERS = {
+    "wcmp": ("weights",),
+    "weighted_power_of_two": ("weights",),
+    "weighted_sampled_least_congested": ("weights",),
+    "uneven": ("weights", "buffer_links", "large_flow_percentile"),
+    "percentile_based": ("large_flow_contribution",),
+}
+OBJECTIVES = ("mse", "fct_p99")
+
+
+@dataclass
+class Candidate:
+    """One point of the search space and its score at the last duration it reached"""
+
+    params: dict
+    score: float = math.inf
+    duration: float = 0.0
+
+
+def sample_params(config: MainConfig, strategy_name: str, rng: np.random.Generator) -> dict:
+    """Draw a random setting of the parameters tunable for strategy_name"""
+    network = config.network
+    params = {}
+    for name in TUNABLE_PARAMETERS[strategy_name]:
+        if name == "weights":
+            # Perturb the current weights multiplicatively, so links keep their rough order
+            base = np.array(network.routing_weights(), dtype=np.float64)
+            weights = base * rng.lognormal(0.0, 0.5, len(base))
+            params["weights"] = [round(float(w), 4) for w in weights / weights.sum() * base.sum()]
+        elif name == "buffer_links":
+            params["buffer_links"] = int(rng.integers(0, len(network.links)))
+        elif name == "large_flow_percentile":
+            params["large_flow_percentile"] = round(float(rng.uniform(80.0, 99.9)), 2)
+        elif name == "large_flow_contribution":
+            params["large_flow_contribution"] = round(float(np.exp(rng.uniform(np.log(0.01), np.log(0.5)))), 4)
+    return params
+
+
+def apply_params(config: MainConfig, params: dict, duration: float | None = None) -> MainConfig:
+    """Copy of config with the network parameters replaced, and optionally a shorter run"""
+    data = config.model_dump(mode="json", exclude_unset=True)
+    data["network"].update(params)
+    if duration is not None:
+        data["simulation"]["duration"] = duration
+    return MainConfig.model_validate(data)
+
+
+def evaluate_candidate(config_data: dict, strategy_name: str, objective: str, seed: int) -> float:
+    """
+    Simulate one candidate config and return its objective, lower is better.
+    Module level so a process pool can pickle it.
+    """
+    # Every candidate sees the same random numbers, so score differences come from the parameters
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run(MainConfig.model_validate(config_data), strategy_name, routing_seed=seed)
+
+    if objective == "mse":
+        return results.final_mse if len(results.mse) else math.inf
+
+    if len(results.flows.ids) == 0:
+        return math.inf
+    return float(np.quantile(results.flows.fct, 0.99, method="inverted_cdf"))
+
+
+def successive_halving(
+    config: MainConfig,
+    strategy_name: str,
+    objective: str = "mse",
+    num_candidates: int = 27,
+    eta: int = 3,
+    min_duration: float | None = None,
+    workers: int = 1,
+    seed: int = 0,
+) -> list[Candidate]:
+    """
+    Search the tunable parameters of strategy_name by successive halving.
+
+    All candidates first run for min_duration simulated seconds; each round
+    keeps the best 1/eta of them and runs the survivors eta times longer, up
+    to the configured duration. Poor settings are dropped after a short run
+    instead of a full one. The current config is always one of the candidates,
+    so the result is never worse than it at full length. Returns the
+    candidates of the last round, best first.
+    """
+    if strategy_name not in TUNABLE_PARAMETERS:
+        raise ValueError(
+            f"Strategy {strategy_name} has nothing to tune, choose one of {', '.join(TUNABLE_PARAMETERS)}"
+        )
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective {objective}")
+    if eta < 2:
+        raise ValueError("eta must be at least 2")
+    if objective == "fct_p99" and config.simulation.variance_reduction.tail_probability > 0:
+        # Oversampled large flows delay every other flow, which no weighting undoes
+        raise ValueError("Importance sampling biases FCTs, tune fct_p99 with tail_probability 0")
+
+    full_duration = config.simulation.duration
+    if min_duration is None:
+        # ceil(log_eta(num_candidates)), counted exactly: floating point overshoots on powers of eta
+        rounds = 1
+        while eta**rounds < num_candidates:
+            rounds += 1
+        min_duration = full_duration / eta ** (rounds - 1)
+
+    rng = np.random.default_rng(seed)
+    current = {name: getattr(config.network, name) for name in TUNABLE_PARAMETERS[strategy_name]}
+    current["weights"] = config.network.routing_weights() if "weights" in current else None
+    current = {name: value for name, value in current.items() if value is not None}
+    candidates = [Candidate(current)] + [
+        Candidate(sample_params(config, strategy_name, rng)) for _ in range(num_candidates - 1)
+    ]
+
+    duration = min(min_duration, full_duration)
+    with ProcessPoolExecutor(max_workers=workers) if workers > 1 else contextlib.nullcontext() as pool:
+        while True:
+            jobs = [
+                (apply_params(config, candidate.params, duration).model_dump(mode="json"), strategy_name, objective, seed)
+                for candidate in candidates
+            ]
+            scores = pool.map(evaluate_candidate, *zip(*jobs)) if pool else [evaluate_candidate(*job) for job in jobs]
+            for candidate, score in zip(candidates, scores):
+                candidate.score = score
+                candidate.duration = duration
+
+            candidates.sort(key=lambda candidate: candidate.score)
+            print(
+                f"{len(candidates)} candidates at {duration:g} s: best {objective} {candidates[0].score:.6f}"
+            )
+            if duration >= full_duration or len(candidates) == 1:
+                return candidates
+
+            candidates = candidates[: max(1, len(candidates) // eta)]
+            duration = min(duration * eta, full_duration)
+
+
+def write_config(config: MainConfig, strategy_name: str, params: dict, path: str) -> None:
+    """Save config with the tuned strategy and parameters as YAML"""
+    tuned = apply_params(config, {"strategy": strategy_name, **params})
+    with open(path, "w") as f:
+        yaml.safe_dump(tuned.model_dump(mode="json", exclude_unset=True), f, sort_keys=False)
@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+
+from traffic_simulator.config.models import MainConfig
+from traffic_simulator.flows.distribution import Distribution
+
+# Strategies that split arrivals independently of link state. Random splitting
+# of a Poisson stream stays Poisson, so each link is an M/G/1 FIFO queue.
+ANALYTIC_STRATEGIES = ("ecmp", "wcmp")
+
+
+@dataclass
+class LinkEstimate:
+    """Steady-state M/G/1 prediction for one link"""
+
+    link_id: str
+    arrival_rate: float
+    utilization: float
+    mean_waiting_time: float  # Time a flow queues before transmission starts, or loses to sharing
+    mean_fct: float  # Waiting plus transmission time
+
+
+def link_arrival_rates(config: MainConfig, strategy_name: str) -> list[float]:
+    """Flow arrival rate of each link, if the strategy makes it an M/G/1 queue"""
+    flow_arrival = config.traffic.flow_arrival
+    if flow_arrival.type != "poisson":
+        raise ValueError("Analytic estimates need Poisson flow arrivals")
+    if config.traffic.classes:
+        raise ValueError("Analytic estimates need a single traffic class")
+    if config.network.has_finite_buffers():
+        raise ValueError("Analytic estimates assume infinite buffers")
+    if config.network.queue_discipline not in ("fifo", "processor_sharing"):
+        raise ValueError("Analytic estimates need FIFO or processor-sharing links")
+    if strategy_name not in ANALYTIC_STRATEGIES:
+        raise ValueError(
+            f"Strategy {strategy_name} routes on link state, so its links are not M/G/1 queues"
+        )
+
+    links = config.network.links
+    if strategy_name == "ecmp":
+        return [flow_arrival.rate / len(links)] * len(links)
+
+    weights = config.network.routing_weights()
+    total_weight = sum(weights)
+    if total_weight <= 0:
+        raise ValueError("WCMP needs a positive total target utilization")
+    return [flow_arrival.rate * weight / total_weight for weight in weights]
+
+
+def estimate_links(
+    config: MainConfig, distribution: Distribution, strategy_name: str
+) -> list[LinkEstimate]:
+    """
+    Per-link utilization, mean waiting time and mean FCT from the
+    Pollaczek-Khinchine formula, with service time flow_size / capacity.
+    Processor-sharing links have mean FCT mean_service / (1 - utilization)
+    whatever the size distribution; their waiting time is the FCT beyond
+    the transmission time.
+
+    Flow sizes are treated as continuous, so the moments slightly overstate
+    the integer sizes the generators produce. Links with utilization of 1 or
+    more have no steady state and get infinite waiting time.
+    """
+    mean_size = distribution.mean()
+    second_moment = distribution.second_moment()
+    processor_sharing = config.network.queue_discipline == "processor_sharing"
+
+    estimates = []
+    for link, arrival_rate in zip(
+        config.network.links, link_arrival_rates(config, strategy_name)
+    ):
+        mean_service = mean_size / link.capacity
+        utilization = arrival_rate * mean_service
+        if utilization >= 1:
+            mean_waiting_time = float("inf")
+        elif processor_sharing:
+            mean_waiting_time = mean_service * utilization / (1 - utilization)
+        else:
+            mean_waiting_time = (
+                arrival_rate * second_moment / link.capacity**2 / (2 * (1 - utilization))
+            )
+
+        estimates.append(
+            LinkEstimate(
+                link_id=link.id,
+                arrival_rate=arrival_rate,
+                utilization=utilization,
+                mean_waiting_time=mean_waiting_time,
+                mean_fct=mean_waiting_time + mean_service,
+            )
+        )
+
+    return estimates
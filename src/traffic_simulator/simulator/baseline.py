@@ -0,0 +1,648 @@
+"""
+A frozen copy of the original simulator: its FIFO link, strategies, event
+loop and per-link metric collection, with only the plotting left out.
+
+The equivalence harness checks every engine against it, so the optimized
+code paths cannot drift together with the reference they are compared to.
+Do not change this module when the simulator changes; configs and
+strategies it does not support are checked against the per-link reference
+instead (see supports()).
+"""
+
+import collections
+import heapq
+import random
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Deque, List
+
+import numpy as np
+
+from traffic_simulator.config.models import LinkConfig, MainConfig
+from traffic_simulator.flows.distribution import Distribution
+from traffic_simulator.flows.flow_generator import FlowGenerator
+from traffic_simulator.flows.flow_size_generator import FlowSizeGenerator
+from traffic_simulator.models.flow import Flow
+
+STRATEGY_NAMES = (
+    "ecmp",
+    "wcmp",
+    "least_congested",
+    "most_under_target",
+    "percentile_based",
+    "uneven",
+)
+
+
+def supports(config: MainConfig, strategy_name: str) -> bool:
+    """Whether the original simulator models config: FIFO links with infinite buffers, fresh cumulative utilization and unweighted flows"""
+    metrics = config.simulation.metrics
+    return (
+        strategy_name in STRATEGY_NAMES
+        and config.network.queue_discipline == "fifo"
+        and not config.network.has_finite_buffers()
+        and metrics.utilization == "cumulative"
+        and metrics.telemetry_delay == 0
+        and config.simulation.variance_reduction.tail_probability == 0
+        and not config.traffic.classes
+    )
+
+
+class Link:
+    def __init__(self, capacity_bps: float):
+        self.capacity_bps = capacity_bps  # Link capacity in bits per second
+        self.queue: Deque[Flow] = collections.deque()  # Infinite buffer queue
+
+        self.busy_until: float = 0.0  # Time until current transmission completes
+        self.flows: List[Flow] = []
+
+    def enqueue_flow(self, flow: Flow, current_time: float) -> float:
+        """
+        Enqueue a flow (packet) and schedule its transmission.
+        The flow's start and end times are determined based on the link's current busy state.
+        Also, record the flow to get the stats at end of simulation.
+        Returns the scheduled end_time (i.e. when transmission completes).
+        """
+        transmission_time = flow.flow_size / self.capacity_bps
+
+        if not self.queue and current_time >= self.busy_until:
+            # Link is idle; transmit immediately.
+            flow.start_time = current_time
+            flow.end_time = current_time + transmission_time
+        else:
+            # Link is busy; schedule after current busy period.
+            flow.start_time = self.busy_until
+            flow.end_time = self.busy_until + transmission_time
+
+        # Update the link's busy state and record the busy interval.
+        self.busy_until = flow.end_time
+
+        self.queue.append(flow)
+
+        return flow.end_time
+
+    def dequeue_flow(self, current_time: float):
+        """
+        Remove and return a flow whose transmission is complete.
+        Returns None if the flow at the head of the queue has not yet finished.
+        """
+        if self.queue and current_time >= self.queue[0].end_time:
+            flow = self.queue.popleft()
+            self.flows.append(flow)
+
+            return flow
+
+        return None
+
+    def _get_remaining_flow_size(self, flow: Flow, current_time: float) -> float:
+        """Calculates remaining flow size"""
+        if flow.start_time >= current_time:
+            return flow.flow_size
+        return flow.flow_size - (current_time - flow.start_time) * self.capacity_bps
+
+
+class MetricCollector(ABC):
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """Unique name for this metric"""
+        pass
+
+    @abstractmethod
+    def collect(self, link, current_time: float) -> float:
+        """Return a metric value given a link context and current time"""
+        pass
+
+
+class UtilizationCollector(MetricCollector):
+    @property
+    def name(self) -> str:
+        return "link_utilization"
+
+    def collect(self, link, current_time: float) -> float:
+        if current_time <= 0:
+            return 0.0
+
+        total_busy = sum(
+            min(flow.end_time, current_time) - max(flow.start_time, 0.0)
+            for flow in link.flows
+            if flow.end_time > 0.0 and flow.start_time < current_time
+        )
+
+        return total_busy / current_time
+
+
+class BufferOccupancyCollector(MetricCollector):
+    @property
+    def name(self) -> str:
+        return "buffer_occupancy"
+
+    def collect(self, link, current_time: float) -> float:
+        return sum(
+            link._get_remaining_flow_size(flow, current_time)
+            for flow in link.queue
+            if flow.end_time > current_time
+        )
+
+
+class FlowCompletionTimeCollector(MetricCollector):
+    @property
+    def name(self) -> str:
+        return "flow_completion_time"
+
+    def collect(self, link, current_time: float) -> float:
+        if not link.flows:
+            return 0.0
+
+        return sum(
+            flow.end_time - flow.arrival_time
+            for flow in link.flows
+            if flow.end_time > 0.0
+        ) / len(link.flows)
+
+
+class MetricsManager:
+    def __init__(self):
+        self._collectors: dict[str, MetricCollector] = {}
+        self.samples: dict[str, list[tuple[float, float]]] = {}
+
+    def register(self, collector: MetricCollector) -> None:
+        self._collectors[collector.name] = collector
+        self.samples[collector.name] = []
+
+    def sample_all(self, link: Any, timestamp: float) -> None:
+        for collector in self._collectors.values():
+            value = collector.collect(link, timestamp)
+            self.samples[collector.name].append((timestamp, value))
+
+
+class LinkMetricsTracker:
+    def __init__(self, sample_interval: float = 1.0):
+        self.sample_interval = sample_interval
+        self.link_metrics: dict[Link, MetricsManager] = {}
+        self.last_sample_times: dict[Link, float] = {}
+
+    def register_link(self, link: Link) -> None:
+        """Register a new link to track metrics for"""
+        metrics_manager = MetricsManager()
+        metrics_manager.register(UtilizationCollector())
+        metrics_manager.register(BufferOccupancyCollector())
+        metrics_manager.register(FlowCompletionTimeCollector())
+
+        self.link_metrics[link] = metrics_manager
+        self.last_sample_times[link] = 0.0
+
+    def sample_metrics(self, current_time: float) -> None:
+        """Sample metrics for all registered links"""
+        for link, metrics_manager in self.link_metrics.items():
+            last_sample = self.last_sample_times[link]
+            while last_sample < current_time:
+                metrics_manager.sample_all(link, last_sample)
+                last_sample += self.sample_interval
+            self.last_sample_times[link] = last_sample
+
+    def get_link_metric_samples(self, link: Link, metric_name: str):
+        """Get samples for a specific metric from a specific link"""
+        if link in self.link_metrics:
+            return self.link_metrics[link].samples.get(metric_name, [])
+        return []
+
+    # Read-out in the current tracker's layout for the equivalence harness,
+    # the only addition to the original
+
+    def get_metric_names(self) -> list[str]:
+        return ["link_utilization", "buffer_occupancy", "flow_completion_time"]
+
+    def get_metric_series(self, metric_name: str) -> tuple[np.ndarray, np.ndarray]:
+        """Sample times and a (time, link) array of values for a metric"""
+        columns = [manager.samples[metric_name] for manager in self.link_metrics.values()]
+        if not columns or not columns[0]:
+            return np.zeros(0), np.zeros((0, len(columns)))
+        times = np.array([time for time, _ in columns[0]])
+        return times, np.array([[value for _, value in column] for column in columns]).T
+
+
+def calculate_mse(
+    metrics_tracker: LinkMetricsTracker,
+    links: List[Link],
+    link_configs: List[LinkConfig],
+    current_time: float,
+) -> float:
+    """Mean Square Error between target and actual link utilizations"""
+    squared_errors = []
+
+    for link, config in zip(links, link_configs):
+        # Get actual utilization from the metrics tracker
+        samples = metrics_tracker.get_link_metric_samples(link, "link_utilization")
+        if not samples:
+            continue
+        actual_utilization = samples[-1][1]  # Get latest sample
+        target_utilization = config.target_utilization
+
+        # Calculate squared error
+        error = actual_utilization - target_utilization
+        squared_errors.append(error**2)
+
+    if not squared_errors:
+        return 0.0
+
+    # Calculate mean of squared errors
+    mse = np.mean(squared_errors)
+    return mse
+
+
+class LoadBalanceStrategy(ABC):
+    def __init__(self, links: list[Link]):
+        self.links = links
+
+    @abstractmethod
+    def select_link(self) -> Link:
+        """Choose which link to send the packet on."""
+        pass
+
+    def select_link_for_flow(self, flow: Flow) -> Link:
+        """Choose which link to send the flow on based on its characteristics.
+        Default implementation simply calls select_link()."""
+        return self.select_link()
+
+
+class ECMPStrategy(LoadBalanceStrategy):
+    def select_link(self) -> Link:
+        # Equal-cost multi-path routing
+        return random.choice(self.links)
+
+
+class WCMPSrategy(LoadBalanceStrategy):
+    def __init__(self, links: list[Link], weights: list[int]):
+        super().__init__(links)
+        self.weights = weights
+
+    def select_link(self) -> Link:
+        # Weighted multi-path routing
+        return random.choices(self.links, weights=self.weights)[0]
+
+
+class LeastCongestedStrategy(LoadBalanceStrategy):
+    def select_link(self) -> Link:
+        # Choose the least congested link
+        return min(self.links, key=lambda link: link.busy_until)
+
+
+class MostUnderTargetStrategy(LoadBalanceStrategy):
+    def __init__(
+        self,
+        links: list[Link],
+        link_metric_tracker: LinkMetricsTracker,
+        config: MainConfig,
+    ):
+        super().__init__(links)
+        self.link_metric_tracker = link_metric_tracker
+        self.config = config
+
+    def _get_utilization_gap(self, link: Link, link_config) -> float:
+        """Calculate how far a link is below its target utilization."""
+        samples = self.link_metric_tracker.get_link_metric_samples(
+            link, "link_utilization"
+        )
+        if not samples:
+            return float("-inf")
+
+        current_utilization = samples[-1][1]
+        return link_config.target_utilization - current_utilization
+
+    def _find_most_underutilized_link(self) -> Link | None:
+        """Find the link with the largest positive gap to its target utilization."""
+        utilization_gaps = [
+            (link, self._get_utilization_gap(link, link_config))
+            for link, link_config in zip(self.links, self.config.network.links)
+        ]
+
+        valid_gaps = [(link, gap) for link, gap in utilization_gaps if gap > 0]
+        if not valid_gaps:
+            return None
+
+        return max(valid_gaps, key=lambda x: x[1])[0]
+
+    def select_link(self) -> Link:
+        """Choose the link most below its target utilization, or least congested if none are under target."""
+        most_underutilized = self._find_most_underutilized_link()
+        if (most_underutilized):
+            return most_underutilized
+
+        return min(self.links, key=lambda link: link.busy_until)
+
+
+class PercentileBasedStrategy(LoadBalanceStrategy):
+    def __init__(
+        self,
+        links: list[Link],
+        link_metric_tracker: LinkMetricsTracker,
+        flow_size_generator: FlowSizeGenerator,
+    ):
+        super().__init__(links)
+        self.link_metric_tracker = link_metric_tracker
+        self.flow_size_generator = flow_size_generator
+
+        # Compute target utilizations once since the workload is static
+        self.target_utilizations = self._compute_target_utilizations()
+
+    def _compute_target_utilizations(self) -> dict[Link, float]:
+        num_links = len(self.links)
+
+        # Step 1: Sample flow sizes at 100 evenly spaced percentiles
+        probabilities = np.linspace(0.00, 1.00, 100)
+        flow_sizes = [self.flow_size_generator.generate_with_probability(p) for p in probabilities]
+
+        # Step 2: Compute the total flow size across all sampled points
+        total_flow_size = sum(flow_sizes)
+
+        # Step 3: Compute cumulative flow contributions
+        cumulative_flow_sizes = np.cumsum(flow_sizes)  # Running sum of flow sizes
+        normalized_cumulative = cumulative_flow_sizes / total_flow_size  # Normalize to [0,1]
+
+        # Step 4: Find the point where X% of total traffic is reached
+        large_flow_threshold_index = np.searchsorted(normalized_cumulative, 0.05)
+        self.large_flow_threshold = flow_sizes[min(large_flow_threshold_index - 1, len(flow_sizes) - 1)]
+
+        # Step 5: Determine per-link allocation threshold
+        per_link_flow = total_flow_size / num_links
+
+        # Step 6: Assign links based on cumulative flow size
+        target_utilizations = {}
+        cumulative_flow = 0.0
+        link_index = 0
+        threshold = per_link_flow
+
+        for flow_size, probability in zip(flow_sizes, probabilities):
+            cumulative_flow += flow_size
+
+            while cumulative_flow >= threshold and link_index < num_links:
+                link = self.links[link_index]
+
+                # Compute utilization as complementary fraction of flow range
+                utilization_fraction = probability  # Since probability is already cumulative
+                complementary_utilization_fraction = 1.0 - utilization_fraction
+                target_utilizations[link] = complementary_utilization_fraction
+
+                # Move to the next threshold
+                threshold += per_link_flow
+                link_index += 1
+
+            if link_index >= num_links:
+                break  # Stop if all links have been assigned
+
+        # Step 7: If all target utilizations sum to 0, assign 1.0 to all links
+        if sum(target_utilizations.values()) == 0:
+            for link in self.links:
+                target_utilizations[link] = 1.0
+
+        # normalize target utilizations
+        total_utilization = sum(target_utilizations.values())
+        target_utilizations = {link: util / total_utilization for link, util in target_utilizations.items()}
+
+        return target_utilizations
+
+    def get_current_utilization(self, link):
+        samples = self.link_metric_tracker.get_link_metric_samples(
+            link, "link_utilization"
+        )
+        if not samples:
+            return float("-inf")
+
+        current_utilization = samples[-1][1]
+        return current_utilization
+
+    def select_link_for_flow(self, flow: Flow) -> Link:
+        """Choose a link based on target utilization and flow size."""
+        flow_size = flow.flow_size
+        current_utilizations = {
+            link: self.get_current_utilization(link) for link in self.links
+        }
+
+        if flow_size >= self.large_flow_threshold:
+            # For large flows, assign to the link with the lowest current utilization
+            return min(self.links, key=lambda link: current_utilizations.get(link, float("inf")))
+
+        # For normal flows, assign based on target utilization
+        return random.choices(self.links, weights=[self.target_utilizations[link] for link in self.links])[0]
+
+    def select_link(self) -> Link:
+        """Default implementation when flow information isn't available."""
+        current_utilizations = {
+            link: self.get_current_utilization(link) for link in self.links
+        }
+        return min(self.links, key=lambda link: current_utilizations.get(link, float("inf")))
+
+
+class UnevenLoadBalancingStrategy(LoadBalanceStrategy):
+    def __init__(
+        self,
+        links: list[Link],
+        link_metric_tracker: LinkMetricsTracker,
+        config: MainConfig,
+        buffer_links: int = 0,
+        percentile_threshold: float = 99.0,
+        distribution: Distribution | None = None,
+    ):
+        super().__init__(links)
+        self.buffer_link_indices = list(range(buffer_links))
+        self.buffer_links = [links[i] for i in self.buffer_link_indices]
+        self.normal_links = [link for i, link in enumerate(links) if i not in self.buffer_link_indices]
+        self.link_metric_tracker = link_metric_tracker
+        self.config = config
+        self.percentile_threshold = percentile_threshold
+        self.distribution = distribution
+
+    def get_flow_size_threshold(self):
+        """Calculate the threshold for routing to buffer links"""
+        return self.distribution.percentile(self.percentile_threshold)
+
+    def select_link_for_flow(self, flow: Flow) -> Link:
+        """Choose which link to send the flow on based on its size."""
+        threshold = self.get_flow_size_threshold()
+
+        if flow.flow_size > threshold:
+            # Large flow: route to least loaded buffer link
+            if self.buffer_links:
+                return min(self.buffer_links, key=lambda link: link.busy_until)
+            else:
+                # Fallback if no buffer links defined
+                return min(self.links, key=lambda link: link.busy_until)
+        else:
+            # Normal flow: use WCMPSrategy on all links
+            weights = [link.target_utilization for link in self.config.network.links]
+            return WCMPSrategy(self.links, weights).select_link()
+
+    def select_link(self) -> Link:
+        """Default implementation when flow information isn't available."""
+        return min(self.links, key=lambda link: link.busy_until)
+
+
+class StrategyFactory:
+    @staticmethod
+    def create_strategy(
+        strategy_name: str,
+        links: list[Link],
+        config: MainConfig,
+        link_metric_tracker: LinkMetricsTracker,
+        flow_size_generator: FlowSizeGenerator,
+        distribution: Distribution | None = None,
+    ) -> LoadBalanceStrategy:
+        if strategy_name == "ecmp":
+            return ECMPStrategy(links)
+        elif strategy_name == "wcmp":
+            weights = [link.target_utilization for link in config.network.links]
+            return WCMPSrategy(links, weights)
+        elif strategy_name == "least_congested":
+            return LeastCongestedStrategy(links)
+        elif strategy_name == "most_under_target":
+            return MostUnderTargetStrategy(links, link_metric_tracker, config)
+        elif strategy_name == "percentile_based":
+            return PercentileBasedStrategy(links, link_metric_tracker, flow_size_generator)
+        elif strategy_name == "uneven":
+            buffer_links = getattr(config.network, "buffer_links", 0)
+            percentile_threshold = getattr(config.network, "large_flow_percentile", 99.0)
+            return UnevenLoadBalancingStrategy(
+                links, link_metric_tracker, config,
+                buffer_links, percentile_threshold, distribution
+            )
+        else:
+            raise ValueError(f"Invalid strategy name: {strategy_name}")
+
+
+@dataclass
+class Event:
+    time: float
+
+    def __lt__(self, other):
+        return self.time < other.time
+
+    def __eq__(self, other):
+        return self.time == other.time
+
+
+@dataclass
+class FlowArrivalEvent(Event):
+    flow: Flow
+
+
+@dataclass
+class FlowCompletionEvent(Event):
+    flow: Flow
+    link: Link
+
+
+class Simulator:
+    def __init__(
+        self,
+        duration: float,
+        flow_generator: FlowGenerator,
+        strategy: LoadBalanceStrategy,
+        links: list[Link],
+        link_configs: List[LinkConfig],
+        link_metric_tracker: LinkMetricsTracker,
+    ):
+        self.duration = duration
+        self.flow_generator = flow_generator
+        self.strategy = strategy
+        self.links = links
+        self.link_configs = link_configs
+
+        # Initialize MSE tracking
+        self.mse_samples = []
+        self.mse_timestamps = []
+
+        # Initialize simulation state
+        self._time = 0.0
+        self._events: list[Event] = []
+
+        self.metrics_tracker = link_metric_tracker
+
+    def _sample_mse(self):
+        """Sample and store current MSE value"""
+        mse = calculate_mse(
+            self.metrics_tracker, self.links, self.link_configs, self._time
+        )
+        self.mse_samples.append(mse)
+        self.mse_timestamps.append(self._time)
+
+    def run(self):
+        # Generate initial events
+        self._generate_flow_events()
+
+        while self._events:
+            # Get the next event
+            event = heapq.heappop(self._events)
+            self._time = event.time
+
+            self._sample_stats()
+
+            if isinstance(event, FlowArrivalEvent):
+                self._process_packet_arrival(event)
+            elif isinstance(event, FlowCompletionEvent):
+                self._process_packet_completion(event)
+
+        self._sample_stats()
+
+    def _generate_flow_events(self):
+        # Generate flow arrival events
+        for flow in self.flow_generator.generate_flows(0, self.duration):
+            arrival_event = FlowArrivalEvent(
+                time=flow.arrival_time,
+                flow=flow,
+            )
+            heapq.heappush(self._events, arrival_event)
+
+    def _process_packet_arrival(self, event: FlowArrivalEvent):
+        """Handle packet arrival event"""
+        link = self.strategy.select_link_for_flow(event.flow)
+
+        # Schedule packet transmission completion
+        finish_time = link.enqueue_flow(event.flow, self._time)
+        completion_event = FlowCompletionEvent(
+            time=finish_time,
+            flow=event.flow,
+            link=link,
+        )
+        heapq.heappush(self._events, completion_event)
+
+    def _process_packet_completion(self, event: FlowCompletionEvent):
+        """Handle packet completion event"""
+        link = event.link
+        link.dequeue_flow(self._time)
+
+    def _sample_stats(self):
+        # Sample link utilizations and buffer occupancy
+        self.metrics_tracker.sample_metrics(self._time)
+        self._sample_mse()
+
+
+def build_simulator(
+    config: MainConfig,
+    strategy_name: str,
+    flow_generator: FlowGenerator,
+    flow_size_generator: FlowSizeGenerator,
+    distribution: Distribution,
+) -> Simulator:
+    """Create the links, metrics tracker and strategy the way the original CLI did"""
+    links = [Link(capacity_bps=link.capacity) for link in config.network.links]
+    links_metric_tracker = LinkMetricsTracker(config.simulation.metrics.sample_interval)
+    for link in links:
+        links_metric_tracker.register_link(link)
+
+    strategy = StrategyFactory.create_strategy(
+        strategy_name=strategy_name,
+        links=links,
+        config=config,
+        link_metric_tracker=links_metric_tracker,
+        flow_size_generator=flow_size_generator,
+        distribution=distribution,
+    )
+    return Simulator(
+        duration=config.simulation.duration,
+        flow_generator=flow_generator,
+        strategy=strategy,
+        links=links,
+        link_configs=config.network.links,
+        link_metric_tracker=links_metric_tracker,
+    )
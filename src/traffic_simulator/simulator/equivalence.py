@@ -0,0 +1,343 @@
+import contextlib
+import io
+import random
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from traffic_simulator.config.choices import STRATEGY_NAMES
+from traffic_simulator.config.models import BoundedParetoParams, MainConfig
+from traffic_simulator.flows.distribution import DistributionFactory
+from traffic_simulator.flows.flow_generator import FlowGeneratorFactory, ListFlowGenerator
+from traffic_simulator.flows.flow_size_generator import FlowSizeGeneratorFactory
+from traffic_simulator.runner.pipeline import build_simulator
+from traffic_simulator.simulator import baseline
+from traffic_simulator.simulator.lockstep import LockstepSimulator
+from traffic_simulator.simulator.simulator import Simulator
+
+# Seed of the global random module, which the strategies draw from
+ROUTING_SEED = 42
+
+# Lanes run ahead of the checked strategy's lane in lockstep runs: randomized
+# strategies drawing different amounts of random numbers, and one that does not
+LOCKSTEP_COMPANIONS = ("ecmp", "power_of_two", "least_congested")
+
+# Engines recording the MSE once per sample tick instead of once per event
+PER_TICK_MSE_ENGINES = {"sharded"}
+
+
+@dataclass
+class Tolerances:
+    """Largest absolute differences accepted between two engines"""
+
+    flow_time: float = 1e-9  # Start and end time of every flow
+    # Every sampled metric value, relative to it above 1: buffer occupancies
+    # run to megabytes, where summation order alone moves the last digits
+    metric: float = 1e-9
+    mse: float = 1e-9  # Final MSE
+
+
+@dataclass
+class Mismatch:
+    """An engine whose results differ from the reference on one config"""
+
+    engine: str
+    strategy: str
+    config_index: int
+    detail: str
+
+    def __str__(self) -> str:
+        return f"config {self.config_index}, {self.strategy}, {self.engine}: {self.detail}"
+
+
+def _random_arrival(rng: np.random.Generator, rate: float, duration: float) -> dict:
+    """Arrivals of one of the generated processes with a long-run mean of about rate flows per second"""
+    kind = str(rng.choice(["poisson", "time_varying", "mmpp", "on_off"]))
+    if kind == "time_varying":
+        return {
+            "type": "time_varying",
+            "times": [0.0, duration / 2],
+            "rates": [rate / 2, rate * 1.5],
+            "interpolation": str(rng.choice(["step", "linear"])),
+        }
+    if kind == "mmpp":
+        return {"type": "mmpp", "rates": [rate / 2, rate * 1.5], "transitions": [[0.0, 0.2], [0.2, 0.0]]}
+    if kind == "on_off":
+        return {
+            "type": "on_off",
+            "rate": rate * 2,
+            "mean_on": 2.0,
+            "mean_off": 2.0,
+            "period_distribution": str(rng.choice(["exponential", "constant"])),
+        }
+    return {"type": "poisson", "rate": rate}
+
+
+def random_config(rng: np.random.Generator, strategy_name: str) -> MainConfig:
+    """
+    A small randomized config: a few links of mixed capacity under moderate to
+    heavy load, with a random queue discipline, arrival process and
+    utilization mode, and sometimes finite buffers, telemetry delay or a
+    second traffic class
+    """
+    num_links = int(rng.integers(2, 6))
+    capacities = rng.choice([5120.0, 10240.0, 20480.0], num_links)
+    targets = rng.uniform(0.1, 0.9, num_links).round(2)
+    params = {"alpha": float(rng.uniform(1.1, 2.0)), "lower": 512, "upper": 1048576}
+    duration = float(rng.integers(20, 60))
+    # Plain configs are ones the frozen baseline models, so it keeps checking
+    # the engines: FIFO links, infinite buffers, fresh cumulative utilization
+    plain = rng.random() < 0.4
+    discipline = "fifo"
+    utilization = "cumulative"
+    telemetry_delay = 0.0
+    if not plain:
+        discipline = str(rng.choice(["fifo", "srpt", "priority", "processor_sharing"]))
+        utilization = str(rng.choice(["cumulative", "sliding_window", "ewma"]))
+        telemetry_delay = float(rng.choice([0.0, 0.5, 2.0]))
+    # Only FIFO links have finite buffers
+    buffered = not plain and discipline == "fifo" and rng.random() < 0.5
+    with_class = not plain and rng.random() < 0.3
+
+    network = {
+        "strategy": strategy_name,
+        "buffer_links": int(rng.integers(0, num_links)),
+        "queue_discipline": discipline,
+        "links": [
+            {
+                "id": f"link{i}",
+                "capacity": float(capacity),
+                "time_window_duration": float(rng.choice([5.0, 10.0, 60.0])),
+                "target_utilization": float(target),
+                "buffer_capacity": float(rng.choice([20000.0, 200000.0])) if buffered else None,
+            }
+            for i, (capacity, target) in enumerate(zip(capacities, targets))
+        ],
+    }
+    if buffered and rng.random() < 0.5:
+        network["shared_buffer"] = float(rng.choice([50000.0, 500000.0]))
+    if discipline == "priority":
+        if with_class:
+            network["priority_classes"] = ["bulk"]
+        else:
+            network["priority_thresholds"] = [10000.0, 100000.0]
+
+    distribution = DistributionFactory.create_distribution(
+        "bounded_pareto", BoundedParetoParams.model_validate(params)
+    )
+    load = rng.uniform(0.3, 0.95)
+    rate = float(load * capacities.sum() / distribution.mean())
+    traffic = {
+        "flow_arrival": _random_arrival(rng, rate, duration),
+        "flow_size": {"type": "bounded_pareto", "params": params},
+    }
+    if with_class:
+        # A second stream of small flows carries part of the load
+        traffic["flow_arrival"] = _random_arrival(rng, rate * 0.7, duration)
+        class_params = {"alpha": 1.5, "lower": 512, "upper": 16384}
+        class_mean = DistributionFactory.create_distribution(
+            "bounded_pareto", BoundedParetoParams.model_validate(class_params)
+        ).mean()
+        traffic["classes"] = [
+            {
+                "name": "bulk",
+                "flow_arrival": {"type": "poisson", "rate": float(load * 0.3 * capacities.sum() / class_mean)},
+                "flow_size": {"type": "bounded_pareto", "params": class_params},
+            }
+        ]
+
+    return MainConfig.model_validate(
+        {
+            "version": "1.0",
+            "simulation": {
+                "duration": duration,
+                "seed": int(rng.integers(0, 2**31)),
+                "metrics": {
+                    "sample_interval": float(rng.choice([0.5, 1.0])),
+                    "utilization": utilization,
+                    "telemetry_delay": telemetry_delay,
+                },
+            },
+            "network": network,
+            "traffic": traffic,
+        }
+    )
+
+
+def _build(config: MainConfig, strategy_name: str, **kwargs) -> Simulator:
+    random.seed(ROUTING_SEED)
+    distribution = DistributionFactory.create_distribution(
+        config.traffic.flow_size.type, config.traffic.flow_size.params
+    )
+    flow_size_generator = FlowSizeGeneratorFactory.create_generator(config, distribution)
+    flow_generator = FlowGeneratorFactory.create_generator(config, flow_size_generator)
+    return build_simulator(
+        config, strategy_name, flow_generator, flow_size_generator, distribution, **kwargs
+    )
+
+
+def run_baseline(config: MainConfig, strategy_name: str) -> baseline.Simulator:
+    """The frozen original simulator, routing the flows the other engines generate"""
+    distribution = DistributionFactory.create_distribution(
+        config.traffic.flow_size.type, config.traffic.flow_size.params
+    )
+    flow_size_generator = FlowSizeGeneratorFactory.create_generator(config, distribution)
+    flow_generator = FlowGeneratorFactory.create_generator(config, flow_size_generator)
+    flows = list(flow_generator.generate_flows(0, config.simulation.duration))
+    random.seed(ROUTING_SEED)
+    simulator = baseline.build_simulator(
+        config, strategy_name, ListFlowGenerator(flows), flow_size_generator, distribution
+    )
+    simulator.run()
+    return simulator
+
+
+def run_reference(config: MainConfig, strategy_name: str) -> Simulator:
+    """
+    The event loop sampling with each collector's straightforward per-link
+    collect(), the reference for configs the frozen baseline does not model
+    """
+    simulator = _build(config, strategy_name)
+    simulator.metrics_tracker.reference = True
+    simulator.run()
+    return simulator
+
+
+def run_discrete(config: MainConfig, strategy_name: str) -> Simulator:
+    simulator = _build(config, strategy_name)
+    simulator.run()
+    return simulator
+
+
+def run_lockstep(config: MainConfig, strategy_name: str) -> Simulator:
+    """
+    The strategy's lane of a lockstep run that also evaluates LOCKSTEP_COMPANIONS,
+    so routing or sampling leaking between lanes shows up as a difference
+    """
+    names = [name for name in LOCKSTEP_COMPANIONS if name != strategy_name] + [strategy_name]
+    lanes = {name: _build(config, name) for name in names}
+    # _build reseeds the global random module, so every lane starts from the same state
+    random.seed(ROUTING_SEED)
+    lockstep = LockstepSimulator(
+        config.simulation.duration, lanes[strategy_name].flow_generator, lanes
+    )
+    lockstep.run()
+    return lanes[strategy_name]
+
+
+def run_sharded(config: MainConfig, strategy_name: str) -> Simulator | None:
+    if config.simulation.metrics.telemetry_delay > 0:
+        return None
+    if _build(config, strategy_name).strategy.reads_link_metrics:
+        return None
+    simulator = _build(config, strategy_name, workers=2)
+    simulator.run()
+    return simulator
+
+
+# Engines checked against the reference; they return None for strategies they do not support.
+# The per-link reference is itself checked wherever the frozen baseline is the reference
+ENGINES: dict[str, Callable[[MainConfig, str], Simulator | None]] = {
+    "reference": run_reference,
+    "discrete": run_discrete,
+    "lockstep": run_lockstep,
+    "sharded": run_sharded,
+}
+
+
+def compare_runs(
+    reference: Simulator, candidate: Simulator, tolerances: Tolerances, mse_per_event: bool = True
+) -> list[str]:
+    """
+    Describe every way candidate's results differ from reference's beyond the
+    tolerances. mse_per_event: whether candidate records the MSE at every
+    event, as the reference does, so both traces must have the same length.
+    """
+    differences = []
+
+    reference_flows = sorted(
+        (flow.id, flow.start_time, flow.end_time) for link in reference.links for flow in link.flows
+    )
+    candidate_flows = sorted(
+        (flow.id, flow.start_time, flow.end_time) for link in candidate.links for flow in link.flows
+    )
+    if [flow[0] for flow in reference_flows] != [flow[0] for flow in candidate_flows]:
+        differences.append(
+            f"completed {len(candidate_flows)} flows instead of {len(reference_flows)}, or different ones"
+        )
+    elif reference_flows:
+        error = np.abs(np.array(reference_flows)[:, 1:] - np.array(candidate_flows)[:, 1:]).max()
+        if error > tolerances.flow_time:
+            differences.append(f"flow start/end times differ by up to {error:g} s")
+
+    for name in reference.metrics_tracker.get_metric_names():
+        reference_times, reference_values = reference.metrics_tracker.get_metric_series(name)
+        candidate_times, candidate_values = candidate.metrics_tracker.get_metric_series(name)
+        if reference_values.shape != candidate_values.shape:
+            differences.append(
+                f"{name} has {candidate_values.shape} samples instead of {reference_values.shape}"
+            )
+            continue
+        time_error = np.abs(reference_times - candidate_times).max(initial=0.0)
+        scale = np.maximum(np.abs(reference_values), 1.0)
+        error = (np.abs(reference_values - candidate_values) / scale).max(initial=0.0)
+        if time_error > 0 or error > tolerances.metric:
+            differences.append(f"{name} differs by up to {error:g} relative (sample times by {time_error:g})")
+
+    if mse_per_event and len(candidate.mse_samples) != len(reference.mse_samples):
+        differences.append(
+            f"MSE recorded at {len(candidate.mse_samples)} events instead of {len(reference.mse_samples)}"
+        )
+    # Engines may record the MSE per event or per sample tick, so only the final value is compared
+    reference_mse = reference.mse_samples[-1] if reference.mse_samples else 0.0
+    candidate_mse = candidate.mse_samples[-1] if candidate.mse_samples else 0.0
+    if abs(reference_mse - candidate_mse) > tolerances.mse:
+        differences.append(f"final MSE {candidate_mse:g} instead of {reference_mse:g}")
+
+    return differences
+
+
+def check_equivalence(
+    num_configs: int = 5,
+    seed: int = 0,
+    engines: list[str] | None = None,
+    strategies: list[str] | None = None,
+    tolerances: Tolerances | None = None,
+) -> list[Mismatch]:
+    """
+    Run every engine and the reference on the same seeded workload, over
+    num_configs randomized configs for every strategy, and return where
+    they disagree. The reference is the frozen baseline simulator wherever
+    it models the config, the per-link reference otherwise.
+    """
+    tolerances = tolerances or Tolerances()
+    engines = engines or list(ENGINES)
+    strategies = strategies or list(STRATEGY_NAMES)
+    rng = np.random.default_rng(seed)
+
+    mismatches = []
+    for config_index in range(num_configs):
+        for strategy_name in strategies:
+            config = random_config(rng, strategy_name)
+            # Strategies may print; the harness only reports differences
+            use_baseline = baseline.supports(config, strategy_name)
+            with contextlib.redirect_stdout(io.StringIO()):
+                if use_baseline:
+                    reference = run_baseline(config, strategy_name)
+                else:
+                    reference = run_reference(config, strategy_name)
+                candidates = {
+                    name: ENGINES[name](config, strategy_name)
+                    for name in engines
+                    if use_baseline or name != "reference"
+                }
+
+            for name, candidate in candidates.items():
+                if candidate is None:
+                    continue
+                mse_per_event = name not in PER_TICK_MSE_ENGINES
+                for detail in compare_runs(reference, candidate, tolerances, mse_per_event):
+                    mismatches.append(Mismatch(name, strategy_name, config_index, detail))
+
+    return mismatches
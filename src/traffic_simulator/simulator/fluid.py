@@ -0,0 +1,203 @@
+import math
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from traffic_simulator.config.models import LinkConfig, MainConfig
+from traffic_simulator.metrics.metric_manager import LinkMetricsTracker
+from traffic_simulator.ports.link import Link
+
+# Strategies with a mean-field routing rule: a fixed split of the arriving
+# work, or water-filling towards the links whose backlog drains first.
+FLUID_STRATEGIES = ("ecmp", "wcmp", "least_congested")
+
+
+def fluid_routing_weights(config: MainConfig, strategy_name: str) -> np.ndarray | None:
+    """Fraction of the arriving work each link receives, None for least-congested routing"""
+    if strategy_name not in FLUID_STRATEGIES:
+        raise ValueError(f"Strategy {strategy_name} has no fluid model")
+
+    links = config.network.links
+    if strategy_name == "least_congested":
+        return None
+    if strategy_name == "ecmp":
+        return np.full(len(links), 1 / len(links))
+
+    weights = np.array(config.network.routing_weights(), dtype=np.float64)
+    if weights.sum() <= 0:
+        raise ValueError("WCMP needs a positive total target utilization")
+    return weights / weights.sum()
+
+
+def water_fill(levels: np.ndarray, capacities: np.ndarray, work: float) -> np.ndarray:
+    """
+    Split work over links so the lowest drain times levels rise to a common
+    level, which is what routing every flow to the least congested link does
+    in the fluid limit. Returns the work each link receives.
+    """
+    order = np.argsort(levels)
+    sorted_levels = levels[order]
+    sorted_capacities = capacities[order]
+    cum_capacity = np.cumsum(sorted_capacities)
+    cum_work = np.cumsum(sorted_capacities * sorted_levels)
+
+    # Work needed to raise the lowest j + 1 links to the level of link j
+    fill_cost = cum_capacity * sorted_levels - cum_work
+    filled = np.searchsorted(fill_cost, work, side="right") - 1
+    level = (work + cum_work[filled]) / cum_capacity[filled]
+
+    return capacities * np.maximum(level - levels, 0.0)
+
+
+class FluidSimulator:
+    """
+    Mean-field approximation of the discrete engine for high-load regimes.
+
+    Instead of individual flows, each link holds a backlog of work that grows
+    by its share of the aggregate arrival rate times the mean flow size and
+    drains at the link capacity, advanced with a fixed time step. The cost is
+    independent of how many flows are queued. Utilization, buffer occupancy
+    and FCT are recorded into the LinkMetricsTracker on its usual sample grid,
+    so the same plots and MSE apply.
+    """
+
+    def __init__(
+        self,
+        duration: float,
+        time_step: float,
+        arrival_rate: float,
+        mean_flow_size: float,
+        routing_weights: np.ndarray | None,
+        links: list[Link],
+        link_configs: List[LinkConfig],
+        link_metric_tracker: LinkMetricsTracker,
+        utilization_metric: str = "link_utilization",
+    ):
+        """
+        time_step: fluid integration step, should be well below the sample interval.
+        routing_weights: fraction of the arriving work per link, None to
+        route it to the least congested links.
+        """
+        self.duration = duration
+        self.time_step = time_step
+        self.arrival_rate = arrival_rate
+        self.mean_flow_size = mean_flow_size
+        self.routing_weights = routing_weights
+        self.links = links
+        self.link_configs = link_configs
+        self.metrics_tracker = link_metric_tracker
+        self.utilization_metric = utilization_metric
+
+        self.mse_samples = []
+        self.mse_timestamps = []
+        self._visualizer = None
+
+    @property
+    def visualizer(self):
+        if self._visualizer is None:
+            from traffic_simulator.simulator.visualizer import LinkVisualizer
+
+            self._visualizer = LinkVisualizer(self.metrics_tracker)
+        return self._visualizer
+
+    def run(self):
+        dt = self.time_step
+        capacity = np.array([link.capacity_bps for link in self.links])
+        state = self.links[0].state
+        time_window = state.time_window[[link.index for link in self.links]]
+        ewma_decay = np.exp(-dt / time_window)
+        work_per_step = self.arrival_rate * self.mean_flow_size * dt
+
+        sample_times = np.arange(0.0, self.duration, self.metrics_tracker.sample_interval)
+        sample_steps = np.round(sample_times / dt).astype(np.int64)
+        num_links = len(self.links)
+        busy_samples = np.zeros((len(sample_times), num_links))
+        series = {
+            "ewma_link_utilization": np.zeros((len(sample_times), num_links)),
+            "buffer_occupancy": np.zeros((len(sample_times), num_links)),
+            "flow_completion_time": np.zeros((len(sample_times), num_links)),
+        }
+
+        backlog = np.zeros(num_links)
+        busy_time = np.zeros(num_links)
+        ewma = np.zeros(num_links)
+        fct_sum = np.zeros(num_links)
+        flow_count = np.zeros(num_links)
+
+        sample = 0
+        for step in range(int(math.ceil(self.duration / dt)) + 1):
+            while sample < len(sample_steps) and sample_steps[sample] == step:
+                busy_samples[sample] = busy_time
+                series["ewma_link_utilization"][sample] = ewma
+                series["buffer_occupancy"][sample] = backlog
+                np.divide(
+                    fct_sum,
+                    flow_count,
+                    out=series["flow_completion_time"][sample],
+                    where=flow_count > 0,
+                )
+                sample += 1
+
+            if self.routing_weights is not None:
+                arrivals = work_per_step * self.routing_weights
+            else:
+                arrivals = water_fill(backlog / capacity, capacity, work_per_step)
+
+            # Flows arriving now wait for the backlog, then transmit
+            flows = arrivals / self.mean_flow_size
+            fct_sum += flows * (backlog + self.mean_flow_size) / capacity
+            flow_count += flows
+
+            backlog += arrivals
+            served = np.minimum(backlog, capacity * dt)
+            backlog -= served
+            busy_time += served / capacity
+            ewma = ewma * ewma_decay + (1.0 - ewma_decay) * served / (capacity * dt)
+
+        elapsed = np.maximum(sample_times, dt)[:, None]
+        series["link_utilization"] = np.where(
+            sample_times[:, None] > 0, busy_samples / elapsed, 0.0
+        )
+
+        # Busy time inside the window, interpolated between samples
+        windowed = np.zeros_like(busy_samples)
+        for column in range(num_links):
+            window_start = np.maximum(sample_times - time_window[column], 0.0)
+            busy_before = np.interp(window_start, sample_times, busy_samples[:, column])
+            span = sample_times - window_start
+            windowed[:, column] = np.divide(
+                busy_samples[:, column] - busy_before,
+                span,
+                out=np.zeros(len(sample_times)),
+                where=span > 0,
+            )
+        series["windowed_link_utilization"] = windowed
+
+        self.metrics_tracker.record_samples(sample_times, series)
+
+        targets = np.array([config.target_utilization for config in self.link_configs])
+        errors = series[self.utilization_metric] - targets
+        self.mse_samples = list(np.mean(errors**2, axis=1))
+        self.mse_timestamps = list(sample_times)
+
+    def visualize(self, save_path: str = None):
+        import matplotlib.pyplot as plt
+
+        self.visualizer.plot_utilization(self.links, save_path=save_path)
+        self.visualizer.plot_max_utilization(self.links, save_path=save_path)
+        self.visualizer.plot_variance(self.links, save_path=save_path)
+        self.visualizer.plot_buffer_occupancy(self.links, save_path=save_path)
+        self.visualizer.plot_fct(self.links, save_path=save_path)
+        self.visualizer.plot_link_imbalance(self.links, save_path=save_path)
+
+        plt.figure(figsize=(10, 6))
+        plt.plot(self.mse_timestamps, self.mse_samples)
+        plt.xlabel("Time (seconds)")
+        plt.ylabel("Mean Square Error")
+        plt.title("Link Utilization Mean Square Error Over Time (fluid)")
+        plt.grid(True)
+        if save_path:
+            plt.savefig(Path(save_path) / "mse.png", bbox_inches="tight", dpi=300)
+
+        plt.close("all")
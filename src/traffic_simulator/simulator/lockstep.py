@@ -0,0 +1,117 @@
+import dataclasses
+import heapq
+import random
+from pathlib import Path
+from typing import Iterator
+
+from traffic_simulator.flows.flow_generator import FlowGenerator
+from traffic_simulator.models.event import (
+    Event,
+    FlowArrivalEvent,
+    FlowCompletionEvent,
+)
+from traffic_simulator.models.flow import Flow
+from traffic_simulator.simulator.simulator import Simulator
+
+
+class LockstepSimulator:
+    """
+    Evaluates several strategies in a single pass over one arrival stream.
+
+    Each lane is a Simulator with its own links, strategy and metrics
+    tracker. Flow generation, event decoding and the time-advance loop are
+    shared: every arrival is fanned out to all lanes. A lane samples its
+    metrics on the arrivals and its own completions only, and routes with
+    its own copy of the global random state, so it produces exactly the
+    results it would running alone.
+    """
+
+    def __init__(
+        self,
+        duration: float,
+        flow_generator: FlowGenerator,
+        lanes: dict[str, Simulator],
+    ):
+        """
+        duration: total simulation time.
+        lanes: simulators to run side by side, keyed by a display name.
+        """
+        self.duration = duration
+        self.flow_generator = flow_generator
+        self.lanes = lanes
+
+        self._time = 0.0
+        self._events: list[Event] = []
+        self._arrivals: Iterator[Flow] = iter(())
+
+    def run(self):
+        self._arrivals = iter(self.flow_generator.generate_flows(0, self.duration))
+        self._schedule_next_arrival()
+
+        lanes = list(self.lanes.values())
+        preemptive = any(lane.links[0].discipline is not None for lane in lanes)
+        # Every lane draws the random numbers a standalone run would
+        state = random.getstate()
+        for lane in lanes:
+            lane.strategy.rng = random.Random()
+            lane.strategy.rng.setstate(state)
+        # Completion events find their lane by the links' state store
+        lane_of = {lane.links[0].state: lane for lane in lanes}
+
+        while self._events:
+            event = heapq.heappop(self._events)
+            if preemptive and isinstance(event, FlowCompletionEvent) and event.cancelled:
+                continue
+            self._time = event.time
+
+            if isinstance(event, FlowArrivalEvent):
+                for lane in lanes:
+                    lane._time = self._time
+                    lane._sample_stats()
+                self._process_packet_arrival(event, lanes)
+            elif isinstance(event, FlowCompletionEvent):
+                lane = lane_of[event.link.state]
+                lane._time = self._time
+                lane._sample_stats()
+                completion_event = Simulator._complete_flow(event, self._time)
+                if completion_event is not None:
+                    heapq.heappush(self._events, completion_event)
+
+        # As a standalone run, each lane takes its last sample at its own last event
+        for lane in lanes:
+            lane._sample_stats()
+
+    def _schedule_next_arrival(self):
+        flow = next(self._arrivals, None)
+        if flow is None:
+            return
+
+        heapq.heappush(self._events, FlowArrivalEvent(time=flow.arrival_time, flow=flow))
+
+    def _process_packet_arrival(self, event: FlowArrivalEvent, lanes: list[Simulator]):
+        """Route a copy of the arriving flow in every lane"""
+        self._schedule_next_arrival()
+
+        # Links record scheduling times on the flow, so each lane needs its own copy
+        for i, lane in enumerate(lanes):
+            flow = event.flow if i == 0 else dataclasses.replace(event.flow)
+            completion_event = lane._route_flow(flow)
+            if completion_event is not None:
+                heapq.heappush(self._events, completion_event)
+
+    def final_mse(self) -> dict[str, float]:
+        """Last sampled MSE of every lane"""
+        return {
+            name: lane.mse_samples[-1] if lane.mse_samples else 0.0
+            for name, lane in self.lanes.items()
+        }
+
+    def visualize(self, save_path: str = None):
+        """Save each lane's figures into a subdirectory named after the lane"""
+        for name, lane in self.lanes.items():
+            lane_path = None
+            if save_path:
+                lane_path = Path(save_path) / name
+                lane_path.mkdir(parents=True, exist_ok=True)
+                lane_path = str(lane_path)
+            lane.visualize(save_path=lane_path)
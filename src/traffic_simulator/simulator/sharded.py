@@ -0,0 +1,295 @@
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import numpy as np
+
+from traffic_simulator.config.models import LinkConfig
+from traffic_simulator.flows.flow_generator import (
+    FlowGenerator,
+    FlowSizeGenerator,
+    ListFlowGenerator,
+)
+from traffic_simulator.metrics.metric_manager import LinkMetricsTracker
+from traffic_simulator.models.flow import Flow
+from traffic_simulator.ports.link import Link, create_links
+from traffic_simulator.ports.queue_discipline import QueueDiscipline
+from traffic_simulator.ports.strategy import LoadBalanceStrategy
+from traffic_simulator.simulator.simulator import Simulator
+
+# Per-link state copied back from the shards once they finish
+MERGED_STATE = (
+    "busy_until",
+    "queued_bytes",
+    "queued_flows",
+    "head_start",
+    "busy_time",
+    "fct_sum",
+    "completed_flows",
+    "window_busy",
+    "window_count",
+    "window_head_start",
+    "window_head_end",
+    "window_head_weight",
+    "ewma_utilization",
+    "ewma_time",
+)
+
+
+class _AssignedStrategy(LoadBalanceStrategy):
+    """Sends each flow to the link chosen for it in the assignment pass"""
+
+    def __init__(self, links: list[Link], positions: list[int]):
+        super().__init__(links)
+        self._positions = iter(positions)
+
+    def select_link(self) -> Link:
+        return self.links[next(self._positions)]
+
+
+def simulate_shard(
+    link_configs: List[LinkConfig],
+    sample_interval: float,
+    flows: list[Flow],
+    positions: list[int],
+    end_time: float,
+    discipline: QueueDiscipline | None = None,
+) -> dict:
+    """
+    Run the event loop of one shard of links on the flows assigned to them.
+    positions holds the shard-local link of each flow. Buffers are left
+    unbounded, the assignment pass already dropped what did not fit. Module
+    level so a process pool can pickle it.
+    """
+    links = create_links(
+        [link.capacity for link in link_configs],
+        [link.time_window_duration for link in link_configs],
+        discipline=discipline,
+    )
+    tracker = LinkMetricsTracker(sample_interval)
+    for link in links:
+        tracker.register_link(link)
+
+    simulator = Simulator(
+        duration=end_time,
+        flow_generator=ListFlowGenerator(flows),
+        flow_size_generator=None,
+        strategy=_AssignedStrategy(links, positions),
+        links=links,
+        link_configs=link_configs,
+        link_metric_tracker=tracker,
+    )
+    simulator.run()
+    # Links of this shard may go idle before the last flow of the others completes
+    tracker.sample_metrics(end_time)
+
+    state = links[0].state
+    times, _ = tracker.get_metric_series("link_utilization")
+    return {
+        "times": times.copy(),
+        "series": {
+            name: tracker.get_metric_series(name)[1].copy()
+            for name in tracker.get_metric_names()
+        },
+        "state": {name: getattr(state, name).copy() for name in MERGED_STATE},
+        "window_intervals": state.window_intervals,
+        "start_times": np.array([flow.start_time for flow in flows]),
+        "end_times": np.array([flow.end_time for flow in flows]),
+    }
+
+
+def partition_links(loads: np.ndarray, num_shards: int) -> list[list[int]]:
+    """Split link positions into num_shards groups of similar total load, largest first"""
+    shards = [[] for _ in range(num_shards)]
+    totals = np.zeros(num_shards)
+    for position in np.argsort(-loads, kind="stable"):
+        shard = int(np.argmin(totals))
+        shards[shard].append(int(position))
+        totals[shard] += loads[position]
+    return [sorted(shard) for shard in shards if shard]
+
+
+class ShardedSimulator(Simulator):
+    """
+    Simulates links in parallel processes when routing does not read link metrics.
+
+    Strategies that route on at most the links' busy_until (ECMP, WCMP, least
+    congested, the sampled strategies and uneven) make the same decisions
+    whether or not the links are simulated: busy_until only depends on the
+    flows sent to a link, whatever its queue discipline. So every flow is assigned in one pass
+    that tracks busy_until alone, after which the links are independent.
+    They are then split into shards of similar load, each simulated by a
+    worker with its own event loop and LinkMetricsTracker, and the sampled
+    series, link state and flow times are merged into this simulator.
+
+    Finite buffers are decided in the assignment pass too, since a FIFO
+    link's buffered bytes also follow from the start times of its flows, so
+    the shards only simulate admitted flows with unbounded buffers.
+
+    The results match Simulator exactly, except that the MSE is recorded
+    once per sample tick instead of once per event.
+    """
+
+    def __init__(
+        self,
+        duration: float,
+        flow_generator: FlowGenerator,
+        flow_size_generator: FlowSizeGenerator,
+        strategy: LoadBalanceStrategy,
+        links: list[Link],
+        link_configs: List[LinkConfig],
+        link_metric_tracker: LinkMetricsTracker,
+        utilization_metric: str = "link_utilization",
+        workers: int = 1,
+    ):
+        """workers: processes simulating shards, 1 to simulate them in this process."""
+        if strategy.reads_link_metrics:
+            raise ValueError(
+                f"{type(strategy).__name__} routes on sampled link metrics, so its links cannot be simulated independently"
+            )
+        if link_metric_tracker.telemetry.delay > 0:
+            raise ValueError("Sharded runs do not model telemetry delay")
+        super().__init__(
+            duration,
+            flow_generator,
+            flow_size_generator,
+            strategy,
+            links,
+            link_configs,
+            link_metric_tracker,
+            utilization_metric,
+        )
+        self.workers = workers
+
+    def _assign_flows(self, flows: list[Flow]) -> tuple[np.ndarray, float]:
+        """
+        Route every flow in arrival order, returning its link position, -1 if
+        the link's buffer dropped it, and the last completion time.
+        """
+        state = self.links[0].state
+        busy_until = state.busy_until
+        capacity = state.capacity
+        positions = {link.index: position for position, link in enumerate(self.links)}
+        # Start time, link and size of the flows waiting in a buffer
+        waiting: list[tuple[float, int, float]] = []
+
+        assigned = np.zeros(len(flows), dtype=np.int64)
+        end_time = 0.0
+        for i, flow in enumerate(flows):
+            index = self.strategy.select_link_for_flow(flow).index
+            arrival = flow.arrival_time
+
+            if state.bounded:
+                # Flows that entered service by now have left the buffers
+                while waiting and waiting[0][0] <= arrival:
+                    _, waiting_index, size = heapq.heappop(waiting)
+                    state.buffered_bytes[waiting_index] -= size
+                    state.buffered_total -= size
+                # As Link.admits: an idle link always takes the flow into service
+                if busy_until[index] > arrival and (
+                    state.buffered_bytes[index] + flow.flow_size > state.buffer_capacity[index]
+                    or state.buffered_total + flow.flow_size > state.shared_buffer
+                ):
+                    state.dropped_flows[index] += 1
+                    state.dropped_bytes[index] += flow.flow_size
+                    assigned[i] = -1
+                    continue
+
+            # A FIFO link starts a flow once it is free, as Link.enqueue_flow does
+            start = max(arrival, float(busy_until[index]))
+            if state.bounded and start > arrival:
+                heapq.heappush(waiting, (start, index, flow.flow_size))
+                state.buffered_bytes[index] += flow.flow_size
+                state.buffered_total += flow.flow_size
+            busy_until[index] = start + flow.flow_size / float(capacity[index])
+            end_time = max(end_time, float(busy_until[index]))
+            assigned[i] = positions[index]
+
+        return assigned, end_time
+
+    def run(self):
+        flows = list(self.flow_generator.generate_flows(0, self.duration))
+        assigned, end_time = self._assign_flows(flows)
+        # Dropped flows never reach a shard
+        admitted = np.flatnonzero(assigned >= 0)
+        flows = [flows[i] for i in admitted]
+        assigned = assigned[admitted]
+
+        state = self.links[0].state
+        indices = np.array([link.index for link in self.links])
+        # Balance shards by the transmission time they carry
+        sizes = np.array([flow.flow_size for flow in flows], dtype=np.float64)
+        loads = np.bincount(assigned, weights=sizes, minlength=len(self.links))
+        loads = loads / state.capacity[indices]
+        shards = partition_links(loads, max(1, min(self.workers, len(self.links))))
+
+        jobs = []
+        flow_positions = []
+        for shard in shards:
+            local = np.full(len(self.links), -1)
+            local[shard] = np.arange(len(shard))
+            members = np.flatnonzero(local[assigned] >= 0)
+            flow_positions.append(members)
+            jobs.append(
+                (
+                    [self.link_configs[position] for position in shard],
+                    self.metrics_tracker.sample_interval,
+                    [flows[i] for i in members],
+                    local[assigned[members]].tolist(),
+                    end_time,
+                    self.links[0].discipline,
+                )
+            )
+
+        if self.workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+                results = list(pool.map(simulate_shard, *zip(*jobs)))
+        else:
+            results = [simulate_shard(*job) for job in jobs]
+
+        self._merge(flows, assigned, shards, flow_positions, results, end_time)
+
+    def _merge(
+        self,
+        flows: list[Flow],
+        assigned: np.ndarray,
+        shards: list[list[int]],
+        flow_positions: list[np.ndarray],
+        results: list[dict],
+        end_time: float,
+    ) -> None:
+        """Combine the shard results into this simulator's links and tracker"""
+        state = self.links[0].state
+        times = results[0]["times"]
+        series = {
+            name: np.zeros((len(times), len(self.links))) for name in results[0]["series"]
+        }
+
+        for shard, members, result in zip(shards, flow_positions, results):
+            for name, values in result["series"].items():
+                series[name][:, shard] = values
+            shard_indices = [self.links[position].index for position in shard]
+            for name, values in result["state"].items():
+                getattr(state, name)[shard_indices] = values
+            for index, intervals in zip(shard_indices, result["window_intervals"]):
+                state.window_intervals[index] = intervals
+
+            for i, start, end in zip(
+                members.tolist(), result["start_times"].tolist(), result["end_times"].tolist()
+            ):
+                flows[i].start_time = start
+                flows[i].end_time = end
+
+        # Arrival order is also the order a FIFO link completes its flows in
+        order = range(len(flows))
+        if self.links[0].discipline is not None:
+            order = np.argsort([flow.end_time for flow in flows], kind="stable").tolist()
+        for i in order:
+            self.links[int(assigned[i])].flows.append(flows[i])
+
+        self.metrics_tracker.record_samples(times, series)
+        targets = np.array([config.target_utilization for config in self.link_configs])
+        errors = series[self.utilization_metric][:, : len(targets)] - targets
+        self.mse_samples = list(np.mean(errors**2, axis=1))
+        self.mse_timestamps = list(times)
+        self._time = end_time
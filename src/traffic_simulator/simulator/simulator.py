@@ -1,10 +1,10 @@
 from pathlib import Path
-import matplotlib.pyplot as plt
 import heapq
 import numpy as np
 
 from traffic_simulator.flows.flow_generator import FlowGenerator, FlowSizeGenerator
 from traffic_simulator.metrics.metric_manager import LinkMetricsTracker
+from traffic_simulator.models.flow import Flow
 from traffic_simulator.ports.link import Link
 from traffic_simulator.ports.strategy import LoadBalanceStrategy
 from traffic_simulator.models.event import (
@@ -12,8 +12,7 @@ from traffic_simulator.models.event import (
     FlowArrivalEvent,
     FlowCompletionEvent,
 )
-from traffic_simulator.simulator.visualizer import LinkVisualizer
-from typing import List
+from typing import Iterator, List
 from traffic_simulator.config.models import LinkConfig
 from traffic_simulator.metrics.mse import calculate_mse, calculate_per_link_errors
 
@@ -30,10 +29,12 @@ class Simulator:
         links: list[Link],
         link_configs: List[LinkConfig],
         link_metric_tracker: LinkMetricsTracker,
+        utilization_metric: str = "link_utilization",
     ):
         """
         duration: total simulation time.
         time_interval: simulation step (e.g., each second).
+        utilization_metric: utilization metric the MSE is computed from.
         """
         # Initialize simulation components
         self.duration = duration
@@ -41,11 +42,14 @@ class Simulator:
         self.strategy = strategy
         self.links = links
         self.link_configs = link_configs
+        self.utilization_metric = utilization_metric
 
         # Initialize MSE tracking
         self.mse_samples = []
         self.mse_timestamps = []
         self.sample_interval = 1.0
+        self._mse = 0.0
+        self._mse_sample_count = -1
 
         # To graph flow size
         self.flow_size_generator = flow_size_generator
@@ -53,25 +57,47 @@ class Simulator:
         # Initialize simulation state
         self._time = 0.0
         self._events: list[Event] = []
+        self._arrivals: Iterator[Flow] = iter(())
 
         self.metrics_tracker = link_metric_tracker
-        self.visualizer = LinkVisualizer(self.metrics_tracker)
+        self._visualizer = None
+
+    @property
+    def visualizer(self):
+        # matplotlib is only imported once something is plotted
+        if self._visualizer is None:
+            from traffic_simulator.simulator.visualizer import LinkVisualizer
+
+            self._visualizer = LinkVisualizer(self.metrics_tracker)
+        return self._visualizer
 
     def _sample_mse(self):
         """Sample and store current MSE value"""
-        mse = calculate_mse(
-            self.metrics_tracker, self.links, self.link_configs, self._time
-        )
-        self.mse_samples.append(mse)
+        # The MSE only changes when the tracker takes a new sample
+        if self.metrics_tracker.sample_count != self._mse_sample_count:
+            self._mse = calculate_mse(
+                self.metrics_tracker,
+                self.links,
+                self.link_configs,
+                self._time,
+                self.utilization_metric,
+            )
+            self._mse_sample_count = self.metrics_tracker.sample_count
+        self.mse_samples.append(self._mse)
         self.mse_timestamps.append(self._time)
 
     def run(self):
         # Generate initial events
         self._generate_flow_events()
+        # Only links with a queue discipline preempt and cancel completion events
+        preemptive = self.links[0].discipline is not None
 
         while self._events:
             # Get the next event
             event = heapq.heappop(self._events)
+            if preemptive and isinstance(event, FlowCompletionEvent) and event.cancelled:
+                # A preemption rescheduled this flow's completion
+                continue
             self._time = event.time
 
             self._sample_stats()
@@ -85,35 +111,67 @@ class Simulator:
             # print(f"time: {self._time:.2f}, event_type: {event.__class__.__name__}")
 
         self._sample_stats()
-        self.visualize()
-        self._visualize_flows_scatter()
 
     def _generate_flow_events(self):
-        # Generate flow arrival events
-        for flow in self.flow_generator.generate_flows(0, self.duration):
-            arrival_event = FlowArrivalEvent(
-                time=flow.arrival_time,
-                flow=flow,
-            )
-            heapq.heappush(self._events, arrival_event)
+        # Flows are pulled from the generator one at a time, so only the
+        # next arrival is ever waiting in the event queue
+        self._arrivals = iter(self.flow_generator.generate_flows(0, self.duration))
+        self._schedule_next_arrival()
+
+    def _schedule_next_arrival(self):
+        flow = next(self._arrivals, None)
+        if flow is None:
+            return
+
+        arrival_event = FlowArrivalEvent(
+            time=flow.arrival_time,
+            flow=flow,
+        )
+        heapq.heappush(self._events, arrival_event)
 
     def _process_packet_arrival(self, event: FlowArrivalEvent):
         """Handle packet arrival event"""
-        link = self.strategy.select_link_for_flow(event.flow)
+        self._schedule_next_arrival()
+        completion_event = self._route_flow(event.flow)
+        if completion_event is not None:
+            heapq.heappush(self._events, completion_event)
+
+    def _route_flow(self, flow: Flow) -> FlowCompletionEvent | None:
+        """Assign a flow to a link and return its completion event, None if the link drops it"""
+        link = self.strategy.select_link_for_flow(flow)
 
         # Schedule packet transmission completion
-        finish_time = link.enqueue_flow(event.flow, self._time)
-        completion_event = FlowCompletionEvent(
+        finish_time = link.enqueue_flow(flow, self._time)
+        if finish_time is None:
+            return None
+        # A processor-sharing arrival moves the completion of another flow
+        serving = link.serving
+        return FlowCompletionEvent(
             time=finish_time,
-            flow=event.flow,
+            flow=flow if serving is None else serving,
             link=link,
+            token=link.token,
         )
-        heapq.heappush(self._events, completion_event)
 
     def _process_packet_completion(self, event: FlowCompletionEvent):
         """Handle packet completion event"""
+        completion_event = self._complete_flow(event, self._time)
+        if completion_event is not None:
+            heapq.heappush(self._events, completion_event)
+
+    @staticmethod
+    def _complete_flow(event: FlowCompletionEvent, time: float) -> FlowCompletionEvent | None:
+        """Complete the event's flow and return the completion event of the flow taking over its link, if any"""
         link = event.link
-        link.dequeue_flow(self._time)
+        finish_time = link.complete_flow(time)
+        if finish_time is None:
+            return None
+        return FlowCompletionEvent(
+            time=finish_time,
+            flow=link.serving,
+            link=link,
+            token=link.token,
+        )
 
     def _sample_stats(self):
         # Sample link utilizations and buffer occupancy
@@ -121,6 +179,8 @@ class Simulator:
         self._sample_mse()
 
     def visualize(self, save_path: str = None):
+        import matplotlib.pyplot as plt
+
         self.visualizer.plot_utilization(self.links, save_path=save_path)
         self.visualizer.plot_max_utilization(self.links, save_path=save_path)
         self.visualizer.plot_variance(self.links, save_path=save_path)
@@ -138,8 +198,13 @@ class Simulator:
 
         self._visualize_workload_sizes(save_path)
 
+        # Release the figures, the visualizer never reuses them
+        plt.close("all")
+
     def _visualize_workload_sizes(self, save_path):
         """Plots the cumulative probability distribution using the quantile function with a logarithmic x-axis."""
+        import matplotlib.pyplot as plt
+
         probabilities = np.linspace(0.00, 1.00, 100)  # 100 samples from 0.00 to 1.00
         flow_sizes = [self.flow_size_generator.generate_with_probability(p) for p in probabilities]
 
@@ -163,6 +228,8 @@ class Simulator:
 
     def _visualize_mse(self, save_path: str = None):
         """Plot MSE over time"""
+        import matplotlib.pyplot as plt
+
         plt.figure(figsize=(10, 6))
         plt.plot(self.mse_timestamps, self.mse_samples)
         plt.xlabel("Time (seconds)")
@@ -175,8 +242,14 @@ class Simulator:
 
     def _visualize_per_link_errors(self, save_path: str = None):
         """Plot squared errors for each link"""
+        import matplotlib.pyplot as plt
+
         final_errors = calculate_per_link_errors(
-            self.metrics_tracker, self.links, self.link_configs, self._time
+            self.metrics_tracker,
+            self.links,
+            self.link_configs,
+            self._time,
+            self.utilization_metric,
         )
 
         plt.figure(figsize=(10, 6))
@@ -194,6 +267,8 @@ class Simulator:
             )
 
     def _visualize_flows_scatter(self, save_path: str = None):
+        import matplotlib.pyplot as plt
+
         arrival_times = [flow.arrival_time for flow in self.flow_generator.all_flows]
         flow_sizes = [flow.flow_size for flow in self.flow_generator.all_flows]
 
@@ -0,0 +1,31 @@
+from traffic_simulator.models.flow import Flow
+from traffic_simulator.ports.link import create_links
+
+
+def test_tail_drops_against_link_and_shared_buffers():
+    # Each link buffers 2500 bytes behind the flow in service, 3000 in total
+    link0, link1 = create_links([1000.0, 1000.0], buffer_capacities=[2500.0, 2500.0], shared_buffer=3000.0)
+    state = link0.state
+
+    def send(link, flow_id, time, size):
+        return link.enqueue_flow(Flow(id=flow_id, arrival_time=time, flow_size=size), time)
+
+    # Idle links take a flow into service whatever its size
+    assert send(link0, 0, 0.0, 1000) is not None
+    assert send(link1, 1, 0.0, 10000) is not None
+    assert send(link0, 2, 0.1, 2000) is not None
+    # Fits link1's buffer but not the shared pool: 2000 + 1500 > 3000
+    assert send(link1, 3, 0.2, 1500) is None
+    assert send(link1, 4, 0.3, 1000) is not None
+    # Fits the shared pool but not link0's buffer: 2000 + 600 > 2500
+    assert send(link0, 5, 0.4, 600) is None
+    assert state.buffered_total == 3000
+
+    # Flow 2 leaves link0's buffer for service, freeing room in both
+    link0.complete_flow(1.0)
+    assert state.buffered_total == 1000
+    assert send(link0, 6, 1.1, 2000) is not None
+
+    assert state.dropped_flows.tolist() == [1, 1]
+    assert state.dropped_bytes.tolist() == [600.0, 1500.0]
+    assert state.buffered_bytes.tolist() == [2000.0, 1000.0]
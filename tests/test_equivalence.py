@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from traffic_simulator.config.choices import STRATEGY_NAMES
+from traffic_simulator.simulator import baseline
+from traffic_simulator.simulator.equivalence import (
+    Tolerances,
+    check_equivalence,
+    compare_runs,
+    random_config,
+    run_baseline,
+    run_discrete,
+)
+
+
+@pytest.mark.parametrize("strategy_name", STRATEGY_NAMES)
+def test_engines_match_reference(strategy_name):
+    mismatches = check_equivalence(num_configs=2, seed=0, strategies=[strategy_name])
+    assert not mismatches, "\n".join(str(mismatch) for mismatch in mismatches)
+
+
+def test_random_configs_cover_baseline_and_newer_features():
+    rng = np.random.default_rng(0)
+    configs = [random_config(rng, "ecmp") for _ in range(40)]
+    assert any(baseline.supports(config, "ecmp") for config in configs)
+    assert {config.network.queue_discipline for config in configs} == {
+        "fifo",
+        "srpt",
+        "priority",
+        "processor_sharing",
+    }
+    assert any(config.network.has_finite_buffers() for config in configs)
+    assert any(config.simulation.metrics.telemetry_delay > 0 for config in configs)
+    assert any(config.traffic.classes for config in configs)
+    assert {config.traffic.flow_arrival.type for config in configs} >= {"time_varying", "mmpp", "on_off"}
+
+
+def test_baseline_detects_a_different_routing():
+    rng = np.random.default_rng(1)
+    config = random_config(rng, "ecmp")
+    while not baseline.supports(config, "ecmp"):
+        config = random_config(rng, "ecmp")
+    reference = run_baseline(config, "ecmp")
+
+    assert not compare_runs(reference, run_discrete(config, "ecmp"), Tolerances())
+    assert compare_runs(reference, run_discrete(config, "least_congested"), Tolerances())
@@ -0,0 +1,84 @@
+import pytest
+
+from traffic_simulator.config.models import LinkConfig
+from traffic_simulator.flows.flow_generator import ListFlowGenerator
+from traffic_simulator.metrics.metric_manager import LinkMetricsTracker
+from traffic_simulator.models.flow import Flow
+from traffic_simulator.ports.link import create_links
+from traffic_simulator.ports.queue_discipline import (
+    PriorityDiscipline,
+    ProcessorSharingDiscipline,
+    SrptDiscipline,
+)
+from traffic_simulator.ports.strategy import ECMPStrategy
+from traffic_simulator.simulator.simulator import Simulator
+
+CAPACITY = 1000.0
+
+
+def run_single_link(discipline, arrivals: list[tuple[float, int]]) -> list[Flow]:
+    """Serve (arrival time, size) flows on one link and return them in completion order"""
+    flows = [Flow(id=i, arrival_time=time, flow_size=size) for i, (time, size) in enumerate(arrivals)]
+    links = create_links([CAPACITY], discipline=discipline)
+    tracker = LinkMetricsTracker()
+    tracker.register_link(links[0])
+    link_config = LinkConfig(id="link0", capacity=CAPACITY, time_window_duration=10.0, target_utilization=0.5)
+    simulator = Simulator(
+        duration=100.0,
+        flow_generator=ListFlowGenerator(flows),
+        flow_size_generator=None,
+        strategy=ECMPStrategy(links),
+        links=links,
+        link_configs=[link_config],
+        link_metric_tracker=tracker,
+    )
+    simulator.run()
+    return links[0].flows
+
+
+def test_srpt_serves_shortest_remaining_first():
+    # B preempts A, which has 2000 bytes left; C waits behind B's last 500
+    # bytes but then goes ahead of A
+    completed = run_single_link(SrptDiscipline(), [(0.0, 3000), (1.0, 1000), (1.5, 1500)])
+
+    assert [flow.id for flow in completed] == [1, 2, 0]
+    assert [flow.end_time for flow in completed] == pytest.approx([2.0, 3.5, 5.5])
+
+
+def test_priority_preempts_lower_levels_and_keeps_arrival_order_within_one():
+    # Flows up to 2000 bytes are level 0: B preempts A, and C waits for B
+    # although it has less left to send than B
+    completed = run_single_link(
+        PriorityDiscipline(size_thresholds=[2000.0]), [(0.0, 5000), (1.0, 2000), (1.5, 1000)]
+    )
+
+    assert [flow.id for flow in completed] == [1, 2, 0]
+    assert [flow.end_time for flow in completed] == pytest.approx([3.0, 4.0, 8.0])
+
+
+def test_priority_levels_from_traffic_classes():
+    discipline = PriorityDiscipline(classes=["interactive"])
+    interactive = Flow(id=0, arrival_time=0.0, flow_size=10**6, traffic_class="interactive")
+    bulk = Flow(id=1, arrival_time=0.0, flow_size=1, traffic_class="bulk")
+
+    assert discipline.key(interactive, 10**6) < discipline.key(bulk, 1)
+
+
+@pytest.mark.parametrize("small, large", [(1000, 3000), (2500, 2500), (700, 9100)])
+def test_processor_sharing_two_flows_arriving_together(small, large):
+    # Both get half the capacity until the small one leaves at 2a/C, then the
+    # large one finishes its remaining b - a bytes alone, at (a + b)/C
+    completed = run_single_link(ProcessorSharingDiscipline(), [(0.0, large), (0.0, small)])
+
+    assert [flow.end_time for flow in completed] == pytest.approx(
+        [2 * small / CAPACITY, (small + large) / CAPACITY]
+    )
+
+
+def test_processor_sharing_late_arrival():
+    # A has 1000 bytes left when B arrives; sharing, A ends at 3 with 1000
+    # bytes of B sent, and B sends its last 2000 alone
+    completed = run_single_link(ProcessorSharingDiscipline(), [(0.0, 2000), (1.0, 3000)])
+
+    assert [flow.id for flow in completed] == [0, 1]
+    assert [flow.end_time for flow in completed] == pytest.approx([3.0, 5.0])
@@ -0,0 +1,60 @@
+import csv
+import math
+
+import numpy as np
+import pytest
+
+from traffic_simulator.flows.flow_generator import TraceFlowGenerator
+from traffic_simulator.flows.trace import Trace, TraceWriter, csv_to_trace
+
+
+@pytest.fixture
+def records() -> list[tuple[float, int]]:
+    rng = np.random.default_rng(11)
+    arrival_times = np.cumsum(rng.exponential(0.01, 25)).tolist()
+    flow_sizes = rng.integers(1, 2**40, 25).tolist()
+    return list(zip(arrival_times, flow_sizes))
+
+
+def test_csv_to_trace_to_flows_round_trip(tmp_path, records):
+    csv_path = tmp_path / "flows.csv"
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["src", "flow_size", "arrival_time"])
+        for arrival_time, flow_size in records:
+            # repr keeps every bit of the float
+            writer.writerow(["h1", flow_size, repr(arrival_time)])
+
+    # Chunks smaller than the file exercise the chunk boundaries on both sides
+    assert csv_to_trace(csv_path, tmp_path / "flows.trace", chunk_size=4) == len(records)
+    generator = TraceFlowGenerator(tmp_path / "flows.trace", chunk_size=3)
+    flows = list(generator.generate_flows(0, math.inf))
+
+    assert [(flow.arrival_time, flow.flow_size) for flow in flows] == records
+    assert [flow.id for flow in flows] == list(range(len(records)))
+
+
+def test_trace_replay_window(tmp_path, records):
+    with TraceWriter(tmp_path / "flows.trace") as writer:
+        writer.append(*zip(*records))
+    generator = TraceFlowGenerator(tmp_path / "flows.trace", chunk_size=3)
+    start, end = records[5][0], records[12][0]
+
+    # Flows from start on, up to and including the first at or after end
+    flows = list(generator.generate_flows(start, end))
+    assert [flow.id for flow in flows] == list(range(5, 13))
+
+
+def test_trace_writer_rejects_unsorted_records(tmp_path):
+    path = tmp_path / "flows.trace"
+    with pytest.raises(ValueError):
+        with TraceWriter(path) as writer:
+            writer.append([1.0, 2.0], [10, 20])
+            writer.append([1.5], [30])
+    assert not path.exists()
+
+
+def test_empty_trace(tmp_path):
+    TraceWriter(tmp_path / "empty.trace").close()
+    assert len(Trace(tmp_path / "empty.trace")) == 0
+    assert list(TraceFlowGenerator(tmp_path / "empty.trace").generate_flows(0, 10)) == []
@@ -0,0 +1,81 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from traffic_simulator.config.models import LinkConfig
+from traffic_simulator.flows.flow_generator import ListFlowGenerator
+from traffic_simulator.metrics.metric_manager import LinkMetricsTracker
+from traffic_simulator.models.flow import Flow
+from traffic_simulator.ports.link import create_links
+from traffic_simulator.ports.strategy import ECMPStrategy
+from traffic_simulator.simulator.simulator import Simulator
+
+CAPACITIES = [1000.0, 2000.0]
+TIME_WINDOWS = [3.0, 10.0]
+
+
+@pytest.fixture(scope="module")
+def simulator() -> Simulator:
+    rng = np.random.default_rng(7)
+    arrivals = np.cumsum(rng.exponential(0.6, 150))
+    flows = [
+        Flow(id=i, arrival_time=float(time), flow_size=int(size))
+        for i, (time, size) in enumerate(zip(arrivals, rng.integers(100, 2000, len(arrivals))))
+    ]
+    links = create_links(CAPACITIES, TIME_WINDOWS)
+    tracker = LinkMetricsTracker(sample_interval=0.5)
+    for link in links:
+        tracker.register_link(link)
+    strategy = ECMPStrategy(links)
+    strategy.rng = random.Random(3)
+    simulator = Simulator(
+        duration=float(arrivals[-1]),
+        flow_generator=ListFlowGenerator(flows),
+        flow_size_generator=None,
+        strategy=strategy,
+        links=links,
+        link_configs=[
+            LinkConfig(id=f"link{i}", capacity=capacity, time_window_duration=window, target_utilization=0.5)
+            for i, (capacity, window) in enumerate(zip(CAPACITIES, TIME_WINDOWS))
+        ],
+        link_metric_tracker=tracker,
+    )
+    simulator.run()
+    return simulator
+
+
+def _completed_intervals(link, time: float) -> list[tuple[float, float]]:
+    # A tick is sampled before the first event after it, so exactly the flows ended by then are counted
+    return [(flow.start_time, flow.end_time) for flow in link.flows if flow.end_time <= time]
+
+
+def test_windowed_utilization_matches_recomputed_window(simulator):
+    times, values = simulator.metrics_tracker.get_metric_series("windowed_link_utilization")
+    assert len(times) > 100
+
+    for column, (link, window) in enumerate(zip(simulator.links, TIME_WINDOWS)):
+        for time, value in zip(times, values[:, column]):
+            if time <= 0:
+                assert value == 0.0
+                continue
+            window_start = max(time - window, 0.0)
+            busy = sum(
+                max(min(end, time) - max(start, window_start), 0.0)
+                for start, end in _completed_intervals(link, time)
+            )
+            assert value == pytest.approx(busy / (time - window_start), abs=1e-9)
+
+
+def test_ewma_utilization_matches_recomputed_decay(simulator):
+    times, values = simulator.metrics_tracker.get_metric_series("ewma_link_utilization")
+
+    for column, (link, time_constant) in enumerate(zip(simulator.links, TIME_WINDOWS)):
+        for time, value in zip(times, values[:, column]):
+            # A busy interval contributes the integral of its decayed indicator
+            expected = sum(
+                math.exp(-(time - end) / time_constant) - math.exp(-(time - start) / time_constant)
+                for start, end in _completed_intervals(link, time)
+            )
+            assert value == pytest.approx(expected, abs=1e-9)
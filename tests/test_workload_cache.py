@@ -0,0 +1,91 @@
+import pytest
+
+from traffic_simulator.config.models import MainConfig
+from traffic_simulator.flows.distribution import DistributionFactory
+from traffic_simulator.flows.flow_generator import FlowGeneratorFactory, TraceFlowGenerator
+from traffic_simulator.flows.flow_size_generator import FlowSizeGeneratorFactory
+from traffic_simulator.flows.workload_cache import WorkloadCache, workload_key
+
+
+def make_config(**overrides) -> MainConfig:
+    config = {
+        "version": "1.0",
+        "simulation": {"duration": 20.0, "seed": 5},
+        "network": {
+            "strategy": "ecmp",
+            "links": [
+                {"id": f"link{i}", "capacity": 10240.0, "time_window_duration": 10.0, "target_utilization": 0.5}
+                for i in range(2)
+            ],
+        },
+        "traffic": {
+            "flow_arrival": {"type": "poisson", "rate": 4.0},
+            "flow_size": {"type": "bounded_pareto", "params": {"alpha": 1.5, "lower": 512, "upper": 65536}},
+        },
+    }
+    for path, value in overrides.items():
+        *parents, name = path.split(".")
+        section = config
+        for parent in parents:
+            section = section[parent]
+        section[name] = value
+    return MainConfig.model_validate(config)
+
+
+def make_flow_generator(config: MainConfig):
+    distribution = DistributionFactory.create_distribution(
+        config.traffic.flow_size.type, config.traffic.flow_size.params
+    )
+    flow_size_generator = FlowSizeGeneratorFactory.create_generator(config, distribution)
+    return FlowGeneratorFactory.create_generator(config, flow_size_generator)
+
+
+def test_key_ignores_everything_but_the_workload():
+    key = workload_key(make_config())
+
+    assert workload_key(make_config()) == key
+    assert workload_key(make_config(**{"network.strategy": "wcmp"})) == key
+    assert workload_key(make_config(**{"simulation.metrics": {"sample_interval": 0.1}})) == key
+
+
+@pytest.mark.parametrize(
+    "override",
+    [
+        {"simulation.seed": 6},
+        {"simulation.duration": 21.0},
+        {"traffic.flow_arrival": {"type": "poisson", "rate": 4.5}},
+        {"traffic.flow_size": {"type": "uniform", "params": {"min_flow_size": 512, "max_flow_size": 65536}}},
+        {"simulation.variance_reduction": {"antithetic": True}},
+    ],
+)
+def test_key_changes_with_the_workload(override):
+    assert workload_key(make_config(**override)) != workload_key(make_config())
+
+
+def test_key_follows_empirical_cdf_contents(tmp_path):
+    cdf_path = tmp_path / "sizes.cdf"
+    config = make_config(**{"traffic.flow_size": {"type": "empirical", "params": {"path": str(cdf_path)}}})
+    cdf_path.write_text("100 0.5\n1000 1.0\n")
+    key = workload_key(config)
+
+    cdf_path.write_text("100 0.2\n1000 1.0\n")
+    assert workload_key(config) != key
+
+
+def test_cache_hit_replays_the_generated_flows(tmp_path):
+    config = make_config()
+    cache = WorkloadCache(tmp_path, chunk_size=16)
+    expected = [(flow.arrival_time, flow.flow_size) for flow in make_flow_generator(config).generate_flows(0, 20.0)]
+
+    path = cache.get_or_create(config, make_flow_generator(config))
+    assert path == cache.trace_path(config)
+    assert path.with_suffix(".json").exists()
+
+    class Unused:
+        def generate_flows(self, current_time, end_time):
+            raise AssertionError("a cached workload is generated again")
+
+    assert cache.get_or_create(config, Unused()) == path
+    replayed = TraceFlowGenerator(path).generate_flows(0, 20.0)
+    assert [(flow.arrival_time, flow.flow_size) for flow in replayed] == expected
+    assert not list(tmp_path.glob("*.tmp"))